@@ -1,140 +1,340 @@
-import google.generativeai as genai
+import asyncio
 import json
+import os
 import time
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Callable
+from ai.incremental_json import IncrementalJSONParser
+from ai.prompts import PromptTemplate, get_prompt
+from ai.providers import LLMProvider, LLMResponse, UsageMeter, create_provider, estimate_tokens
+from ai.resilience import CircuitBreaker, CircuitOpenError, RetryPolicy, PERMANENT, classify, retry_after
+from services.metrics import Metrics
+
+
+# Outcome of an attempt that was cancelled before the model answered
+_CANCELLED = "cancelled"
 
 
 class GeminiClient:
-    def __init__(self, api_key: str):
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-2.5-flash')
+    MODEL_NAME = 'gemini-2.5-flash'
+    
+    # Prompt template selected by PROMPT_VERSION (see ai/prompts.py), built once per process.
+    # The version is part of the cache key; add a new template whenever the prompt text changes.
+    PROMPT = get_prompt()
+    PROMPT_VERSION = PROMPT.version
+    
+    GENERATION_CONFIG = {
+        "temperature": 0.1,
+        "top_p": 0.8,
+        "top_k": 20,
+    }
+    
+    # Packed prompts: estimated prompt + response tokens allowed per call, and a hard cap on requirements
+    PACK_TOKEN_BUDGET = int(os.getenv("PACK_TOKEN_BUDGET", "12000"))
+    PACK_MAX_REQUIREMENTS = int(os.getenv("PACK_MAX_REQUIREMENTS", "16"))
+    
+    # Estimated response tokens of one interpretation (rules, boundaries, assumptions)
+    RESPONSE_TOKENS_PER_REQUIREMENT = 700
+    
+    # Reported by interpret_requirement_streaming_async as soon as each entry is complete
+    STREAMED_FIELDS = ("rules", "boundary_values")
+    
+    # Shared by every client in the process: retries back off together and the breaker sees all calls
+    retry_policy = RetryPolicy.from_env()
+    breaker = CircuitBreaker.from_env()
+    
+    def __init__(self, api_key: str, provider: Optional[LLMProvider] = None, prompt: Optional[PromptTemplate] = None):
+        # Live Gemini unless LLM_PROVIDER selects recording or replay
+        self.provider = provider or create_provider(api_key, self.MODEL_NAME, self.GENERATION_CONFIG)
+        self.prompt = prompt or GeminiClient.PROMPT
     
     def interpret_requirement(
         self,
         requirement_id: str,
         requirement_text: str,
         inputs: list,
-        outputs: list
+        outputs: list,
+        usage: Optional[UsageMeter] = None
     ) -> Dict[str, Any]:
         """
         Use Gemini AI to interpret requirements and extract rules, constraints, boundaries.
         AI MUST NOT invent test cases or guess values.
+        Token usage and latency of every attempt are added to usage, when given.
         """
         
-        system_prompt = """You are an intelligent software verification engineer with deep domain knowledge.
-
-Your task is to interpret requirements and extract:
-1. Rules and conditions
-2. Constraints
-3. Boundary values (infer from context if not explicit)
-4. Assumptions made
-5. Critical ambiguities only
-
-INTELLIGENT INTERPRETATION RULES:
-- Infer reasonable boundary values from data types and context
-- For integers without ranges: use sensible defaults based on domain (e.g., age: 0-120, temperature: -273-5000)
-- For strings: infer max length from context (e.g., name: 100 chars, email: 255 chars)
-- For enums/states: extract all mentioned values
-- ONLY mark as BLOCKED if requirement is fundamentally unclear or contradictory
-- Make reasonable assumptions and document them
-- Use domain knowledge (altitude in feet: 0-100000, speed in mph: 0-500, etc.)
-- Extract implicit boundary values from context clues
+        prompt = self.prompt.build(requirement_id, requirement_text, inputs, outputs)
 
-Return ONLY valid JSON in this exact format:
-{
-  "requirement_id": "string",
-  "interpretation_status": "OK or BLOCKED",
-  "interpreted_requirement": "string - formal restatement",
-  "rules": [
-    {
-      "rule_id": "R1",
-      "condition": "when X happens",
-      "expected_behavior": "system shall do Y"
-    }
-  ],
-  "constraints": ["constraint1", "constraint2"],
-  "boundary_values": {
-    "input_name": {
-      "min": value,
-      "max": value,
-      "critical_points": [values]
-    }
-  },
-  "assumptions": ["assumption1"],
-  "ambiguities": ["ambiguity1"]
-}
-
-If ambiguities exist and are critical, set interpretation_status to "BLOCKED".
-"""
-
-        inputs_desc = "\n".join([
-            f"- {inp['name']}: {inp['data_type']}" + 
-            (f" (range: {inp.get('range_min')} to {inp.get('range_max')})" if inp.get('range_min') is not None else "") +
-            (f" (unit: {inp.get('unit')})" if inp.get('unit') else "") +
-            (f" (allowed: {inp.get('allowed_values')})" if inp.get('allowed_values') else "")
-            for inp in inputs
-        ])
+        return self._call(prompt, lambda text: self._parse_response(text, requirement_id), usage)
+    
+    async def interpret_requirement_async(
+        self,
+        requirement_id: str,
+        requirement_text: str,
+        inputs: list,
+        outputs: list,
+        usage: Optional[UsageMeter] = None
+    ) -> Dict[str, Any]:
+        """
+        Asyncio-native variant of interpret_requirement.
+        Awaits the Gemini call and the retry delays so the event loop stays free.
+        """
         
-        outputs_desc = "\n".join([
-            f"- {out['name']}: {out['data_type']}" +
-            (f" (unit: {out.get('unit')})" if out.get('unit') else "") +
-            (f" (possible values: {out.get('possible_values')})" if out.get('possible_values') else "")
-            for out in outputs
-        ])
-
-        user_prompt = f"""
-Requirement ID: {requirement_id}
-
-Requirement Text:
-{requirement_text}
-
-Inputs:
-{inputs_desc}
+        prompt = self.prompt.build(requirement_id, requirement_text, inputs, outputs)
 
-Outputs:
-{outputs_desc}
+        return await self._call_async(prompt, lambda text: self._parse_response(text, requirement_id), usage)
+    
+    async def interpret_requirement_streaming_async(
+        self,
+        requirement_id: str,
+        requirement_text: str,
+        inputs: list,
+        outputs: list,
+        on_event: Callable[[str, Any, Any], None],
+        usage: Optional[UsageMeter] = None
+    ) -> Dict[str, Any]:
+        """
+        Variant of interpret_requirement_async that streams the model's answer and calls
+        on_event(field, key, value) for each rules[] entry (key: its index) and each
+        boundary_values member (key: the input name) as soon as it is complete, then
+        (field, None, None) when the field ends. Events are not validated, and a retried
+        attempt reports its entries again from the start.
+        
+        Returns the complete interpretation, parsed from the whole text as usual.
+        """
+        
+        prompt = self.prompt.build(requirement_id, requirement_text, inputs, outputs)
 
-Analyze this requirement and return the JSON interpretation.
-"""
+        return await self._call_async(
+            prompt, lambda text: self._parse_response(text, requirement_id), usage, on_event
+        )
+    
+    async def interpret_requirements_packed_async(
+        self,
+        requirements: List[Dict[str, Any]],
+        usage: Optional[UsageMeter] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Interprets several requirements with one Gemini call; the system prompt is sent once.
+        Each requirement is a dict with requirement_id, requirement_text, inputs and outputs.
+        
+        Returns the raw interpretations keyed by requirement_id. Requirements the model
+        skipped are missing; validating the rest is up to the caller.
+        """
+        
+        prompt = self.prompt.build_packed(requirements)
+        requirement_ids = [req["requirement_id"] for req in requirements]
 
-        max_retries = 3
-        for attempt in range(max_retries):
+        return await self._call_async(prompt, lambda text: self._parse_packed_response(text, requirement_ids), usage)
+    
+    def _call(self, prompt: str, parse: Callable[[str], Any], usage: Optional[UsageMeter] = None) -> Any:
+        """
+        One model call with error-classified retries (see ai/resilience.py): rate-limit and
+        transient errors back off exponentially with jitter, honouring retry-after hints;
+        permanent ones (bad key, unparseable output) fail at once. Every attempt passes
+        the shared circuit breaker, which fails fast while the service is unhealthy.
+        """
+        
+        attempt = 0
+        while True:
             try:
-                response = self.model.generate_content(
-                    system_prompt + "\n\n" + user_prompt,
-                    generation_config={
-                        "temperature": 0.1,
-                        "top_p": 0.8,
-                        "top_k": 20,
-                    }
-                )
-                
-                response_text = response.text.strip()
-                
-                # Clean JSON from markdown
-                if response_text.startswith("```json"):
-                    response_text = response_text[7:]
-                if response_text.startswith("```"):
-                    response_text = response_text[3:]
-                if response_text.endswith("```"):
-                    response_text = response_text[:-3]
-                response_text = response_text.strip()
-                
-                result = json.loads(response_text)
-                
-                # Ensure requirement_id matches
-                result["requirement_id"] = requirement_id
-                
-                return result
-                
-            except json.JSONDecodeError as e:
-                if attempt == max_retries - 1:
-                    raise ValueError(f"Failed to parse AI response as JSON after {max_retries} attempts: {str(e)}")
-                time.sleep(1)
+                return self._attempt(prompt, parse, attempt, usage)
+            except CircuitOpenError:
+                raise
             except Exception as e:
-                if attempt == max_retries - 1:
-                    raise ValueError(f"AI interpretation failed: {str(e)}")
-                time.sleep(1)
+                delay = self._retry_delay(e, attempt)
+            time.sleep(delay)
+            attempt += 1
+    
+    async def _call_async(
+        self,
+        prompt: str,
+        parse: Callable[[str], Any],
+        usage: Optional[UsageMeter] = None,
+        on_event: Optional[Callable[[str, Any, Any], None]] = None
+    ) -> Any:
+        """Asyncio-native variant of _call; with on_event, the response is streamed"""
+        
+        attempt = 0
+        while True:
+            try:
+                return await self._attempt_async(prompt, parse, attempt, usage, on_event)
+            except CircuitOpenError:
+                raise
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+            await asyncio.sleep(delay)
+            attempt += 1
+    
+    def _attempt(self, prompt: str, parse: Callable[[str], Any], attempt: int, usage: Optional[UsageMeter]) -> Any:
+        self.breaker.before_call()
+        kind = None
+        response = None
+        start = time.perf_counter()
+        try:
+            with Metrics.llm_attempt(attempt):
+                response = self.provider.generate(prompt)
+                return parse(response.text)
+        except Exception as e:
+            kind = classify(e)
+            raise
+        finally:
+            self._record_outcome(kind, prompt, response, time.perf_counter() - start, usage)
+    
+    async def _attempt_async(
+        self,
+        prompt: str,
+        parse: Callable[[str], Any],
+        attempt: int,
+        usage: Optional[UsageMeter],
+        on_event: Optional[Callable[[str, Any, Any], None]] = None
+    ) -> Any:
+        self.breaker.before_call()
+        kind = None
+        response = None
+        start = time.perf_counter()
+        try:
+            with Metrics.llm_attempt(attempt):
+                if on_event is None:
+                    response = await self.provider.generate_async(prompt)
+                else:
+                    response = await self._stream(prompt, on_event)
+                return parse(response.text)
+        except asyncio.CancelledError:
+            kind = _CANCELLED
+            raise
+        except Exception as e:
+            kind = classify(e)
+            raise
+        finally:
+            self._record_outcome(kind, prompt, response, time.perf_counter() - start, usage)
+    
+    async def _stream(self, prompt: str, on_event: Callable[[str, Any, Any], None]) -> LLMResponse:
+        """Streams one response, reporting parser events as they complete; returns the whole response"""
+        parser = IncrementalJSONParser(self.STREAMED_FIELDS)
+        parts = []
+        prompt_tokens = completion_tokens = None
+        async for chunk in self.provider.generate_stream_async(prompt):
+            parts.append(chunk.text)
+            if chunk.prompt_tokens is not None:
+                prompt_tokens = chunk.prompt_tokens
+            if chunk.completion_tokens is not None:
+                completion_tokens = chunk.completion_tokens
+            for event in parser.feed(chunk.text):
+                on_event(*event)
+        return LLMResponse("".join(parts), prompt_tokens, completion_tokens)
+    
+    def _record_outcome(
+        self,
+        kind: Optional[str],
+        prompt: str,
+        response: Optional[LLMResponse],
+        seconds: float,
+        usage: Optional[UsageMeter]
+    ) -> None:
+        if kind == _CANCELLED:
+            self.breaker.abandon()
+        else:
+            self.breaker.record(kind)
+        
+        # Unparseable answers still cost their tokens
+        if response is not None:
+            Metrics.record_llm_tokens(
+                response.prompt_tokens if response.prompt_tokens is not None else estimate_tokens(prompt),
+                response.completion_tokens if response.completion_tokens is not None else estimate_tokens(response.text)
+            )
+        if usage is not None:
+            usage.record(prompt, response, seconds)
+    
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        """Seconds to wait before the next attempt; raises ValueError when there is none"""
+        kind = classify(error)
+        delay = self.retry_policy.delay(attempt, kind, retry_after(error))
+        if delay is not None:
+            return delay
+        if isinstance(error, json.JSONDecodeError):
+            raise ValueError(f"Failed to parse AI response as JSON: {str(error)}") from error
+        if kind == PERMANENT:
+            raise ValueError(f"AI interpretation failed: {str(error)}") from error
+        raise ValueError(f"AI interpretation failed after {attempt + 1} attempts ({kind}): {str(error)}") from error
+    
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """Rough token count (about 4 characters per token), good enough for budgeting"""
+        return estimate_tokens(text)
+    
+    @staticmethod
+    def requirement_tokens(requirement: Dict[str, Any], prompt: Optional[PromptTemplate] = None) -> int:
+        """Estimated tokens one requirement adds to a packed call, prompt and response"""
+        block = (prompt or GeminiClient.PROMPT).describe(
+            requirement["requirement_id"],
+            requirement["requirement_text"],
+            requirement["inputs"],
+            requirement["outputs"]
+        )
+        return estimate_tokens(block) + GeminiClient.RESPONSE_TOKENS_PER_REQUIREMENT
+    
+    @staticmethod
+    def pack_requirements(requirements: List[Dict[str, Any]], prompt: Optional[PromptTemplate] = None) -> List[List[int]]:
+        """
+        Splits requirements into packs (lists of indices, in order) so that each packed call
+        stays within PACK_TOKEN_BUDGET and PACK_MAX_REQUIREMENTS. Small requirements share
+        a call; one larger than the budget gets a call of its own. A requirement_id is never
+        repeated within a pack, since results are keyed by it.
+        """
+        
+        prompt = prompt or GeminiClient.PROMPT
+        overhead = estimate_tokens(prompt.packed_prefix)
+        packs = []
+        current, current_ids, used = [], set(), overhead
+        for index, requirement in enumerate(requirements):
+            tokens = GeminiClient.requirement_tokens(requirement, prompt)
+            full = len(current) >= GeminiClient.PACK_MAX_REQUIREMENTS or used + tokens > GeminiClient.PACK_TOKEN_BUDGET
+            if current and (full or requirement["requirement_id"] in current_ids):
+                packs.append(current)
+                current, current_ids, used = [], set(), overhead
+            current.append(index)
+            current_ids.add(requirement["requirement_id"])
+            used += tokens
+        if current:
+            packs.append(current)
+        return packs
+    
+    @staticmethod
+    def _parse_response(response_text: str, requirement_id: str) -> Dict[str, Any]:
+        """Strips markdown fences from the model output and parses the JSON"""
+        result = json.loads(GeminiClient._strip_fences(response_text))
+        
+        # Ensure requirement_id matches
+        result["requirement_id"] = requirement_id
+        
+        return result
+    
+    @staticmethod
+    def _parse_packed_response(response_text: str, requirement_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Parses a packed response into interpretations keyed by the requested requirement_ids"""
+        parsed = json.loads(GeminiClient._strip_fences(response_text))
+        if isinstance(parsed, dict):
+            # Tolerate {"interpretations": [...]} or a single object for a single requirement
+            parsed = parsed.get("interpretations", [parsed])
+        if not isinstance(parsed, list):
+            raise json.JSONDecodeError("Expected a JSON array of interpretations", response_text, 0)
+        
+        wanted = set(requirement_ids)
+        results = {}
+        for item in parsed:
+            if isinstance(item, dict) and item.get("requirement_id") in wanted:
+                results.setdefault(item["requirement_id"], item)
+        return results
+    
+    @staticmethod
+    def _strip_fences(response_text: str) -> str:
+        """Model output without surrounding markdown code fences"""
+        response_text = response_text.strip()
         
-        # Fallback (should not reach here)
-        raise ValueError("AI interpretation failed after all retries")
+        # Clean JSON from markdown
+        if response_text.startswith("```json"):
+            response_text = response_text[7:]
+        if response_text.startswith("```"):
+            response_text = response_text[3:]
+        if response_text.endswith("```"):
+            response_text = response_text[:-3]
+        return response_text.strip()
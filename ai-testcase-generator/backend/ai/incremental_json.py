@@ -0,0 +1,162 @@
+import json
+import re
+from typing import Any, Iterable, List, Optional, Tuple, Union
+
+
+# Inside a string only a quote or a backslash changes the scanner's state
+_STRING_SPECIAL = re.compile(r'["\\]')
+
+# Event: (field, index or member name, value); (field, None, None) when the field's container ends
+Event = Tuple[str, Union[int, str, None], Any]
+
+
+class _Frame:
+    __slots__ = ("kind", "field", "key", "index", "expecting_key")
+
+    def __init__(self, kind: str, field: Optional[str]):
+        self.kind = kind
+        self.field = field
+        self.key: Optional[str] = None
+        self.index = 0
+        self.expecting_key = kind == "{"
+
+
+class IncrementalJSONParser:
+    """
+    Scans a JSON object as it arrives in chunks and reports, as soon as each is complete,
+    every element of the named top-level arrays and every member of the named top-level
+    objects, e.g. each entry of "rules" and each input of "boundary_values".
+
+    Text around the top-level object (markdown fences) is ignored. The parser only
+    finds where values end; each value is decoded with json.loads, and the complete
+    document should still be parsed and validated once it has arrived.
+    """
+
+    def __init__(self, fields: Iterable[str]):
+        self.fields = frozenset(fields)
+        self._text = ""
+        self._pos = 0
+        self._stack: List[_Frame] = []
+        self._started = False
+        self._done = False
+        self._in_string = False
+        self._string_start = 0
+        self._key_pending = False
+        self._value_start: Optional[int] = None
+
+    @property
+    def done(self) -> bool:
+        """True once the top-level object has closed"""
+        return self._done
+
+    def feed(self, chunk: str) -> List[Event]:
+        """Scans the next chunk; returns the events it completed, in document order"""
+        events: List[Event] = []
+        if self._done or not chunk:
+            return events
+
+        self._text += chunk
+        text = self._text
+        end = len(text)
+        pos = self._pos
+        stack = self._stack
+
+        while pos < end:
+            if self._in_string:
+                match = _STRING_SPECIAL.search(text, pos)
+                if match is None:
+                    pos = end
+                    break
+                pos = match.start()
+                if text[pos] == "\\":
+                    if pos + 1 >= end:
+                        break  # wait for the escaped character
+                    pos += 2
+                    continue
+                pos += 1
+                self._in_string = False
+                if self._key_pending:
+                    self._key_pending = False
+                    stack[-1].key = json.loads(text[self._string_start:pos])
+                continue
+
+            char = text[pos]
+            if not self._started:
+                if char == "{":
+                    self._started = True
+                    stack.append(_Frame("{", None))
+                pos += 1
+                continue
+
+            frame = stack[-1]
+            if char == '"':
+                self._in_string = True
+                self._string_start = pos
+                if frame.kind == "{" and frame.expecting_key and len(stack) <= 2:
+                    self._key_pending = True
+                    frame.expecting_key = False
+                else:
+                    self._mark_value(pos)
+            elif char == "{" or char == "[":
+                self._mark_value(pos)
+                field = frame.key if len(stack) == 1 and frame.key in self.fields else None
+                stack.append(_Frame(char, field))
+            elif char == "}" or char == "]":
+                if frame.field is not None and self._value_start is not None:
+                    # A scalar element ends at the closing bracket
+                    self._emit(frame, text[self._value_start:pos], events)
+                stack.pop()
+                if not stack:
+                    self._done = True
+                    pos += 1
+                    break
+                if frame.field is not None:
+                    events.append((frame.field, None, None))
+                elif len(stack) == 2 and stack[-1].field is not None and self._value_start is not None:
+                    # A container element ends with its own closing bracket
+                    self._emit(stack[-1], text[self._value_start:pos + 1], events)
+            elif char == ",":
+                if frame.field is not None and self._value_start is not None:
+                    self._emit(frame, text[self._value_start:pos], events)
+                if frame.kind == "{":
+                    frame.expecting_key = True
+            elif char != ":" and not char.isspace():
+                # First character of a number, true, false or null
+                self._mark_value(pos)
+            pos += 1
+
+        self._pos = pos
+        self._discard_scanned()
+        return events
+
+    def _mark_value(self, pos: int) -> None:
+        """Records where a value starts, if it is an element or member of a watched container"""
+        if self._value_start is None and len(self._stack) == 2 and self._stack[-1].field is not None:
+            self._value_start = pos
+
+    def _emit(self, frame: _Frame, value_text: str, events: List[Event]) -> None:
+        self._value_start = None
+        try:
+            value = json.loads(value_text)
+        except ValueError:
+            # Malformed output; the full parse reports it
+            return
+        if frame.kind == "[":
+            events.append((frame.field, frame.index, value))
+            frame.index += 1
+        else:
+            events.append((frame.field, frame.key, value))
+
+    def _discard_scanned(self) -> None:
+        """Drops text that no pending value or key still needs"""
+        keep = self._pos
+        if self._value_start is not None:
+            keep = min(keep, self._value_start)
+        if self._in_string:
+            keep = min(keep, self._string_start)
+        if keep:
+            self._text = self._text[keep:]
+            self._pos -= keep
+            self._string_start -= keep
+            if self._value_start is not None:
+                self._value_start -= keep
@@ -0,0 +1,198 @@
+import os
+from typing import Any, Callable, Dict, List
+
+
+class PromptTemplate:
+    """
+    One version of the interpretation prompt. The fixed parts (system instructions,
+    packed-call instructions) are joined once when the template is created; building
+    a prompt only renders the requirement.
+
+    The version is part of the interpretation cache key, so results obtained with one
+    template are never served for another.
+    """
+
+    def __init__(
+        self,
+        version: str,
+        system: str,
+        packed_instructions: str,
+        describe: Callable[[str, str, list, list], str],
+        closing: str,
+        packed_closing: str,
+        separator: str
+    ):
+        self.version = version
+        self.system = system
+        self.describe = describe
+        self.closing = closing
+        self.packed_closing = packed_closing
+        self.separator = separator
+        self.single_prefix = system + "\n\n"
+        self.packed_prefix = system + "\n\n" + packed_instructions
+
+    def build(self, requirement_id: str, requirement_text: str, inputs: list, outputs: list) -> str:
+        """Full prompt for one requirement"""
+        return self.single_prefix + self.describe(requirement_id, requirement_text, inputs, outputs) + self.closing
+
+    def build_packed(self, requirements: List[Dict[str, Any]]) -> str:
+        """Instructions once, then every requirement"""
+        blocks = [
+            self.describe(req["requirement_id"], req["requirement_text"], req["inputs"], req["outputs"])
+            for req in requirements
+        ]
+        return self.packed_prefix + self.separator.join(blocks) + self.packed_closing.format(count=len(blocks))
+
+
+# Version 1: the original verbose prompt
+
+_VERBOSE_SYSTEM = """You are an intelligent software verification engineer with deep domain knowledge.
+
+Your task is to interpret requirements and extract:
+1. Rules and conditions
+2. Constraints
+3. Boundary values (infer from context if not explicit)
+4. Assumptions made
+5. Critical ambiguities only
+
+INTELLIGENT INTERPRETATION RULES:
+- Infer reasonable boundary values from data types and context
+- For integers without ranges: use sensible defaults based on domain (e.g., age: 0-120, temperature: -273-5000)
+- For strings: infer max length from context (e.g., name: 100 chars, email: 255 chars)
+- For enums/states: extract all mentioned values
+- ONLY mark as BLOCKED if requirement is fundamentally unclear or contradictory
+- Make reasonable assumptions and document them
+- Use domain knowledge (altitude in feet: 0-100000, speed in mph: 0-500, etc.)
+- Extract implicit boundary values from context clues
+
+Return ONLY valid JSON in this exact format:
+{
+  "requirement_id": "string",
+  "interpretation_status": "OK or BLOCKED",
+  "interpreted_requirement": "string - formal restatement",
+  "rules": [
+    {
+      "rule_id": "R1",
+      "condition": "when X happens",
+      "expected_behavior": "system shall do Y"
+    }
+  ],
+  "constraints": ["constraint1", "constraint2"],
+  "boundary_values": {
+    "input_name": {
+      "min": value,
+      "max": value,
+      "critical_points": [values]
+    }
+  },
+  "assumptions": ["assumption1"],
+  "ambiguities": ["ambiguity1"]
+}
+
+If ambiguities exist and are critical, set interpretation_status to "BLOCKED".
+"""
+
+_VERBOSE_PACKED = """You will be given several independent requirements, each starting with "Requirement ID:".
+Interpret each one on its own, following all rules above.
+Return ONLY a valid JSON array with one object per requirement, each in the exact format above
+and carrying that requirement's requirement_id. Do not merge or skip requirements.
+"""
+
+
+def _describe_verbose(requirement_id: str, requirement_text: str, inputs: list, outputs: list) -> str:
+    inputs_desc = "\n".join([
+        f"- {inp['name']}: {inp['data_type']}" +
+        (f" (range: {inp.get('range_min')} to {inp.get('range_max')})" if inp.get('range_min') is not None else "") +
+        (f" (unit: {inp.get('unit')})" if inp.get('unit') else "") +
+        (f" (allowed: {inp.get('allowed_values')})" if inp.get('allowed_values') else "")
+        for inp in inputs
+    ])
+
+    outputs_desc = "\n".join([
+        f"- {out['name']}: {out['data_type']}" +
+        (f" (unit: {out.get('unit')})" if out.get('unit') else "") +
+        (f" (possible values: {out.get('possible_values')})" if out.get('possible_values') else "")
+        for out in outputs
+    ])
+
+    return f"""
+Requirement ID: {requirement_id}
+
+Requirement Text:
+{requirement_text}
+
+Inputs:
+{inputs_desc}
+
+Outputs:
+{outputs_desc}
+"""
+
+
+# Version 2: compact instructions, a one-line schema and one line per input/output
+
+_COMPACT_SYSTEM = """You are a software verification engineer. Interpret the requirement; do not write test cases.
+Extract rules, constraints, boundary values, assumptions and critical ambiguities.
+- No range given: infer one from type, unit and domain (age 0-120, altitude ft 0-100000, speed mph 0-500, name 100 chars, email 255 chars).
+- List every enum/state value mentioned.
+- Document assumptions. Use BLOCKED only if the requirement is fundamentally unclear or contradictory.
+Return only JSON:
+{"requirement_id":str,"interpretation_status":"OK"|"BLOCKED","interpreted_requirement":str,"rules":[{"rule_id":"R1","condition":str,"expected_behavior":str}],"constraints":[str],"boundary_values":{"<input>":{"min":num,"max":num,"critical_points":[num]}},"assumptions":[str],"ambiguities":[str]}"""
+
+_COMPACT_PACKED = """Several independent requirements follow, each starting with "ID:". Interpret each on its own.
+Return only a JSON array with one object per requirement in the format above, with its requirement_id. Do not merge or skip any.
+"""
+
+
+def _compact_field(field: Dict[str, Any], values_key: str) -> str:
+    """e.g. 'altitude: integer [0..50000] feet' or 'mode: enum {IDLE|CLIMB}'"""
+    line = f"{field['name']}: {field['data_type']}"
+    if field.get("range_min") is not None:
+        line += f" [{field['range_min']}..{field.get('range_max')}]"
+    if field.get("unit"):
+        line += f" {field['unit']}"
+    values = field.get(values_key)
+    if values:
+        line += " {" + "|".join(str(value) for value in values) + "}"
+    return line
+
+
+def _describe_compact(requirement_id: str, requirement_text: str, inputs: list, outputs: list) -> str:
+    lines = [f"ID: {requirement_id}", f"Text: {requirement_text}", "Inputs:"]
+    lines.extend(_compact_field(inp, "allowed_values") for inp in inputs)
+    lines.append("Outputs:")
+    lines.extend(_compact_field(out, "possible_values") for out in outputs)
+    return "\n".join(lines) + "\n"
+
+
+PROMPTS = {
+    "1": PromptTemplate(
+        version="1",
+        system=_VERBOSE_SYSTEM,
+        packed_instructions=_VERBOSE_PACKED,
+        describe=_describe_verbose,
+        closing="\nAnalyze this requirement and return the JSON interpretation.\n",
+        packed_closing="\nAnalyze these {count} requirements and return the JSON array of interpretations.\n",
+        separator="\n---\n"
+    ),
+    "2": PromptTemplate(
+        version="2",
+        system=_COMPACT_SYSTEM,
+        packed_instructions=_COMPACT_PACKED,
+        describe=_describe_compact,
+        closing="",
+        packed_closing="",
+        separator="---\n"
+    ),
+}
+
+DEFAULT_PROMPT_VERSION = "2"
+
+
+def get_prompt(version: str = None) -> PromptTemplate:
+    """The template for a version; PROMPT_VERSION (default: the compact prompt) when none is given"""
+    version = version or os.getenv("PROMPT_VERSION", DEFAULT_PROMPT_VERSION)
+    try:
+        return PROMPTS[version]
+    except KeyError:
+        raise ValueError(f"Unknown prompt version '{version}' (expected one of {', '.join(PROMPTS)})")
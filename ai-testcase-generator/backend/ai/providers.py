@@ -0,0 +1,357 @@
+import asyncio
+import functools
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, NamedTuple, Optional
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token), good enough for budgeting"""
+    return len(text) // 4 + 1
+
+
+class LLMResponse(NamedTuple):
+    """The model's raw text and the token usage it reported (None when it reported none)"""
+    text: str
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+
+
+class UsageMeter:
+    """
+    Token usage and latency of the LLM calls made for one requirement, failed attempts
+    included. Counts the provider did not report are estimated from the text.
+    """
+
+    def __init__(self):
+        self.prompt_version: Optional[str] = None
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.seconds = 0.0
+        self.estimated = False
+        self.cached = False
+        self._lock = threading.Lock()
+
+    def record(self, prompt: str, response: Optional[LLMResponse], seconds: float) -> None:
+        """One attempt; response is None when the call raised before the model answered"""
+        with self._lock:
+            self.calls += 1
+            self.seconds += seconds
+            if response is None:
+                return
+            if response.prompt_tokens is None or response.completion_tokens is None:
+                self.estimated = True
+            self.prompt_tokens += (
+                response.prompt_tokens if response.prompt_tokens is not None else estimate_tokens(prompt)
+            )
+            self.completion_tokens += (
+                response.completion_tokens if response.completion_tokens is not None else estimate_tokens(response.text)
+            )
+
+    def add_share(self, other: "UsageMeter", share: float) -> None:
+        """Adds a fraction of another meter, e.g. one requirement's part of a packed call"""
+        with self._lock:
+            self.calls += other.calls
+            self.seconds += other.seconds * share
+            self.prompt_tokens += round(other.prompt_tokens * share)
+            self.completion_tokens += round(other.completion_tokens * share)
+            self.estimated = self.estimated or other.estimated
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "prompt_version": self.prompt_version,
+                "calls": self.calls,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "total_tokens": self.prompt_tokens + self.completion_tokens,
+                "latency_ms": round(self.seconds * 1000, 1),
+                "estimated": self.estimated,
+                "cached": self.cached
+            }
+
+
+class LLMProvider:
+    """
+    Turns a prompt into the model's raw text response and token usage.
+
+    GeminiClient builds the prompts, retries and parses the responses; a provider
+    only decides where the text comes from: the live model, or a recorded corpus.
+    """
+
+    name = "base"
+
+    def generate(self, prompt: str) -> LLMResponse:
+        raise NotImplementedError
+
+    async def generate_async(self, prompt: str) -> LLMResponse:
+        return await asyncio.to_thread(self.generate, prompt)
+
+    async def generate_stream_async(self, prompt: str) -> AsyncIterator[LLMResponse]:
+        """
+        The response in text chunks as the model produces them. Token counts, when
+        reported, are totals so far; the last chunk's are the call's.
+        Providers that cannot stream answer in one chunk.
+        """
+        yield await self.generate_async(prompt)
+
+
+class GeminiProvider(LLMProvider):
+    """The live Gemini model"""
+
+    name = "gemini"
+
+    def __init__(self, api_key: str, model_name: str, generation_config: Dict[str, Any]):
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(model_name)
+        self.generation_config = generation_config
+
+    def generate(self, prompt: str) -> LLMResponse:
+        response = self.model.generate_content(
+            prompt,
+            generation_config=self.generation_config
+        )
+        return GeminiProvider._to_response(response)
+
+    async def generate_async(self, prompt: str) -> LLMResponse:
+        response = await self.model.generate_content_async(
+            prompt,
+            generation_config=self.generation_config
+        )
+        return GeminiProvider._to_response(response)
+
+    async def generate_stream_async(self, prompt: str) -> AsyncIterator[LLMResponse]:
+        response = await self.model.generate_content_async(
+            prompt,
+            generation_config=self.generation_config,
+            stream=True
+        )
+        async for chunk in response:
+            # The closing chunk of a stream may carry no text
+            yield GeminiProvider._to_response(chunk, chunk.text if chunk.parts else "")
+
+    @staticmethod
+    def _to_response(response, text: Optional[str] = None) -> LLMResponse:
+        # usage_metadata is missing on older SDK versions
+        usage = getattr(response, "usage_metadata", None)
+        return LLMResponse(
+            response.text if text is None else text,
+            getattr(usage, "prompt_token_count", None) if usage else None,
+            getattr(usage, "candidates_token_count", None) if usage else None
+        )
+
+
+class PromptCorpus:
+    """
+    Directory of recorded responses, one JSON file per prompt hash:
+    {"prompt_hash": ..., "model": ..., "recorded_at": ..., "response": ...,
+     "prompt_tokens": ..., "completion_tokens": ...}
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def prompt_hash(prompt: str) -> str:
+        return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+    def get(self, prompt_hash: str) -> Optional[LLMResponse]:
+        try:
+            with open(self._path(prompt_hash), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        # Recordings made before token accounting carry no usage
+        return LLMResponse(entry["response"], entry.get("prompt_tokens"), entry.get("completion_tokens"))
+
+    def put(self, prompt_hash: str, response: LLMResponse, model: str) -> None:
+        entry = {
+            "prompt_hash": prompt_hash,
+            "model": model,
+            "recorded_at": time.time(),
+            "response": response.text,
+            "prompt_tokens": response.prompt_tokens,
+            "completion_tokens": response.completion_tokens
+        }
+        # Write then rename, so concurrent recorders and readers never see a partial file
+        path = self._path(prompt_hash)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+
+    def __len__(self) -> int:
+        return sum(1 for name in os.listdir(self.directory) if name.endswith(".json"))
+
+    def _path(self, prompt_hash: str) -> str:
+        return os.path.join(self.directory, prompt_hash + ".json")
+
+
+class RecordingProvider(LLMProvider):
+    """Passes prompts to another provider and records every successful response in the corpus"""
+
+    name = "record"
+
+    def __init__(self, inner: LLMProvider, corpus: PromptCorpus, model: str = ""):
+        self.inner = inner
+        self.corpus = corpus
+        self.model = model
+
+    def generate(self, prompt: str) -> LLMResponse:
+        response = self.inner.generate(prompt)
+        self.corpus.put(PromptCorpus.prompt_hash(prompt), response, self.model)
+        return response
+
+    async def generate_async(self, prompt: str) -> LLMResponse:
+        response = await self.inner.generate_async(prompt)
+        # Corpus files are written off the event loop
+        await asyncio.to_thread(self.corpus.put, PromptCorpus.prompt_hash(prompt), response, self.model)
+        return response
+
+    async def generate_stream_async(self, prompt: str) -> AsyncIterator[LLMResponse]:
+        parts = []
+        last = None
+        async for chunk in self.inner.generate_stream_async(prompt):
+            parts.append(chunk.text)
+            last = chunk
+            yield chunk
+        # Recorded only once the stream completed
+        if last is not None:
+            await asyncio.to_thread(
+                self.corpus.put,
+                PromptCorpus.prompt_hash(prompt),
+                LLMResponse("".join(parts), last.prompt_tokens, last.completion_tokens),
+                self.model
+            )
+
+
+class ReplayProvider(LLMProvider):
+    """
+    Serves recorded responses without network access, for load tests and regression runs.
+
+    Latency (base + uniform jitter, in ms) and an error rate can be injected to mimic
+    the live model. Injected behaviour comes from a seeded generator, so a run with the
+    same requests in the same order is reproducible. Streamed responses arrive in chunks
+    of chunk_chars characters, with the latency spread evenly across them.
+    """
+
+    name = "replay"
+
+    def __init__(
+        self,
+        corpus: PromptCorpus,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int = 0,
+        chunk_chars: int = 200
+    ):
+        if not 0.0 <= error_rate <= 1.0:
+            raise ValueError("error_rate must be between 0 and 1")
+        self.corpus = corpus
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.chunk_chars = max(1, chunk_chars)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def generate(self, prompt: str) -> LLMResponse:
+        delay, fail = self._draw()
+        if delay:
+            time.sleep(delay)
+        return self._respond(prompt, fail)
+
+    async def generate_async(self, prompt: str) -> LLMResponse:
+        delay, fail = self._draw()
+        if delay:
+            await asyncio.sleep(delay)
+        return await self._respond_async(prompt, fail)
+
+    async def generate_stream_async(self, prompt: str) -> AsyncIterator[LLMResponse]:
+        delay, fail = self._draw()
+        response = await self._respond_async(prompt, fail)
+        text = response.text
+        starts = range(0, max(len(text), 1), self.chunk_chars)
+        for start in starts:
+            if delay:
+                await asyncio.sleep(delay / len(starts))
+            yield response._replace(text=text[start:start + self.chunk_chars])
+
+    def _draw(self):
+        """Latency in seconds and whether to fail, for one call"""
+        with self._lock:
+            jitter = self._random.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0
+            fail = self._random.random() < self.error_rate if self.error_rate else False
+        return (self.latency_ms + jitter) / 1000, fail
+
+    def _respond(self, prompt: str, fail: bool) -> LLMResponse:
+        if fail:
+            raise RuntimeError("Injected replay failure")
+        prompt_hash = PromptCorpus.prompt_hash(prompt)
+        return self._found(prompt_hash, self.corpus.get(prompt_hash))
+
+    async def _respond_async(self, prompt: str, fail: bool) -> LLMResponse:
+        """_respond with the corpus file read off the event loop"""
+        if fail:
+            raise RuntimeError("Injected replay failure")
+        prompt_hash = PromptCorpus.prompt_hash(prompt)
+        return self._found(prompt_hash, await asyncio.to_thread(self.corpus.get, prompt_hash))
+
+    def _found(self, prompt_hash: str, response: Optional[LLMResponse]) -> LLMResponse:
+        if response is None:
+            raise LookupError(f"No recorded response for prompt {prompt_hash[:12]} in {self.corpus.directory}")
+        return response
+
+
+def create_provider(api_key: str, model_name: str, generation_config: Dict[str, Any]) -> LLMProvider:
+    """
+    Builds the provider selected by LLM_PROVIDER:
+    - gemini (default): the live model
+    - record: the live model, recording responses to LLM_CORPUS_DIR
+    - replay: recorded responses from LLM_CORPUS_DIR, with LLM_REPLAY_LATENCY_MS,
+      LLM_REPLAY_JITTER_MS, LLM_REPLAY_ERROR_RATE, LLM_REPLAY_SEED and LLM_REPLAY_CHUNK_CHARS
+    """
+
+    mode = os.getenv("LLM_PROVIDER", "gemini").lower()
+    corpus_dir = os.getenv("LLM_CORPUS_DIR", "llm_corpus")
+
+    if mode == "gemini":
+        return GeminiProvider(api_key, model_name, generation_config)
+    if mode == "record":
+        return RecordingProvider(
+            GeminiProvider(api_key, model_name, generation_config),
+            PromptCorpus(corpus_dir),
+            model_name
+        )
+    if mode == "replay":
+        return _replay_provider(
+            corpus_dir,
+            float(os.getenv("LLM_REPLAY_LATENCY_MS", "0")),
+            float(os.getenv("LLM_REPLAY_JITTER_MS", "0")),
+            float(os.getenv("LLM_REPLAY_ERROR_RATE", "0")),
+            int(os.getenv("LLM_REPLAY_SEED", "0")),
+            int(os.getenv("LLM_REPLAY_CHUNK_CHARS", "200"))
+        )
+    raise ValueError(f"Unknown LLM_PROVIDER '{mode}' (expected gemini, record or replay)")
+
+
+@functools.lru_cache(maxsize=None)
+def _replay_provider(
+    corpus_dir: str,
+    latency_ms: float,
+    jitter_ms: float,
+    error_rate: float,
+    seed: int,
+    chunk_chars: int
+) -> ReplayProvider:
+    """One replay provider per configuration, so the seeded draws continue across requests"""
+    return ReplayProvider(PromptCorpus(corpus_dir), latency_ms, jitter_ms, error_rate, seed, chunk_chars)
@@ -0,0 +1,236 @@
+import math
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+
+# Error kinds
+RATE_LIMIT = "rate_limit"
+TRANSIENT = "transient"
+PERMANENT = "permanent"
+
+_RATE_LIMIT_STATUS = {429}
+_TRANSIENT_STATUS = {408, 500, 502, 503, 504}
+_PERMANENT_STATUS = {400, 401, 403, 404}
+
+_RATE_LIMIT_NAMES = {"ResourceExhausted", "TooManyRequests"}
+_TRANSIENT_NAMES = {
+    "ServiceUnavailable", "InternalServerError", "DeadlineExceeded", "GatewayTimeout",
+    "BadGateway", "Aborted", "RetryError", "TimeoutError", "ConnectionError",
+}
+_PERMANENT_NAMES = {
+    "InvalidArgument", "PermissionDenied", "Unauthenticated", "Unauthorized", "NotFound",
+    "FailedPrecondition", "BlockedPromptException", "StopCandidateException",
+}
+
+_RETRY_IN = re.compile(r'retry (?:in|after) ([\d.]+)\s*s', re.IGNORECASE)
+_RETRY_DELAY = re.compile(r'retry_delay\s*\{\s*seconds:\s*(\d+)', re.IGNORECASE)
+
+_jitter = random.Random()
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling the model while the circuit breaker is open"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"AI service temporarily unavailable; retry in {math.ceil(retry_after)}s")
+        self.retry_after = retry_after
+
+
+def classify(error: BaseException) -> str:
+    """
+    RATE_LIMIT, TRANSIENT or PERMANENT, from the HTTP status when the error carries one,
+    else from the exception type. Bad keys, blocked prompts and unparseable output are
+    permanent: repeating the same call would fail the same way.
+    """
+
+    code = getattr(error, "code", None)
+    if isinstance(code, int):
+        if code in _RATE_LIMIT_STATUS:
+            return RATE_LIMIT
+        if code in _TRANSIENT_STATUS:
+            return TRANSIENT
+        if code in _PERMANENT_STATUS:
+            return PERMANENT
+
+    names = {cls.__name__ for cls in type(error).__mro__}
+    if names & _RATE_LIMIT_NAMES:
+        return RATE_LIMIT
+    if names & _PERMANENT_NAMES:
+        return PERMANENT
+    if names & _TRANSIENT_NAMES:
+        return TRANSIENT
+
+    message = str(error).lower()
+    if "429" in message or "quota" in message or "rate limit" in message:
+        return RATE_LIMIT
+
+    # JSONDecodeError, response.text on a blocked answer, a missing replay recording, ...
+    if isinstance(error, (ValueError, LookupError, TypeError)):
+        return PERMANENT
+    return TRANSIENT
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Server-suggested wait in seconds: RetryInfo details, a Retry-After header, or the message"""
+
+    for detail in getattr(error, "details", None) or []:
+        delay = getattr(detail, "retry_delay", None)
+        if delay is not None and hasattr(delay, "seconds"):
+            return delay.seconds + getattr(delay, "nanos", 0) / 1e9
+
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers is not None:
+        value = headers.get("Retry-After") or headers.get("retry-after")
+        if value is not None:
+            try:
+                return float(value)
+            except ValueError:
+                pass
+
+    message = str(error)
+    match = _RETRY_IN.search(message) or _RETRY_DELAY.search(message)
+    return float(match.group(1)) if match else None
+
+
+class RetryPolicy:
+    """
+    Capped exponential backoff with full jitter: attempt n waits a uniform random time
+    in [0, min(max_delay, base_delay * 2**n)], so clients that failed together do not
+    retry together. A server retry-after hint is a floor; if it exceeds max_delay,
+    the call gives up instead of holding the request.
+    """
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 1.0, max_delay: float = 30.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    @classmethod
+    def from_env(cls) -> "RetryPolicy":
+        return cls(
+            max_attempts=int(os.getenv("LLM_MAX_ATTEMPTS", "3")),
+            base_delay=float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "1")),
+            max_delay=float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "30"))
+        )
+
+    def delay(self, attempt: int, kind: str, hint: Optional[float] = None) -> Optional[float]:
+        """Seconds to wait after failed attempt (0-based), or None to stop retrying"""
+        if kind == PERMANENT or attempt + 1 >= self.max_attempts:
+            return None
+        backoff = _jitter.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if hint is None:
+            return backoff
+        if hint > self.max_delay:
+            return None
+        return max(hint, backoff)
+
+
+class CircuitBreaker:
+    """
+    Fails LLM calls fast while the service is unhealthy.
+
+    closed     calls flow; outcomes of the last `window` calls are kept
+    open       once at least `min_calls` are recorded and the share of rate-limit and
+               transient failures reaches `failure_rate`; calls fail immediately
+    half_open  after `cooldown` seconds one probe call is let through:
+               success closes the breaker, failure opens it again
+
+    Permanent failures (a bad key, unparseable output) say nothing about the
+    service's health and count as successes here.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_rate: float = 0.5, window: int = 20, min_calls: int = 10, cooldown: float = 30.0):
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self._outcomes = deque(maxlen=window)
+        self._state = CircuitBreaker.CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._times_opened = 0
+        self._rejected = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "CircuitBreaker":
+        return cls(
+            failure_rate=float(os.getenv("LLM_BREAKER_FAILURE_RATE", "0.5")),
+            window=int(os.getenv("LLM_BREAKER_WINDOW", "20")),
+            min_calls=int(os.getenv("LLM_BREAKER_MIN_CALLS", "10")),
+            cooldown=float(os.getenv("LLM_BREAKER_COOLDOWN_SECONDS", "30"))
+        )
+
+    def before_call(self) -> None:
+        """Raises CircuitOpenError unless a call may go ahead"""
+        with self._lock:
+            if self._state == CircuitBreaker.OPEN:
+                waited = time.monotonic() - self._opened_at
+                if waited < self.cooldown:
+                    self._rejected += 1
+                    raise CircuitOpenError(self.cooldown - waited)
+                self._state = CircuitBreaker.HALF_OPEN
+            if self._state == CircuitBreaker.HALF_OPEN:
+                if self._probe_in_flight:
+                    self._rejected += 1
+                    raise CircuitOpenError(1.0)
+                self._probe_in_flight = True
+
+    def record(self, kind: Optional[str]) -> None:
+        """Outcome of a call allowed by before_call: None for success, else the error kind"""
+        failed = kind in (RATE_LIMIT, TRANSIENT)
+        with self._lock:
+            if self._state == CircuitBreaker.HALF_OPEN:
+                self._probe_in_flight = False
+                if failed:
+                    self._open()
+                else:
+                    self._state = CircuitBreaker.CLOSED
+                    self._outcomes.clear()
+                return
+
+            self._outcomes.append(failed)
+            if (
+                self._state == CircuitBreaker.CLOSED
+                and len(self._outcomes) >= self.min_calls
+                and sum(self._outcomes) / len(self._outcomes) >= self.failure_rate
+            ):
+                self._open()
+
+    def abandon(self) -> None:
+        """A call allowed by before_call ended without an outcome (e.g. cancelled)"""
+        with self._lock:
+            if self._state == CircuitBreaker.HALF_OPEN:
+                self._probe_in_flight = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            state = self._state
+            if state == CircuitBreaker.OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                state = CircuitBreaker.HALF_OPEN
+            recent = len(self._outcomes)
+            return {
+                "state": state,
+                "recent_calls": recent,
+                "recent_failure_rate": round(sum(self._outcomes) / recent, 4) if recent else 0.0,
+                "failure_rate_threshold": self.failure_rate,
+                "times_opened": self._times_opened,
+                "rejected_calls": self._rejected,
+                "retry_after_seconds": round(max(0.0, self.cooldown - (time.monotonic() - self._opened_at)), 1)
+                if state == CircuitBreaker.OPEN else 0.0
+            }
+
+    def _open(self) -> None:
+        self._state = CircuitBreaker.OPEN
+        self._opened_at = time.monotonic()
+        self._times_opened += 1
+        self._outcomes.clear()
@@ -0,0 +1,53 @@
+"""
+t-way combinatorial generation: suite size and time vs strength and input count.
+
+Parameters are the valid BVA/EP values of synthetic inputs, exactly as
+TestCaseBuilder feeds them to CombinatorialEngine. "exhaustive" is the size
+of the full cartesian product the covering array replaces.
+
+Run from backend/:  python -m benchmarks.bench_pairwise [--inputs 10 20 40] [--strengths 2 3]
+"""
+import argparse
+import math
+import time
+
+from benchmarks.synthetic import make_inputs
+from services.combinatorial_engine import CombinatorialEngine
+from services.input_value_generator import InputValueGenerator
+
+
+def parameters_for(input_count: int, enum_size: int):
+    parameters = {}
+    for inp in make_inputs(input_count, enum_size=enum_size):
+        values = InputValueGenerator.generate_combinatorial_values(inp)
+        if len(values) > 1:
+            parameters[inp.name] = values
+    return parameters
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--inputs", type=int, nargs="+", default=[10, 20, 40])
+    parser.add_argument("--strengths", type=int, nargs="+", default=[2, 3])
+    parser.add_argument("--enum-size", type=int, default=4)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'inputs':>7} {'varying':>8} {'t':>3} {'rows':>7} {'exhaustive':>12} {'time ms':>10}")
+    for input_count in args.inputs:
+        parameters = parameters_for(input_count, args.enum_size)
+        exhaustive = math.prod(len(values) for values in parameters.values())
+        for strength in args.strengths:
+            timings = []
+            for _ in range(args.repeats):
+                start = time.perf_counter()
+                rows = CombinatorialEngine.generate_combinations(parameters, strength)
+                timings.append(time.perf_counter() - start)
+            print(
+                f"{input_count:>7} {len(parameters):>8} {strength:>3} {len(rows):>7} "
+                f"{exhaustive:>12.2e} {min(timings) * 1000:>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Parallel generation: serial TestCaseBuilder vs ParallelSuiteBuilder per worker count.
+
+Each worker count gets its own warmed-up process pool, so pool start-up is not
+timed. Output is checked to be identical to the serial build.
+
+Run from backend/:  python -m benchmarks.bench_parallel [--rules 200] [--workers 1 2 4 8]
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.synthetic import make_inputs, make_outputs, make_rules
+from models.schemas import InputDefinition
+from services.parallel_builder import ParallelSuiteBuilder, pool_context
+from services.test_case_builder import TestCaseBuilder
+
+
+STRATEGIES = ["BVA", "EP", "NEGATIVE", "PAIRWISE", "STATE"]
+
+
+def build_requirement(rule_count: int, input_count: int):
+    inputs = make_inputs(input_count)
+    inputs.append(InputDefinition(
+        name="system_mode",
+        data_type="string",
+        allowed_values=[f"S{i}" for i in range(12)]
+    ))
+    rules = make_rules(rule_count, inputs)
+    strategies = {rule.rule_id: list(STRATEGIES) for rule in rules}
+    return rules, inputs, make_outputs(), strategies
+
+
+def best_of(repeats: int, fn):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rules", type=int, default=200)
+    parser.add_argument("--inputs", type=int, default=30)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    rules, inputs, outputs, strategies = build_requirement(args.rules, args.inputs)
+
+    serial_time, serial_suite = best_of(
+        args.repeats,
+        lambda: TestCaseBuilder().build_suite(rules, inputs, outputs, strategies, "BENCH")
+    )
+    expected = list(serial_suite.iter_dicts())
+
+    print(f"cpus: {os.cpu_count()}  rules: {len(rules)}  cases: {len(serial_suite)}")
+    print(f"{'workers':>8} {'time ms':>10} {'speedup':>8} {'identical':>10}")
+    print(f"{'serial':>8} {serial_time * 1000:>10.1f} {'1.0x':>8} {'':>10}")
+
+    for workers in args.workers:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=pool_context()) as pool:
+            # Warm up: start the workers and import the services in each
+            list(pool.map(abs, range(workers)))
+            parallel_time, suite = best_of(
+                args.repeats,
+                lambda: ParallelSuiteBuilder.build_suite(
+                    rules, inputs, outputs, strategies, "BENCH", pool=pool, workers=workers
+                )
+            )
+        identical = list(suite.iter_dicts()) == expected
+        print(f"{workers:>8} {parallel_time * 1000:>10.1f} {serial_time / parallel_time:>7.1f}x {str(identical):>10}")
+
+
+if __name__ == "__main__":
+    main()
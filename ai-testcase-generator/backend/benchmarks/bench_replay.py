@@ -0,0 +1,133 @@
+"""
+Full /generate-test-cases path against recorded LLM responses, offline.
+
+Without --corpus, a corpus of synthetic interpretations is recorded into a temporary
+directory first. Requests go through the FastAPI app in-process with LLM_PROVIDER=replay,
+so interpretation, validation, generation and serialization are all timed, minus the
+network. The interpretation cache is bypassed on every request.
+
+With --incremental, requests stream the recorded answer in LLM_REPLAY_CHUNK_CHARS chunks, with the
+latency spread across them, and build each rule's cases as it arrives.
+
+Run from backend/:  python -m benchmarks.bench_replay [--requests 200] [--latency-ms 0] [--error-rate 0] [--incremental]
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.synthetic import make_inputs, make_interpretation, make_outputs, make_rules
+from ai.gemini_client import GeminiClient
+from ai.prompts import PromptTemplate
+from ai.providers import LLMProvider, LLMResponse, PromptCorpus, RecordingProvider
+
+
+class CannedProvider(LLMProvider):
+    """Answers each known prompt with a fixed synthetic interpretation"""
+
+    name = "canned"
+
+    def __init__(self, responses):
+        self.responses = responses
+
+    def generate(self, prompt: str) -> LLMResponse:
+        return LLMResponse(self.responses[prompt])
+
+
+def make_requests(count: int, input_count: int, prompt: PromptTemplate = None):
+    """Distinct requirements with 1..10 rules each, plus the canned response for each prompt"""
+    prompt = prompt or GeminiClient.PROMPT
+    inputs = make_inputs(input_count)
+    outputs = make_outputs()
+    requests, responses = [], {}
+    for i in range(count):
+        requirement_id = f"REQ-{i + 1:03d}"
+        text = f"Synthetic requirement {i + 1}: raise the alarm above each threshold."
+        rules = make_rules(i % 10 + 1, inputs)
+        body = {
+            "requirement_id": requirement_id,
+            "requirement_text": text,
+            "inputs": [inp.model_dump() for inp in inputs],
+            "outputs": [out.model_dump() for out in outputs],
+            "gemini_api_key": "replay",
+            "bypass_cache": True
+        }
+        prompt_text = prompt.build(requirement_id, text, body["inputs"], body["outputs"])
+        responses[prompt_text] = make_interpretation(requirement_id, rules).model_dump_json()
+        requests.append(body)
+    return requests, responses
+
+
+def record_corpus(directory: str, responses) -> None:
+    recorder = RecordingProvider(CannedProvider(responses), PromptCorpus(directory), "synthetic")
+    for prompt in responses:
+        recorder.generate(prompt)
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--distinct", type=int, default=20, help="distinct requirements, cycled")
+    parser.add_argument("--inputs", type=int, default=8)
+    parser.add_argument("--corpus", help="existing corpus directory (default: record a synthetic one)")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--incremental", action="store_true", help="stream answers and overlap the build")
+    parser.add_argument("--chunk-chars", type=int, default=200)
+    args = parser.parse_args()
+
+    requests, responses = make_requests(args.distinct, args.inputs)
+    corpus_dir = args.corpus or tempfile.mkdtemp(prefix="llm_corpus_")
+    if not args.corpus:
+        record_corpus(corpus_dir, responses)
+
+    os.environ.update({
+        "LLM_PROVIDER": "replay",
+        "LLM_CORPUS_DIR": corpus_dir,
+        "LLM_REPLAY_LATENCY_MS": str(args.latency_ms),
+        "LLM_REPLAY_JITTER_MS": str(args.jitter_ms),
+        "LLM_REPLAY_ERROR_RATE": str(args.error_rate),
+        "LLM_REPLAY_SEED": str(args.seed),
+        "LLM_REPLAY_CHUNK_CHARS": str(args.chunk_chars),
+        "INTERPRETATION_CACHE_PATH": ""
+    })
+
+    from fastapi.testclient import TestClient
+    import main as app_module
+
+    client = TestClient(app_module.app)
+    timings, failures, cases = [], 0, 0
+    start = time.perf_counter()
+    for i in range(args.requests):
+        body = dict(requests[i % len(requests)], incremental=args.incremental)
+        t0 = time.perf_counter()
+        response = client.post("/generate-test-cases", content=json.dumps(body))
+        timings.append(time.perf_counter() - t0)
+        if response.status_code == 200:
+            cases += len(response.json()["test_cases"])
+        else:
+            failures += 1
+    elapsed = time.perf_counter() - start
+
+    timings.sort()
+    print(f"corpus: {corpus_dir} ({len(PromptCorpus(corpus_dir))} entries)")
+    print(f"requests: {args.requests}  failed: {failures}  test cases: {cases}")
+    print(f"throughput: {args.requests / elapsed:.1f} req/s")
+    print(
+        f"latency ms  mean {statistics.mean(timings) * 1000:.1f}"
+        f"  p50 {percentile(timings, 0.50) * 1000:.1f}"
+        f"  p95 {percentile(timings, 0.95) * 1000:.1f}"
+        f"  max {timings[-1] * 1000:.1f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
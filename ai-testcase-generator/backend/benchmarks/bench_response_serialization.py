@@ -0,0 +1,108 @@
+"""
+Response serialization: default path vs fast path.
+
+Default: materialize TestCase models -> GenerateTestCasesResponse -> FastAPI
+         response_model validation/serialization -> JSONResponse
+Fast:    TestSuiteStore columns -> ResponseSerializer (orjson when installed)
+
+Run from backend/:  python -m benchmarks.bench_response_serialization [--sizes 1000 10000 50000]
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+from datetime import datetime
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+
+from benchmarks.synthetic import (
+    make_inputs, make_outputs, make_rules, make_interpretation, basic_strategies
+)
+from models.schemas import GenerateTestCasesResponse
+from services.coverage_engine import CoverageEngine
+from services.response_serializer import ResponseSerializer, orjson
+from services.test_case_builder import TestCaseBuilder
+
+
+INPUT_COUNT = 20
+
+
+def build_parts(target_cases: int):
+    inputs = make_inputs(INPUT_COUNT)
+    outputs = make_outputs()
+    per_rule = len(TestCaseBuilder().build_suite(
+        make_rules(1, inputs), inputs, outputs, basic_strategies(make_rules(1, inputs)), "BENCH"
+    ))
+    rules = make_rules(max(1, round(target_cases / per_rule)), inputs)
+    suite = TestCaseBuilder().build_suite(rules, inputs, outputs, basic_strategies(rules), "BENCH")
+    interpretation = make_interpretation("BENCH", rules)
+    matrix = CoverageEngine.generate_traceability_matrix(rules, suite)
+    report = CoverageEngine.generate_coverage_report(rules, suite, "BENCH")
+    return interpretation, suite, matrix, report
+
+
+def default_path(interpretation, suite, matrix, report, response_field) -> bytes:
+    response = GenerateTestCasesResponse(
+        interpretation=interpretation,
+        test_cases=suite.to_test_cases(),
+        traceability_matrix=matrix,
+        coverage_report=report,
+        generation_timestamp=datetime.utcnow().isoformat()
+    )
+    content = asyncio.run(serialize_response(field=response_field, response_content=response))
+    return JSONResponse(content).body
+
+
+def fast_path(interpretation, suite, matrix, report, response_field) -> bytes:
+    return ResponseSerializer.encode_generation(
+        interpretation, suite, matrix, report, datetime.utcnow().isoformat()
+    )
+
+
+def measure(fn, parts, repeats: int):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        body = fn(*parts)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn(*parts)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(timings), peak, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    # Same response_model declaration as /generate-test-cases, without importing the app
+    bench_app = FastAPI()
+
+    @bench_app.post("/generate-test-cases", response_model=GenerateTestCasesResponse)
+    def endpoint():
+        pass
+
+    route = bench_app.routes[-1]
+
+    print(f"encoder: {'orjson' if orjson is not None else 'json (orjson not installed)'}")
+    print(f"{'cases':>8} {'path':>8} {'time ms':>10} {'peak MB':>9} {'body MB':>9} {'speedup':>8}")
+    for size in args.sizes:
+        interpretation, suite, matrix, report = build_parts(size)
+        parts = (interpretation, suite, matrix, report, route.response_field)
+        default_time, default_peak, default_bytes = measure(default_path, parts, args.repeats)
+        fast_time, fast_peak, fast_bytes = measure(fast_path, parts, args.repeats)
+        for name, t, peak, nbytes, speedup in (
+            ("default", default_time, default_peak, default_bytes, ""),
+            ("fast", fast_time, fast_peak, fast_bytes, f"{default_time / fast_time:.1f}x"),
+        ):
+            print(f"{len(suite):>8} {name:>8} {t * 1000:>10.1f} {peak / 2**20:>9.1f} {nbytes / 2**20:>9.2f} {speedup:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+A/B comparison of prompt versions (ai/prompts.py) on the same requirements.
+
+Every requirement is interpreted once per version, one call at a time, and the suite
+reports per version: prompt and completion tokens, model latency, and how many answers
+passed validation. Token counts come from the model where it reports them and are
+estimated (about 4 characters per token) otherwise.
+
+By default the requirements are synthetic and answered by canned interpretations, which
+compares prompt size only. With --live, calls go to the provider selected by LLM_PROVIDER:
+the live model (GEMINI_API_KEY), or a corpus recorded for each version with LLM_PROVIDER=record
+and replayed with LLM_PROVIDER=replay.
+
+Run from backend/:
+  python -m benchmarks.compare_prompts
+  python -m benchmarks.compare_prompts --live --requirements reqs.json --versions 1 2
+reqs.json is a list of {"requirement_id", "requirement_text", "inputs", "outputs"} objects.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+from typing import Any, Dict, List
+
+from ai.gemini_client import GeminiClient
+from ai.prompts import PROMPTS
+from ai.providers import UsageMeter, create_provider
+from benchmarks.bench_replay import CannedProvider, make_requests, percentile
+from validators.ai_output_validator import AIOutputValidator
+
+
+def run_version(client: GeminiClient, requirements: List[Dict[str, Any]]) -> Dict[str, Any]:
+    validator = AIOutputValidator()
+    meters, failures, valid = [], 0, 0
+    for req in requirements:
+        meter = UsageMeter()
+        try:
+            result = client.interpret_requirement(
+                req["requirement_id"], req["requirement_text"], req["inputs"], req["outputs"], meter
+            )
+            valid += validator.validate_interpretation(result)[0]
+        except Exception:
+            failures += 1
+        meters.append(meter)
+
+    latencies = sorted(meter.seconds * 1000 for meter in meters)
+    return {
+        "requests": len(requirements),
+        "failed": failures,
+        "valid": valid,
+        "prompt_tokens": sum(meter.prompt_tokens for meter in meters),
+        "completion_tokens": sum(meter.completion_tokens for meter in meters),
+        "estimated": any(meter.estimated for meter in meters),
+        "latency_mean_ms": statistics.mean(latencies) if latencies else 0.0,
+        "latency_p95_ms": percentile(latencies, 0.95) if latencies else 0.0,
+    }
+
+
+def change(current: float, reference: float) -> str:
+    return f"{(current - reference) / reference:+.0%}" if reference else "n/a"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--versions", nargs="+", choices=sorted(PROMPTS), default=sorted(PROMPTS))
+    parser.add_argument("--requirements", help="JSON file of requirements (default: synthetic)")
+    parser.add_argument("--count", type=int, default=20, help="synthetic requirements")
+    parser.add_argument("--inputs", type=int, default=8, help="inputs per synthetic requirement")
+    parser.add_argument("--live", action="store_true", help="call the provider selected by LLM_PROVIDER")
+    args = parser.parse_args()
+
+    if args.requirements:
+        if not args.live:
+            parser.error("--requirements needs --live; canned answers exist only for synthetic requirements")
+        with open(args.requirements, "r", encoding="utf-8") as f:
+            requirements = json.load(f)
+    else:
+        requirements, _ = make_requests(args.count, args.inputs)
+
+    if args.live:
+        provider = create_provider(os.getenv("GEMINI_API_KEY", ""), GeminiClient.MODEL_NAME, GeminiClient.GENERATION_CONFIG)
+    else:
+        responses = {}
+        for version in args.versions:
+            responses.update(make_requests(args.count, args.inputs, PROMPTS[version])[1])
+        provider = CannedProvider(responses)
+
+    results = {
+        version: run_version(GeminiClient("", provider=provider, prompt=PROMPTS[version]), requirements)
+        for version in args.versions
+    }
+
+    reference = results[args.versions[0]]
+    print(f"{len(requirements)} requirements, provider: {provider.name}")
+    print(
+        f"{'version':<8} {'failed':>6} {'valid':>6} {'prompt tok':>11} {'compl tok':>10} "
+        f"{'total tok':>10} {'vs ' + args.versions[0]:>7} {'mean ms':>9} {'p95 ms':>9}"
+    )
+    for version, result in results.items():
+        total = result["prompt_tokens"] + result["completion_tokens"]
+        print(
+            f"{version:<8} {result['failed']:>6} {result['valid']:>6} {result['prompt_tokens']:>11} "
+            f"{result['completion_tokens']:>10} {total:>10} "
+            f"{change(total, reference['prompt_tokens'] + reference['completion_tokens']):>7} "
+            f"{result['latency_mean_ms']:>9.1f} {result['latency_p95_ms']:>9.1f}"
+        )
+    if any(result["estimated"] for result in results.values()):
+        print("token counts include estimates (the provider reported no usage)")
+    return 1 if any(result["failed"] for result in results.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
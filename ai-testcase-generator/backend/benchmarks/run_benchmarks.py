@@ -0,0 +1,207 @@
+"""
+Benchmark suite for the deterministic pipeline, stage by stage, with a regression verdict.
+
+Each scenario is a synthetic requirement (input count, rule count, enum size, state
+count, condition width). For every stage the suite records:
+  time_ms  best wall time over --repeats untraced runs
+  peak_kb  peak traced memory during one run (tracemalloc)
+  blocks   memory blocks still allocated after the run, i.e. what the stage's output holds
+
+Results are compared with benchmarks/baselines.json: a metric more than --threshold
+above its baseline (and above a small noise floor) is a regression, and the exit code is 1.
+Times depend on the machine, so record baselines on the machine that checks them.
+
+Run from backend/:
+  python -m benchmarks.run_benchmarks                    # compare with the baselines
+  python -m benchmarks.run_benchmarks --save-baseline    # record new baselines
+  python -m benchmarks.run_benchmarks --scenarios small --repeats 3
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from benchmarks.synthetic import make_requirement
+from services.coverage_engine import CoverageEngine
+from services.input_value_generator import InputValueGenerator
+from services.mcdc_engine import MCDCEngine
+from services.state_test_engine import StateTestEngine
+from services.test_case_builder import TestCaseBuilder
+from services.test_oracle import TestOracle
+from services.test_strategy_engine import TestStrategyEngine
+from services.test_suite_store import TestSuiteStore
+
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+
+SCENARIOS = {
+    "small": dict(inputs=5, rules=5, enum_size=3, states=4, width=2),
+    "medium": dict(inputs=20, rules=50, enum_size=6, states=8, width=4),
+    "wide": dict(inputs=30, rules=20, enum_size=8, states=16, width=12),
+}
+
+# Differences below these are noise, whatever the relative change
+NOISE_FLOOR = {"time_ms": 1.0, "peak_kb": 64.0, "blocks": 200}
+
+
+def make_stages(scenario: Dict[str, int]) -> Dict[str, Callable[[], Any]]:
+    """Stage name -> zero-argument callable running that stage on the scenario's requirement"""
+
+    inputs, outputs, rules = make_requirement(
+        scenario["inputs"], scenario["rules"], scenario["enum_size"], scenario["states"], scenario["width"]
+    )
+    requirement_id = "BENCH"
+    strategies = TestStrategyEngine.determine_strategies(rules, inputs, {})
+    suite = TestCaseBuilder().build_suite(rules, inputs, outputs, strategies, requirement_id)
+    machine = StateTestEngine.build_state_machine(rules, inputs)
+
+    # Oracle workload: the nominal vector with each valid BVA value substituted in turn
+    nominal = TestCaseBuilder()._nominal_vector(inputs)
+    vectors = [
+        {**nominal, inp.name: bva["value"]}
+        for inp in inputs
+        for bva in InputValueGenerator.generate_bva_values(inp)
+        if bva["validity"] == "VALID"
+    ]
+
+    def values():
+        return [
+            (
+                InputValueGenerator.generate_bva_values(inp),
+                InputValueGenerator.generate_ep_values(inp),
+                InputValueGenerator.generate_negative_values(inp),
+                InputValueGenerator.generate_combinatorial_values(inp),
+            )
+            for inp in inputs
+        ]
+
+    def oracle():
+        results = []
+        for rule in rules:
+            compiled = TestOracle.compile_rule(rule, inputs, outputs)
+            results.extend(compiled.evaluate(vector, True) for vector in vectors)
+        return results
+
+    def mcdc():
+        store = TestSuiteStore(requirement_id)
+        for rule in rules:
+            MCDCEngine.generate_mcdc_tests(rule, inputs, store)
+        return store
+
+    def state():
+        store = TestSuiteStore(requirement_id)
+        for rule in rules:
+            StateTestEngine.generate_state_tests(rule, inputs, outputs, store, nominal, machine)
+        return store
+
+    return {
+        "values": values,
+        "strategies": lambda: TestStrategyEngine.determine_strategies(rules, inputs, {}),
+        "oracle": oracle,
+        "mcdc": mcdc,
+        "state": state,
+        "build": lambda: TestCaseBuilder().build_suite(rules, inputs, outputs, strategies, requirement_id),
+        "coverage": lambda: CoverageEngine.analyze(rules, suite, requirement_id),
+    }
+
+
+def measure(fn: Callable[[], Any], repeats: int) -> Dict[str, float]:
+    timings = []
+    for _ in range(repeats):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+    del result
+
+    return {
+        "time_ms": round(min(timings) * 1000, 3),
+        "peak_kb": round(peak / 1024, 1),
+        "blocks": blocks,
+    }
+
+
+def verdict(metric: str, current: float, baseline: float, threshold: float) -> str:
+    if abs(current - baseline) <= NOISE_FLOOR[metric]:
+        return "ok"
+    if current > baseline * (1 + threshold):
+        return "REGRESSION"
+    if current < baseline * (1 - threshold):
+        return "improved"
+    return "ok"
+
+
+def run(scenario_names: List[str], repeats: int) -> Dict[str, Dict[str, Dict[str, float]]]:
+    results = {}
+    for name in scenario_names:
+        stages = make_stages(SCENARIOS[name])
+        results[name] = {stage: measure(fn, repeats) for stage, fn in stages.items()}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative increase (0.25 = 25%%)")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    results = run(args.scenarios, args.repeats)
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baselines = json.load(f)
+
+    regressions = 0
+    print(f"{'scenario':<8} {'stage':<10} {'time ms':>10} {'peak KB':>10} {'blocks':>9}  verdict")
+    for scenario, stages in results.items():
+        for stage, metrics in stages.items():
+            baseline = baselines.get(scenario, {}).get(stage)
+            if baseline is None:
+                verdicts = ["new"]
+            else:
+                verdicts = [
+                    f"{metric} {verdict(metric, metrics[metric], baseline[metric], args.threshold)}"
+                    for metric in NOISE_FLOOR
+                ]
+                verdicts = [v for v in verdicts if not v.endswith(" ok")] or ["ok"]
+                regressions += sum(v.endswith("REGRESSION") for v in verdicts)
+            print(
+                f"{scenario:<8} {stage:<10} {metrics['time_ms']:>10.2f} {metrics['peak_kb']:>10.1f} "
+                f"{metrics['blocks']:>9}  {', '.join(verdicts)}"
+            )
+
+    if args.save_baseline:
+        baselines.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"baselines saved to {args.baseline}")
+        return 0
+
+    if regressions:
+        print(f"{regressions} regression(s) beyond {args.threshold:.0%}")
+        return 1
+    print("no regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""Synthetic requirements for benchmarks; deterministic for a given set of parameters."""
+from typing import List, Dict, Tuple
+from models.schemas import (
+    Rule, InputDefinition, OutputDefinition, InterpretationResult, InterpretationStatus
+)
+
+
+NUMERIC_TYPES = ["int", "float"]
+
+
+def make_inputs(count: int, enum_size: int = 4, enum_every: int = 5) -> List[InputDefinition]:
+    """Mix of numeric, string, boolean and enum inputs"""
+    inputs = []
+    for i in range(count):
+        if enum_every and i % enum_every == enum_every - 1:
+            inputs.append(InputDefinition(
+                name=f"mode_{i}",
+                data_type="string",
+                allowed_values=[f"V{j}" for j in range(enum_size)]
+            ))
+        elif i % 4 == 2:
+            inputs.append(InputDefinition(name=f"label_{i}", data_type="string"))
+        elif i % 4 == 3:
+            inputs.append(InputDefinition(name=f"enabled_{i}", data_type="bool"))
+        else:
+            inputs.append(InputDefinition(
+                name=f"value_{i}",
+                data_type=NUMERIC_TYPES[i % 2],
+                range_min=0,
+                range_max=1000 * (i + 1)
+            ))
+    return inputs
+
+
+def make_outputs() -> List[OutputDefinition]:
+    return [OutputDefinition(name="alarm", data_type="bool")]
+
+
+def make_rules(count: int, inputs: List[InputDefinition]) -> List[Rule]:
+    """Threshold rules over the first numeric input"""
+    target = next((inp.name for inp in inputs if inp.data_type in NUMERIC_TYPES), "value")
+    return [
+        Rule(
+            rule_id=f"R{i + 1}",
+            condition=f"when {target} > {(i + 1) * 10}",
+            expected_behavior="alarm shall be raised"
+        )
+        for i in range(count)
+    ]
+
+
+def make_state_input(state_count: int) -> InputDefinition:
+    """Enum input the state transition engine picks up, with states S0..S{n-1}"""
+    return InputDefinition(
+        name="system_state",
+        data_type="string",
+        allowed_values=[f"S{i}" for i in range(state_count)]
+    )
+
+
+def make_compound_rules(count: int, inputs: List[InputDefinition], width: int) -> List[Rule]:
+    """
+    Rules whose conditions join `width` atomic conditions over numeric, boolean and
+    enum inputs with alternating and/or, so MC/DC and the oracle see wide decisions.
+    Every fourth rule also names a state transition when a state input is present.
+    """
+
+    operands = [inp for inp in inputs if inp.name != "system_state"]
+    states = next((inp.allowed_values for inp in inputs if inp.name == "system_state"), None)
+    rules = []
+    for i in range(count):
+        atoms = []
+        for j in range(width):
+            inp = operands[(i + j) % len(operands)]
+            if inp.data_type in NUMERIC_TYPES:
+                atoms.append(f"{inp.name} > {int((inp.range_max or 100) * (j + 1) / (width + 1))}")
+            elif inp.data_type == "bool":
+                atoms.append(f"{inp.name} is {'true' if j % 2 == 0 else 'false'}")
+            elif inp.allowed_values:
+                atoms.append(f"{inp.name} is {inp.allowed_values[j % len(inp.allowed_values)]}")
+            else:
+                atoms.append(f"{inp.name} is VALID")
+        condition = atoms[0]
+        for j, atom in enumerate(atoms[1:]):
+            condition += (" and " if j % 2 == 0 else " or ") + atom
+        behavior = "alarm shall be raised"
+        if states and i % 4 == 3:
+            behavior = f"system shall transition from {states[i % len(states)]} to {states[(i + 1) % len(states)]}"
+        rules.append(Rule(rule_id=f"R{i + 1}", condition=f"when {condition}", expected_behavior=behavior))
+    return rules
+
+
+def make_requirement(
+    input_count: int,
+    rule_count: int,
+    enum_size: int = 4,
+    state_count: int = 0,
+    condition_width: int = 1
+) -> Tuple[List[InputDefinition], List[OutputDefinition], List[Rule]]:
+    """Inputs, outputs and rules of one synthetic requirement"""
+    inputs = make_inputs(input_count, enum_size=enum_size)
+    if state_count:
+        inputs.append(make_state_input(state_count))
+    if condition_width > 1:
+        rules = make_compound_rules(rule_count, inputs, condition_width)
+    else:
+        rules = make_rules(rule_count, inputs)
+    return inputs, make_outputs(), rules
+
+
+def make_interpretation(requirement_id: str, rules: List[Rule]) -> InterpretationResult:
+    return InterpretationResult(
+        requirement_id=requirement_id,
+        interpretation_status=InterpretationStatus.OK,
+        interpreted_requirement="Synthetic benchmark requirement",
+        rules=rules,
+        constraints=[],
+        boundary_values={},
+        assumptions=[],
+        ambiguities=[]
+    )
+
+
+def basic_strategies(rules: List[Rule]) -> Dict[str, List[str]]:
+    return {rule.rule_id: ["BVA", "EP", "NEGATIVE"] for rule in rules}
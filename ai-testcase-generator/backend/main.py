@@ -1,17 +1,47 @@
-from fastapi import FastAPI, HTTPException
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import FastAPI, Header, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from starlette.concurrency import iterate_in_threadpool
 from datetime import datetime
 from models.schemas import (
     GenerateTestCasesRequest,
     GenerateTestCasesResponse,
-    InterpretationStatus
+    BatchGenerateTestCasesRequest,
+    BatchGenerateTestCasesResponse,
+    JobInfo
 )
+from services.generation_pipeline import GenerationPipeline
+from services.interpretation_cache import InterpretationCache
+from services.job_queue import JobQueue, JobStore
 from services.requirement_interpreter import RequirementInterpreter
-from services.test_strategy_engine import TestStrategyEngine
-from services.test_case_builder import TestCaseBuilder
-from services.coverage_engine import CoverageEngine
+from services.metrics import Metrics
+from services.profiling import Profiler
+from ai.gemini_client import GeminiClient
+from ai.providers import UsageMeter
+from ai.resilience import CircuitOpenError
 
-app = FastAPI(title="AI Test Case Generator API")
+# Shared across requests; the SQLite tier is shared across workers
+interpretation_cache = InterpretationCache.from_env()
+
+# Background jobs; the SQLite store keeps them across restarts
+job_queue = JobQueue(JobStore.from_env(), interpretation_cache)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await job_queue.start()
+    try:
+        yield
+    finally:
+        await job_queue.stop()
+
+
+app = FastAPI(title="AI Test Case Generator API", lifespan=lifespan)
 
 # Enable CORS for frontend
 app.add_middleware(
@@ -31,6 +61,36 @@ app.add_middleware(
 )
 
 
+@app.middleware("http")
+async def instrument_request(request: Request, call_next):
+    """
+    Times every request by stage; the breakdown is returned in a Server-Timing header.
+    Streaming responses only report what ran before the headers were sent.
+    
+    Requests carrying the profiling admin token are also profiled stage by stage
+    (see services/profiling.py); X-Profile-Id names the directory holding the results.
+    """
+    timings, token = Metrics.begin_request()
+    profile = None
+    if Profiler.requested(request.headers, request.query_params):
+        profile, profile_token = Profiler.begin(f"{request.method} {request.url.path}")
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        timings.add("total", time.perf_counter() - start)
+        response.headers["Server-Timing"] = timings.server_timing()
+        if profile is not None:
+            response.headers["X-Profile-Id"] = os.path.basename(profile.directory)
+        return response
+    finally:
+        if profile is not None:
+            Profiler.end(profile, profile_token, status)
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        Metrics.end_request(token, route, status, time.perf_counter() - start)
+
+
 @app.get("/")
 async def root():
     return {
@@ -42,11 +102,41 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "timestamp": datetime.utcnow().isoformat()}
+    # Still 200 while the AI circuit is open: the service is up, AI calls fail fast
+    breaker = GeminiClient.breaker.snapshot()
+    return {
+        "status": "healthy" if breaker["state"] == "closed" else "degraded",
+        "timestamp": datetime.utcnow().isoformat(),
+        "ai_circuit_breaker": breaker
+    }
+
+
+def service_unavailable(error: CircuitOpenError) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail=str(error),
+        headers={"Retry-After": str(math.ceil(error.retry_after))}
+    )
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    stats = interpretation_cache.stats()
+    stats["single_flight"] = RequirementInterpreter.flights.stats()
+    return stats
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Stage, technique, LLM and request histograms in the Prometheus text format (this process only)"""
+    return PlainTextResponse(Metrics.render(), media_type="text/plain; version=0.0.4")
 
 
 @app.post("/generate-test-cases", response_model=GenerateTestCasesResponse)
-async def generate_test_cases(request: GenerateTestCasesRequest):
+async def generate_test_cases(
+    request: GenerateTestCasesRequest,
+    fast: bool = Query(False, description="Serialize straight from the suite store, skipping response re-validation")
+):
     """
     Main endpoint for test case generation
     
@@ -62,86 +152,115 @@ async def generate_test_cases(request: GenerateTestCasesRequest):
     """
     
     try:
-        # Step 1: Interpret requirement using AI
-        interpreter = RequirementInterpreter(request.gemini_api_key)
-        
-        inputs_dict = [inp.dict() for inp in request.inputs]
-        outputs_dict = [out.dict() for out in request.outputs]
-        
-        interpretation = interpreter.interpret(
-            request.requirement_id,
-            request.requirement_text,
-            inputs_dict,
-            outputs_dict
-        )
-        
-        # Step 2: Check if interpretation is BLOCKED
-        if interpretation.interpretation_status == InterpretationStatus.BLOCKED:
-            return GenerateTestCasesResponse(
-                interpretation=interpretation,
-                test_cases=[],
-                traceability_matrix={
-                    "requirement_id": request.requirement_id,
-                    "rule_coverage": {}
-                },
-                coverage_report={
-                    "requirement_id": request.requirement_id,
-                    "total_rules": len(interpretation.rules),
-                    "rules_covered": 0,
-                    "coverage_percentage": 0.0,
-                    "techniques_used": [],
-                    "valid_test_count": 0,
-                    "invalid_test_count": 0,
-                    "total_test_count": 0
-                },
-                generation_timestamp=datetime.utcnow().isoformat()
-            )
-        
-        # Step 3: Determine test strategies
-        strategies = TestStrategyEngine.determine_strategies(
-            interpretation.rules,
-            request.inputs,
-            interpretation.boundary_values
-        )
+        if fast:
+            body = await GenerationPipeline.run_json(request, interpretation_cache)
+            return Response(content=body, media_type="application/json")
         
-        # Step 4: Generate test cases with intelligent output inference
-        builder = TestCaseBuilder()
-        test_cases = builder.build_test_cases(
-            interpretation.rules,
-            request.inputs,
-            request.outputs,
-            strategies,
-            request.requirement_id
-        )
-        
-        # Step 5: Generate traceability matrix
-        traceability_matrix = CoverageEngine.generate_traceability_matrix(
-            interpretation.rules,
-            test_cases
-        )
-        
-        # Step 6: Generate coverage report
-        coverage_report = CoverageEngine.generate_coverage_report(
-            interpretation.rules,
-            test_cases,
-            request.requirement_id
-        )
-        
-        # Step 7: Return complete response
-        return GenerateTestCasesResponse(
-            interpretation=interpretation,
-            test_cases=test_cases,
-            traceability_matrix=traceability_matrix,
-            coverage_report=coverage_report,
-            generation_timestamp=datetime.utcnow().isoformat()
-        )
+        return await GenerationPipeline.run(request, interpretation_cache)
     
+    except CircuitOpenError as e:
+        raise service_unavailable(e)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
+@app.post("/generate-test-cases/stream")
+async def generate_test_cases_stream(
+    request: GenerateTestCasesRequest,
+    format: str = Query("ndjson", pattern="^(ndjson|sse)$")
+):
+    """
+    Streaming variant of /generate-test-cases.
+    
+    Emits the interpretation first, then each test case as it is built,
+    then the traceability matrix and coverage report as a summary event.
+    Output is NDJSON by default, or Server-Sent Events with format=sse.
+    """
+    
+    # Interpretation errors are still reported as regular HTTP errors
+    usage = UsageMeter()
+    try:
+        interpretation = await GenerationPipeline.interpret(request, interpretation_cache, usage)
+    except CircuitOpenError as e:
+        raise service_unavailable(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+    
+    # Generation is CPU-bound; run the generator in the threadpool to keep the event loop free
+    events = GenerationPipeline.stream_events(request, interpretation, format, usage)
+    return StreamingResponse(
+        iterate_in_threadpool(events),
+        media_type=GenerationPipeline.STREAM_MEDIA_TYPES[format]
+    )
+
+
+@app.post("/generate-test-cases/batch", response_model=BatchGenerateTestCasesResponse)
+async def generate_test_cases_batch(request: BatchGenerateTestCasesRequest):
+    """
+    Generates test cases for many requirements in one call.
+    
+    Interpretations run with bounded concurrency; each requirement reports
+    its own result or error, plus an aggregate coverage report for the batch.
+    """
+    
+    try:
+        return await GenerationPipeline.run_batch(request, interpretation_cache)
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+@app.post("/jobs", response_model=JobInfo, status_code=202)
+async def submit_job(request: GenerateTestCasesRequest):
+    """
+    Queues /generate-test-cases as a background job and returns at once.
+    Poll GET /jobs/{job_id} or follow GET /jobs/{job_id}/events for progress and the result.
+    """
+    return await job_queue.submit(request)
+
+
+@app.post("/jobs/batch", response_model=JobInfo, status_code=202)
+async def submit_batch_job(request: BatchGenerateTestCasesRequest):
+    """Queues /generate-test-cases/batch as a background job"""
+    return await job_queue.submit(request)
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """The job's status and progress; "result" holds the endpoint's response once the job succeeded"""
+    body = await job_queue.info_json(job_id)
+    if body is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job '{job_id}'")
+    return Response(content=body, media_type="application/json")
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(
+    job_id: str,
+    format: str = Query("sse", pattern="^(ndjson|sse)$"),
+    after: int = Query(0, ge=0, description="Only events after this event id"),
+    last_event_id: Optional[str] = Header(None)
+):
+    """
+    The job's progress events so far, then new ones as they happen, until it succeeds or fails.
+    Server-Sent Events by default (reconnecting clients resume via Last-Event-ID), or NDJSON.
+    """
+    if await job_queue.info(job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job '{job_id}'")
+    if last_event_id and last_event_id.isdigit():
+        after = max(after, int(last_event_id))
+
+    async def events():
+        async for event in job_queue.follow(job_id, after):
+            yield JobQueue.encode_event(event, format)
+
+    return StreamingResponse(events(), media_type=JobQueue.STREAM_MEDIA_TYPES[format])
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -14,6 +14,7 @@ class TestType(str, Enum):
     NEGATIVE = "Negative Testing"
     MCDC = "MC/DC"
     STATE = "State Transition"
+    PAIRWISE = "Combinatorial (t-way)"
 
 
 class Priority(str, Enum):
@@ -27,6 +28,13 @@ class Validity(str, Enum):
     INVALID = "INVALID"
 
 
+class JobStatus(str, Enum):
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    SUCCEEDED = "SUCCEEDED"
+    FAILED = "FAILED"
+
+
 class InputDefinition(BaseModel):
     name: str
     data_type: str
@@ -90,6 +98,25 @@ class CoverageReport(BaseModel):
     total_test_count: int
 
 
+class SuiteReductionReport(BaseModel):
+    original_test_count: int
+    duplicates_removed: int
+    minimization_removed: int
+    final_test_count: int
+    reduction_percentage: float
+
+
+class LLMUsage(BaseModel):
+    prompt_version: Optional[str] = None
+    calls: int  # model calls, failed attempts and shared packed calls included
+    prompt_tokens: int
+    completion_tokens: int
+    total_tokens: int
+    latency_ms: float  # time spent waiting on the model
+    estimated: bool  # some counts estimated (~4 characters per token); the model reported none
+    cached: bool  # served from the cache or another request's in-flight call
+
+
 class TraceabilityMatrix(BaseModel):
     requirement_id: str
     rule_coverage: Dict[str, List[str]]  # rule_id -> [test_case_ids]
@@ -101,6 +128,11 @@ class GenerateTestCasesRequest(BaseModel):
     inputs: List[InputDefinition]
     outputs: List[OutputDefinition]
     gemini_api_key: str
+    bypass_cache: bool = False  # Force a fresh AI interpretation (result still refreshes the cache)
+    deduplicate: bool = True  # Drop cases with identical inputs and expected output within a rule
+    minimize: bool = False  # Greedy set-cover reduction keeping every rule, technique and boundary point
+    parallel: bool = False  # Shard generation across the process pool (GENERATION_MAX_WORKERS)
+    incremental: bool = False  # Stream the AI answer and build each rule's cases as soon as it arrives
 
 
 class GenerateTestCasesResponse(BaseModel):
@@ -109,3 +141,64 @@ class GenerateTestCasesResponse(BaseModel):
     traceability_matrix: TraceabilityMatrix
     coverage_report: CoverageReport
     generation_timestamp: str
+    suite_reduction: Optional[SuiteReductionReport] = None
+    llm_usage: Optional[LLMUsage] = None
+
+
+class BatchRequirement(BaseModel):
+    requirement_id: str
+    requirement_text: str
+    inputs: List[InputDefinition]
+    outputs: List[OutputDefinition]
+    bypass_cache: bool = False
+    deduplicate: bool = True
+    minimize: bool = False
+    parallel: bool = False
+    incremental: bool = False
+
+
+class BatchGenerateTestCasesRequest(BaseModel):
+    requirements: List[BatchRequirement] = Field(..., min_length=1)
+    gemini_api_key: str
+    max_concurrency: int = Field(default=8, ge=1, le=32)  # Concurrent Gemini interpretations
+    packed: bool = False  # Interpret several requirements per Gemini call
+
+
+class BatchItemResult(BaseModel):
+    requirement_id: str
+    status: str  # OK or FAILED
+    result: Optional[GenerateTestCasesResponse] = None
+    error: Optional[str] = None
+
+
+class BatchCoverageReport(BaseModel):
+    total_requirements: int
+    succeeded_requirements: int
+    failed_requirements: int
+    total_rules: int
+    rules_covered: int
+    coverage_percentage: float
+    techniques_used: List[str]
+    valid_test_count: int
+    invalid_test_count: int
+    total_test_count: int
+
+
+class BatchGenerateTestCasesResponse(BaseModel):
+    results: List[BatchItemResult]
+    aggregate_coverage: BatchCoverageReport
+    generation_timestamp: str
+
+
+class JobInfo(BaseModel):
+    job_id: str
+    kind: str  # generate or batch
+    status: JobStatus
+    stage: Optional[str] = None  # pipeline stage last started
+    attempts: int  # runs started, including ones lost to a restart
+    items_done: Optional[int] = None  # batch jobs: requirements finished so far
+    items_total: Optional[int] = None
+    error: Optional[str] = None
+    created_at: str
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
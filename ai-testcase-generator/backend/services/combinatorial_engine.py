@@ -0,0 +1,129 @@
+import itertools
+import os
+from operator import itemgetter
+from typing import List, Dict, Optional
+
+
+class CombinatorialEngine:
+    """
+    t-way combinatorial test generation (covering arrays) using IPOG.
+
+    Every combination of values of any t inputs appears in at least one row,
+    while the row count grows roughly with log(parameter count) instead of
+    with the product of the domains.
+    """
+
+    DEFAULT_STRENGTH = int(os.getenv("COMBINATORIAL_STRENGTH", "2"))
+
+    @staticmethod
+    def covering_array(domain_sizes: List[int], strength: int = 2) -> List[List[int]]:
+        """
+        Returns rows of value indices, one column per parameter in the given order.
+
+        IPOG: start from the full product of the first t parameters, then add one
+        parameter at a time - first extending existing rows with the value that
+        covers the most new t-tuples (horizontal growth), then adding rows for
+        whatever is still uncovered (vertical growth).
+        Index 0 is used wherever a cell is left unconstrained.
+        """
+
+        n = len(domain_sizes)
+        if n == 0 or min(domain_sizes) < 1:
+            return []
+
+        t = max(1, min(strength, n))
+
+        # Larger domains first keeps the initial product and the final array small
+        order = sorted(range(n), key=lambda p: -domain_sizes[p])
+        sizes = [domain_sizes[p] for p in order]
+
+        if t == 1:
+            rows = [[i % size for size in sizes] for i in range(sizes[0])]
+        else:
+            rows = [
+                list(values) + [None] * (n - t)
+                for values in itertools.product(*(range(size) for size in sizes[:t]))
+            ]
+            for k in range(t, n):
+                CombinatorialEngine._extend(rows, sizes, k, t)
+
+        # Back to the caller's column order, unconstrained cells -> index 0
+        position = {p: i for i, p in enumerate(order)}
+        columns = [position[p] for p in range(n)]
+        return [[row[c] or 0 for c in columns] for row in rows]
+
+    @staticmethod
+    def _extend(rows: List[list], sizes: List[int], k: int, t: int) -> None:
+        """Adds parameter k to an array covering all t-tuples of parameters 0..k-1"""
+
+        combos = list(itertools.combinations(range(k), t - 1))
+        getters = [itemgetter(*combo) for combo in combos]
+        values_k = range(sizes[k])
+
+        # Per (t-1)-combination of earlier parameters: their values -> uncovered values of k.
+        # itemgetter yields a scalar for one index, so keys match that shape.
+        missing: List[Dict] = []
+        for combo in combos:
+            domains = [range(sizes[p]) for p in combo]
+            if t == 2:
+                missing.append({v: set(values_k) for v in domains[0]})
+            else:
+                missing.append({v: set(values_k) for v in itertools.product(*domains)})
+
+        # Horizontal growth. Keys holding a don't-care (None) are simply absent from missing.
+        for row in rows:
+            gains = [0] * sizes[k]
+            hits = []
+            for getter, uncovered in zip(getters, missing):
+                pending = uncovered.get(getter(row))
+                if pending:
+                    hits.append(pending)
+                    for v in pending:
+                        gains[v] += 1
+
+            best = max(values_k, key=gains.__getitem__)
+            if gains[best] == 0:
+                continue  # Leave as don't-care for vertical growth
+            row[k] = best
+            for pending in hits:
+                pending.discard(best)
+
+        # Vertical growth: place each uncovered tuple in a compatible row or a new one
+        for combo, uncovered in zip(combos, missing):
+            for key, pending in uncovered.items():
+                if not pending:
+                    continue
+                key_values = (key,) if t == 2 else key
+                for v in sorted(pending):
+                    cells = list(zip(combo, key_values)) + [(k, v)]
+                    target = next(
+                        (row for row in rows if all(row[p] is None or row[p] == x for p, x in cells)),
+                        None
+                    )
+                    if target is None:
+                        target = [None] * len(sizes)
+                        rows.append(target)
+                    for p, x in cells:
+                        target[p] = x
+
+    @staticmethod
+    def generate_combinations(
+        parameters: Dict[str, list],
+        strength: Optional[int] = None
+    ) -> List[Dict[str, object]]:
+        """
+        Covering array over named value lists, as one {name: value} dict per row.
+        Parameters with a single value are constant and left out of the rows.
+        """
+
+        strength = strength or CombinatorialEngine.DEFAULT_STRENGTH
+        varying = {name: values for name, values in parameters.items() if len(values) > 1}
+        if not varying:
+            return []
+
+        names = list(varying)
+        rows = CombinatorialEngine.covering_array([len(varying[name]) for name in names], strength)
+        return [
+            {name: varying[name][idx] for name, idx in zip(names, row)}
+            for row in rows
+        ]
@@ -0,0 +1,287 @@
+import re
+from typing import List, Any, Optional, Tuple
+from models.schemas import InputDefinition
+
+
+# Expression tree nodes are tuples:
+#   ("atom", index)  ("not", node)  ("and", [nodes])  ("or", [nodes])
+Node = Tuple
+
+_NUMERIC_TYPES = ["int", "integer", "float", "double", "number"]
+
+# Multi-word negations that belong to an atom rather than negating the whole clause
+_ATOM_NEGATIONS = re.compile(r'\b(is|are|was|does|do|shall)\s+not\b|\bnot\s+(equal|equals)\b', re.IGNORECASE)
+_TOKENS = re.compile(r'(\(|\)|&&|\|\||!(?!=)|\band\b|\bor\b|\bnot\b)', re.IGNORECASE)
+_LEADING_WORDS = re.compile(r'^\s*(?:(?:when(?:ever)?|if|while|both|either)\b\s*)+', re.IGNORECASE)
+_NUMBER = re.compile(r'-?\d+(?:\.\d+)?')
+
+# Comparator phrases, longest first; "not_" marks an atom-level negation (see _ATOM_NEGATIONS)
+_COMPARATORS = [
+    (">=", ">="), ("<=", "<="), ("!=", "!="), ("==", "=="), (">", ">"), ("<", "<"), ("=", "=="),
+    ("greater than or equal to", ">="), ("less than or equal to", "<="),
+    ("at least", ">="), ("at most", "<="), ("no more than", "<="), ("no less than", ">="),
+    ("greater than", ">"), ("more than", ">"), ("exceeds", ">"), ("above", ">"), ("over", ">"),
+    ("less than", "<"), ("below", "<"), ("under", "<"),
+    ("not_equal to", "!="), ("not_equals", "!="), ("not_equal", "!="),
+    ("is not_", "!="), ("are not_", "!="), ("was not_", "!="), ("does not_", "!="), ("shall not_", "!="),
+    ("equals", "=="), ("equal to", "=="), ("is", "=="), ("are", "=="), ("was", "=="), ("becomes", "=="),
+]
+
+
+class Atom:
+    """
+    One atomic condition, e.g. "altitude > 40000" or "mode is MANUAL", bound to an input.
+    Knows how to pick concrete input values that make it true or false.
+    """
+
+    def __init__(self, text: str, input_def: InputDefinition):
+        # text carries the "not_" markers; the display form reads like the original condition
+        self.text = " ".join(text.replace("not_", "not ").split())
+        self.input_def = input_def
+        self.variable = input_def.name
+        self.operator, self.operand = Atom._parse_comparison(text, input_def)
+
+    @staticmethod
+    def _parse_comparison(text: str, input_def: InputDefinition) -> Tuple[Optional[str], Any]:
+        lowered = text.lower()
+        name_at = lowered.find(input_def.name.lower().replace("_", " "))
+        if name_at < 0:
+            name_at = lowered.find(input_def.name.lower())
+        rest = lowered[name_at + len(input_def.name):] if name_at >= 0 else lowered
+
+        for phrase, op in _COMPARATORS:
+            match = re.search(r'(?<![\w<>!=])' + re.escape(phrase) + r'(?![\w=])', rest)
+            if match is None:
+                continue
+            operand_text = rest[match.end():].strip().strip("'\".,")
+            if input_def.data_type.lower() in _NUMERIC_TYPES:
+                number = _NUMBER.match(operand_text)
+                if number is None:
+                    return None, None
+                value = float(number.group())
+                return op, int(value) if value.is_integer() else value
+            if op in ("==", "!=") and operand_text:
+                return op, Atom._match_allowed(operand_text.split()[0], input_def)
+            return None, None
+        return None, None
+
+    @staticmethod
+    def _match_allowed(token: str, input_def: InputDefinition) -> Any:
+        """Restores the declared spelling of an enum value, and maps true/false for booleans"""
+        if input_def.data_type.lower() in ["bool", "boolean"]:
+            if token in ("true", "on", "enabled", "set", "active"):
+                return True
+            if token in ("false", "off", "disabled", "clear", "inactive"):
+                return False
+        for value in input_def.allowed_values or []:
+            if str(value).lower() == token:
+                return value
+        return token.upper()
+
+    def evaluate(self, value: Any) -> bool:
+        """Truth of the atom for a concrete input value"""
+        op, operand = self.operator, self.operand
+        if op is None:
+            return value == self._default_true()
+        try:
+            if op == ">":
+                return value > operand
+            if op == ">=":
+                return value >= operand
+            if op == "<":
+                return value < operand
+            if op == "<=":
+                return value <= operand
+            if op == "==":
+                return value == operand
+            return value != operand
+        except TypeError:
+            return False
+
+    def candidates(self) -> List[Any]:
+        """Finite set of values that can realise either truth value of this atom"""
+        op, operand = self.operator, self.operand
+        if op is None:
+            return [self._default_true(), self._default_false()]
+        if isinstance(operand, bool):
+            return [operand, not operand]
+        if isinstance(operand, (int, float)):
+            step = 1 if self.input_def.data_type.lower() in ["int", "integer"] else 0.1
+            return [operand, round(operand + step, 10), round(operand - step, 10)]
+        others = [v for v in (self.input_def.allowed_values or []) if v != operand]
+        return [operand, others[0] if others else "NOT_" + str(operand)]
+
+    def _default_true(self) -> Any:
+        """Value for an atom without a recognisable comparison, e.g. a bare boolean flag"""
+        if self.input_def.data_type.lower() in ["bool", "boolean"]:
+            return True
+        if self.input_def.allowed_values:
+            return self.input_def.allowed_values[0]
+        if self.input_def.range_min is not None and self.input_def.range_max is not None:
+            return (self.input_def.range_min + self.input_def.range_max) / 2
+        return "VALID_VALUE"
+
+    def _default_false(self) -> Any:
+        if self.input_def.data_type.lower() in ["bool", "boolean"]:
+            return False
+        if self.input_def.range_min is not None:
+            return self.input_def.range_min - 1
+        if self.input_def.allowed_values:
+            return "INVALID_VALUE"
+        return None
+
+
+class ParsedCondition:
+    """Boolean expression tree over atoms; tree is None when no atom names an input"""
+
+    def __init__(self, atoms: List[Atom], tree: Optional[Node]):
+        self.atoms = atoms
+        self.tree = tree
+
+    def evaluate(self, assignment: List[Optional[bool]]) -> Optional[bool]:
+        """Kleene three-valued evaluation; None in the assignment means unknown"""
+        return evaluate_tree(self.tree, assignment)
+
+
+def evaluate_tree(node: Node, assignment: List[Optional[bool]]) -> Optional[bool]:
+    """Kleene three-valued evaluation of an expression tree"""
+    kind = node[0]
+    if kind == "atom":
+        return assignment[node[1]]
+    if kind == "not":
+        value = evaluate_tree(node[1], assignment)
+        return None if value is None else not value
+
+    # "and" is decided by any False, "or" by any True
+    controlling = kind == "or"
+    unknown = False
+    for child in node[1]:
+        value = evaluate_tree(child, assignment)
+        if value is controlling:
+            return controlling
+        if value is None:
+            unknown = True
+    return None if unknown else not controlling
+
+
+class ConditionParser:
+    """Parses rule condition text into a boolean expression tree over input atoms"""
+
+    @staticmethod
+    def parse(condition: str, inputs: List[InputDefinition]) -> ParsedCondition:
+        """
+        Grammar:  or := and ("or" and)* ;  and := unary ("and" unary)* ;
+                  unary := "not" unary | "(" or ")" | atom
+        Atoms are the text spans between connectives. Spans that name no input
+        are dropped; identical spans become the same atom (coupled conditions).
+        """
+
+        text = _LEADING_WORDS.sub("", condition)
+        text = _ATOM_NEGATIONS.sub(_mark_atom_negation, text)
+        tokens = [t.strip() for t in _TOKENS.split(text) if t and t.strip()]
+
+        parser = _Parser(tokens, inputs)
+        tree = parser.parse()
+        return ParsedCondition(parser.atoms, tree)
+
+
+class _Parser:
+    """Recursive-descent parser over connective/atom tokens; tolerant of unbalanced text"""
+
+    def __init__(self, tokens: List[str], inputs: List[InputDefinition]):
+        self.tokens = tokens
+        self.pos = 0
+        self.inputs = inputs
+        self.atoms: List[Atom] = []
+        self._atom_index = {}
+
+    def parse(self) -> Optional[Node]:
+        nodes = []
+        while self.pos < len(self.tokens):
+            node = self._or()
+            if node is not None:
+                nodes.append(node)
+            if self.pos < len(self.tokens):
+                self.pos += 1  # Skip a stray ")" or connective and keep going
+        # Independent trailing fragments are conjoined
+        return _combine("and", nodes)
+
+    def _peek(self) -> Optional[str]:
+        return self.tokens[self.pos].lower() if self.pos < len(self.tokens) else None
+
+    def _or(self) -> Optional[Node]:
+        nodes = [self._and()]
+        while self._peek() in ("or", "||"):
+            self.pos += 1
+            nodes.append(self._and())
+        return _combine("or", nodes)
+
+    def _and(self) -> Optional[Node]:
+        nodes = [self._unary()]
+        while self._peek() in ("and", "&&"):
+            self.pos += 1
+            nodes.append(self._unary())
+        return _combine("and", nodes)
+
+    def _unary(self) -> Optional[Node]:
+        token = self._peek()
+        if token is None:
+            return None
+        if token in ("not", "!"):
+            self.pos += 1
+            child = self._unary()
+            return ("not", child) if child is not None else None
+        if token == "(":
+            self.pos += 1
+            node = self._or()
+            if self._peek() == ")":
+                self.pos += 1
+            return node
+        if token in (")", "and", "&&", "or", "||"):
+            return None
+        self.pos += 1
+        return self._atom(self.tokens[self.pos - 1])
+
+    def _atom(self, text: str) -> Optional[Node]:
+        input_def = _find_input(text, self.inputs)
+        if input_def is None:
+            return None
+        key = " ".join(text.lower().split())
+        index = self._atom_index.get(key)
+        if index is None:
+            index = len(self.atoms)
+            self.atoms.append(Atom(text, input_def))
+            self._atom_index[key] = index
+        return ("atom", index)
+
+
+def _mark_atom_negation(match) -> str:
+    """'is not' -> 'is not_', 'not equal' -> 'not_equal', so the tokenizer keeps them inside the atom"""
+    if match.group(1):
+        return match.group(1) + " not_"
+    return "not_" + match.group(2)
+
+
+def _combine(kind: str, nodes: List[Optional[Node]]) -> Optional[Node]:
+    nodes = [n for n in nodes if n is not None]
+    if not nodes:
+        return None
+    if len(nodes) == 1:
+        return nodes[0]
+    # Flatten nested nodes of the same kind
+    flat = []
+    for node in nodes:
+        flat.extend(node[1] if node[0] == kind else [node])
+    return (kind, flat)
+
+
+def _find_input(text: str, inputs: List[InputDefinition]) -> Optional[InputDefinition]:
+    """Input named in the text; the longest name wins so 'speed_limit' beats 'speed'"""
+    lowered = text.lower()
+    best = None
+    for inp in inputs:
+        name = inp.name.lower()
+        if name in lowered or name.replace("_", " ") in lowered:
+            if best is None or len(name) > len(best.name):
+                best = inp
+    return best
@@ -1,75 +1,156 @@
-from typing import List, Dict
+from typing import List, Dict, Iterable, Tuple, Union
 from models.schemas import (
-    Rule, TestCase, CoverageReport, TraceabilityMatrix
+    Rule, TestCase, Validity, CoverageReport, TraceabilityMatrix, BatchCoverageReport
 )
+from services.test_suite_store import TestSuiteStore
+
+
+class CoverageAccumulator:
+    """
+    Incremental traceability/coverage state.
+    
+    Ingests test cases one at a time or one suite chunk at a time, keeping the
+    rule -> tc_ids map, technique set and validity counters current, so the
+    matrix and report come out of a single O(tests) pass. Works unchanged for
+    streaming and batch generation where cases arrive incrementally.
+    """
+    
+    def __init__(self, rules: List[Rule], requirement_id: str):
+        self.requirement_id = requirement_id
+        self.total_rules = len(rules)
+        self.rule_coverage: Dict[str, List[str]] = {rule.rule_id: [] for rule in rules}
+        self.covered_rules: Dict[str, None] = {}  # ordered set
+        self.techniques: Dict[str, None] = {}  # ordered set
+        self.valid_count = 0
+        self.total_count = 0
+    
+    def add(self, tc_id: str, rule_id: str, technique: str, is_valid: bool) -> None:
+        tc_ids = self.rule_coverage.get(rule_id)
+        if tc_ids is not None:
+            tc_ids.append(tc_id)
+        self.covered_rules[rule_id] = None
+        self.techniques[technique] = None
+        self.valid_count += is_valid
+        self.total_count += 1
+    
+    def add_test_case(self, tc: TestCase) -> None:
+        self.add(tc.tc_id, tc.rule_id, tc.test_type, tc.validity == Validity.VALID)
+    
+    def add_test_cases(self, test_cases: Iterable[TestCase]) -> None:
+        for tc in test_cases:
+            self.add_test_case(tc)
+    
+    def add_suite(self, suite: TestSuiteStore) -> None:
+        """Ingests a whole store or one streamed chunk of it"""
+        add = self.add
+        for tc_id, rule_id, technique, is_valid in suite.iter_coverage_rows():
+            add(tc_id, rule_id, technique, is_valid)
+    
+    def traceability_matrix(self) -> TraceabilityMatrix:
+        """
+        Creates requirement -> rule -> test case mapping
+        """
+        return TraceabilityMatrix(
+            requirement_id=self.requirement_id if self.total_count else "UNKNOWN",
+            rule_coverage=self.rule_coverage
+        )
+    
+    def coverage_report(self) -> CoverageReport:
+        """
+        Generates coverage metrics
+        """
+        rules_covered = len(self.covered_rules)
+        coverage_percentage = (rules_covered / self.total_rules * 100) if self.total_rules > 0 else 0
+        
+        return CoverageReport(
+            requirement_id=self.requirement_id,
+            total_rules=self.total_rules,
+            rules_covered=rules_covered,
+            coverage_percentage=round(coverage_percentage, 2),
+            techniques_used=list(self.techniques),
+            valid_test_count=self.valid_count,
+            invalid_test_count=self.total_count - self.valid_count,
+            total_test_count=self.total_count
+        )
 
 
 class CoverageEngine:
     """Generates traceability and coverage metrics"""
     
+    @staticmethod
+    def analyze(
+        rules: List[Rule],
+        test_cases: Union[TestSuiteStore, List[TestCase]],
+        requirement_id: str
+    ) -> Tuple[TraceabilityMatrix, CoverageReport]:
+        """
+        Traceability matrix and coverage report from a single pass over the suite
+        """
+        accumulator = CoverageEngine._accumulate(rules, test_cases, requirement_id)
+        return accumulator.traceability_matrix(), accumulator.coverage_report()
+    
     @staticmethod
     def generate_traceability_matrix(
         rules: List[Rule],
-        test_cases: List[TestCase]
+        test_cases: Union[TestSuiteStore, List[TestCase]]
     ) -> TraceabilityMatrix:
         """
         Creates requirement -> rule -> test case mapping
         """
-        
-        rule_coverage = {}
-        
-        for rule in rules:
-            rule_id = rule.rule_id
-            # Find all test cases for this rule
-            related_tcs = [
-                tc.tc_id for tc in test_cases
-                if tc.rule_id == rule_id
-            ]
-            rule_coverage[rule_id] = related_tcs
-        
-        # Get requirement_id from first test case
-        requirement_id = test_cases[0].traceability.requirement if test_cases else "UNKNOWN"
-        
-        return TraceabilityMatrix(
-            requirement_id=requirement_id,
-            rule_coverage=rule_coverage
-        )
+        if isinstance(test_cases, TestSuiteStore):
+            requirement_id = test_cases.requirement_id
+        else:
+            requirement_id = test_cases[0].traceability.requirement if test_cases else "UNKNOWN"
+        return CoverageEngine._accumulate(rules, test_cases, requirement_id).traceability_matrix()
     
     @staticmethod
     def generate_coverage_report(
         rules: List[Rule],
-        test_cases: List[TestCase],
+        test_cases: Union[TestSuiteStore, List[TestCase]],
         requirement_id: str
     ) -> CoverageReport:
         """
         Generates coverage metrics
         """
+        return CoverageEngine._accumulate(rules, test_cases, requirement_id).coverage_report()
+    
+    @staticmethod
+    def _accumulate(
+        rules: List[Rule],
+        test_cases: Union[TestSuiteStore, List[TestCase]],
+        requirement_id: str
+    ) -> CoverageAccumulator:
+        accumulator = CoverageAccumulator(rules, requirement_id)
+        if isinstance(test_cases, TestSuiteStore):
+            accumulator.add_suite(test_cases)
+        else:
+            accumulator.add_test_cases(test_cases)
+        return accumulator
+    
+    @staticmethod
+    def aggregate_coverage_reports(
+        reports: List[CoverageReport],
+        total_requirements: int
+    ) -> BatchCoverageReport:
+        """
+        Combines per-requirement coverage reports into one batch-level report
+        """
         
-        total_rules = len(rules)
-        
-        # Count rules covered (rules with at least one test case)
-        covered_rules = set()
-        for tc in test_cases:
-            covered_rules.add(tc.rule_id)
-        
-        rules_covered = len(covered_rules)
+        total_rules = sum(r.total_rules for r in reports)
+        rules_covered = sum(r.rules_covered for r in reports)
         coverage_percentage = (rules_covered / total_rules * 100) if total_rules > 0 else 0
         
-        # Extract techniques used
-        techniques_used = list(set([tc.test_type for tc in test_cases]))
-        
-        # Count valid vs invalid
-        valid_count = sum(1 for tc in test_cases if tc.validity.value == "VALID")
-        invalid_count = sum(1 for tc in test_cases if tc.validity.value == "INVALID")
-        total_count = len(test_cases)
+        techniques_used = sorted({t for r in reports for t in r.techniques_used})
         
-        return CoverageReport(
-            requirement_id=requirement_id,
+        return BatchCoverageReport(
+            total_requirements=total_requirements,
+            succeeded_requirements=len(reports),
+            failed_requirements=total_requirements - len(reports),
             total_rules=total_rules,
             rules_covered=rules_covered,
             coverage_percentage=round(coverage_percentage, 2),
             techniques_used=techniques_used,
-            valid_test_count=valid_count,
-            invalid_test_count=invalid_count,
-            total_test_count=total_count
+            valid_test_count=sum(r.valid_test_count for r in reports),
+            invalid_test_count=sum(r.invalid_test_count for r in reports),
+            total_test_count=sum(r.total_test_count for r in reports)
         )
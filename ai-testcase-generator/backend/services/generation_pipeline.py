@@ -0,0 +1,510 @@
+import asyncio
+import json
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Iterator, Tuple, Union
+from models.schemas import (
+    GenerateTestCasesRequest,
+    GenerateTestCasesResponse,
+    CoverageReport,
+    TraceabilityMatrix,
+    BatchGenerateTestCasesRequest,
+    BatchGenerateTestCasesResponse,
+    BatchItemResult,
+    InterpretationResult,
+    InterpretationStatus,
+    LLMUsage,
+    SuiteReductionReport
+)
+from ai.providers import UsageMeter
+from services.requirement_interpreter import RequirementInterpreter
+from services.test_strategy_engine import TestStrategyEngine
+from services.test_case_builder import TestCaseBuilder
+from services.parallel_builder import ParallelSuiteBuilder
+from services.incremental_builder import IncrementalSuiteBuilder
+from services.coverage_engine import CoverageEngine, CoverageAccumulator
+from services.interpretation_cache import InterpretationCache
+from services.response_serializer import ResponseSerializer
+from services.test_suite_store import TestSuiteStore
+from services.suite_optimizer import SuiteOptimizer, SuiteDeduplicator
+from services.metrics import Metrics
+
+
+class GenerationPipeline:
+    """Runs interpret -> strategies -> build -> traceability -> coverage for requirements"""
+
+    STREAM_MEDIA_TYPES = {
+        "ndjson": "application/x-ndjson",
+        "sse": "text/event-stream",
+    }
+
+    @staticmethod
+    async def interpret(
+        request: GenerateTestCasesRequest,
+        cache: Optional[InterpretationCache] = None,
+        usage: Optional[UsageMeter] = None,
+        on_event: Optional[Callable[[str, Any, Any], None]] = None
+    ) -> InterpretationResult:
+        """
+        Step 1: Interpret requirement using AI (validated, optionally cached).
+        Token usage and model latency are added to usage, when given; on_event
+        streams the answer (see RequirementInterpreter.interpret_async).
+        """
+
+        interpreter = RequirementInterpreter(request.gemini_api_key, cache=cache)
+
+        inputs_dict = [inp.dict() for inp in request.inputs]
+        outputs_dict = [out.dict() for out in request.outputs]
+
+        with Metrics.stage("interpret"):
+            return await interpreter.interpret_async(
+                request.requirement_id,
+                request.requirement_text,
+                inputs_dict,
+                outputs_dict,
+                use_cache=not request.bypass_cache,
+                usage=usage,
+                on_event=on_event
+            )
+
+    @staticmethod
+    async def interpret_and_build(
+        request: GenerateTestCasesRequest,
+        cache: Optional[InterpretationCache] = None,
+        usage: Optional[UsageMeter] = None
+    ) -> Tuple[InterpretationResult, Optional[TestSuiteStore]]:
+        """
+        Step 1, and with request.incremental or request.parallel also steps 3-4:
+        - incremental: the answer is streamed and each rule's cases are built as soon
+          as the rule arrives (IncrementalSuiteBuilder)
+        - parallel: the shards are awaited, so the event loop is not held by the build
+        Returns the interpretation and its suite, or None for the suite when it is still
+        to be built (neither option, or BLOCKED).
+        """
+
+        if request.parallel:
+            interpretation = await GenerationPipeline.interpret(request, cache, usage)
+            if interpretation.interpretation_status == InterpretationStatus.BLOCKED:
+                return interpretation, None
+            return interpretation, await GenerationPipeline._build_suite_async(request, interpretation)
+
+        if not request.incremental:
+            return await GenerationPipeline.interpret(request, cache, usage), None
+
+        builder = IncrementalSuiteBuilder(request)
+        builder.start()
+        try:
+            interpretation = await GenerationPipeline.interpret(request, cache, usage, builder.on_event)
+        except BaseException:
+            await builder.cancel()
+            raise
+
+        if interpretation.interpretation_status == InterpretationStatus.BLOCKED:
+            await builder.cancel()
+            return interpretation, None
+        return interpretation, await builder.finish(interpretation)
+
+    @staticmethod
+    async def interpret_packed(
+        requests: List[GenerateTestCasesRequest],
+        cache: Optional[InterpretationCache] = None,
+        max_concurrency: int = 8,
+        usages: Optional[List[UsageMeter]] = None
+    ) -> List[Union[InterpretationResult, Exception]]:
+        """
+        Step 1 for many requirements at once, packed into as few Gemini calls as the token budget allows.
+        Returns an interpretation or the error for each request, in order.
+        """
+
+        interpreter = RequirementInterpreter(requests[0].gemini_api_key, cache=cache)
+
+        with Metrics.stage("interpret"):
+            return await interpreter.interpret_many_async(
+                [
+                    {
+                        "requirement_id": request.requirement_id,
+                        "requirement_text": request.requirement_text,
+                        "inputs": [inp.dict() for inp in request.inputs],
+                        "outputs": [out.dict() for out in request.outputs],
+                        "use_cache": not request.bypass_cache
+                    }
+                    for request in requests
+                ],
+                max_concurrency,
+                usages
+            )
+
+    @staticmethod
+    def generate(
+        request: GenerateTestCasesRequest,
+        interpretation: InterpretationResult,
+        usage: Optional[UsageMeter] = None,
+        suite: Optional[TestSuiteStore] = None
+    ) -> GenerateTestCasesResponse:
+        """
+        Deterministic stages: strategies, test cases, traceability, coverage.
+        A BLOCKED interpretation yields an empty suite. Pass suite when it is already built.
+        """
+
+        # Step 2: Check if interpretation is BLOCKED
+        if interpretation.interpretation_status == InterpretationStatus.BLOCKED:
+            return GenerationPipeline.blocked_response(request, interpretation, usage)
+
+        suite, traceability_matrix, coverage_report, suite_reduction = GenerationPipeline._build(
+            request, interpretation, suite
+        )
+
+        # Step 7: Return complete response (test cases materialized only here)
+        with Metrics.stage("serialize"):
+            return GenerateTestCasesResponse(
+                interpretation=interpretation,
+                test_cases=suite.to_test_cases(),
+                traceability_matrix=traceability_matrix,
+                coverage_report=coverage_report,
+                generation_timestamp=datetime.utcnow().isoformat(),
+                suite_reduction=suite_reduction,
+                llm_usage=GenerationPipeline.usage_report(usage)
+            )
+
+    @staticmethod
+    def generate_json(
+        request: GenerateTestCasesRequest,
+        interpretation: InterpretationResult,
+        usage: Optional[UsageMeter] = None,
+        suite: Optional[TestSuiteStore] = None
+    ) -> bytes:
+        """
+        Same document as generate(), encoded straight to JSON bytes.
+        No TestCase models are created and nothing is re-validated.
+        """
+
+        if interpretation.interpretation_status == InterpretationStatus.BLOCKED:
+            return ResponseSerializer.encode_model(GenerationPipeline.blocked_response(request, interpretation, usage))
+
+        suite, traceability_matrix, coverage_report, suite_reduction = GenerationPipeline._build(
+            request, interpretation, suite
+        )
+
+        with Metrics.stage("serialize"):
+            return ResponseSerializer.encode_generation(
+                interpretation,
+                suite,
+                traceability_matrix,
+                coverage_report,
+                datetime.utcnow().isoformat(),
+                suite_reduction,
+                GenerationPipeline.usage_report(usage)
+            )
+
+    @staticmethod
+    def _build(
+        request: GenerateTestCasesRequest,
+        interpretation: InterpretationResult,
+        suite: Optional[TestSuiteStore] = None
+    ) -> Tuple[TestSuiteStore, TraceabilityMatrix, CoverageReport, Optional[SuiteReductionReport]]:
+        """Steps 3-6 for an OK interpretation; steps 3-4 are skipped when suite is given"""
+
+        if suite is None:
+            suite = GenerationPipeline._build_suite(request, interpretation)
+
+        # Step 4b: Drop duplicate cases and, on request, minimize the suite
+        with Metrics.stage("optimize"):
+            suite, suite_reduction = SuiteOptimizer.optimize(suite, request.deduplicate, request.minimize)
+
+        # Steps 5-6: Traceability matrix and coverage report in one pass
+        with Metrics.stage("coverage"):
+            traceability_matrix, coverage_report = CoverageEngine.analyze(
+                interpretation.rules,
+                suite,
+                request.requirement_id
+            )
+
+        return suite, traceability_matrix, coverage_report, suite_reduction
+
+    @staticmethod
+    def _build_suite(request: GenerateTestCasesRequest, interpretation: InterpretationResult) -> TestSuiteStore:
+        """Steps 3-4"""
+
+        # Step 3: Determine test strategies
+        with Metrics.stage("strategies"):
+            strategies = TestStrategyEngine.determine_strategies(
+                interpretation.rules,
+                request.inputs,
+                interpretation.boundary_values
+            )
+
+        # Step 4: Generate test cases with intelligent output inference
+        with Metrics.stage("build"):
+            if request.parallel:
+                suite = ParallelSuiteBuilder.build_suite(
+                    interpretation.rules,
+                    request.inputs,
+                    request.outputs,
+                    strategies,
+                    request.requirement_id
+                )
+            else:
+                builder = TestCaseBuilder()
+                suite = builder.build_suite(
+                    interpretation.rules,
+                    request.inputs,
+                    request.outputs,
+                    strategies,
+                    request.requirement_id
+                )
+
+        return suite
+
+    @staticmethod
+    async def _build_suite_async(request: GenerateTestCasesRequest, interpretation: InterpretationResult) -> TestSuiteStore:
+        """Steps 3-4 for parallel requests, awaiting the process pool instead of blocking on it"""
+
+        with Metrics.stage("strategies"):
+            strategies = TestStrategyEngine.determine_strategies(
+                interpretation.rules,
+                request.inputs,
+                interpretation.boundary_values
+            )
+
+        with Metrics.stage("build"):
+            return await ParallelSuiteBuilder.build_suite_async(
+                interpretation.rules,
+                request.inputs,
+                request.outputs,
+                strategies,
+                request.requirement_id
+            )
+
+    @staticmethod
+    def blocked_response(
+        request: GenerateTestCasesRequest,
+        interpretation: InterpretationResult,
+        usage: Optional[UsageMeter] = None
+    ) -> GenerateTestCasesResponse:
+        """Response for a BLOCKED interpretation: no test cases, zero coverage"""
+        return GenerateTestCasesResponse(
+            interpretation=interpretation,
+            test_cases=[],
+            traceability_matrix={
+                "requirement_id": request.requirement_id,
+                "rule_coverage": {}
+            },
+            coverage_report={
+                "requirement_id": request.requirement_id,
+                "total_rules": len(interpretation.rules),
+                "rules_covered": 0,
+                "coverage_percentage": 0.0,
+                "techniques_used": [],
+                "valid_test_count": 0,
+                "invalid_test_count": 0,
+                "total_test_count": 0
+            },
+            generation_timestamp=datetime.utcnow().isoformat(),
+            llm_usage=GenerationPipeline.usage_report(usage)
+        )
+
+    @staticmethod
+    def usage_report(usage: Optional[UsageMeter]) -> Optional[LLMUsage]:
+        return LLMUsage(**usage.summary()) if usage is not None else None
+
+    @staticmethod
+    async def run(
+        request: GenerateTestCasesRequest,
+        cache: Optional[InterpretationCache] = None
+    ) -> GenerateTestCasesResponse:
+        """
+        Full pipeline for a single requirement. The deterministic stages run in a worker
+        thread so a large requirement does not hold the event loop (and every other request).
+        """
+        usage = UsageMeter()
+        interpretation, suite = await GenerationPipeline.interpret_and_build(request, cache, usage)
+        return await asyncio.to_thread(GenerationPipeline.generate, request, interpretation, usage, suite)
+
+    @staticmethod
+    async def run_json(
+        request: GenerateTestCasesRequest,
+        cache: Optional[InterpretationCache] = None
+    ) -> bytes:
+        """Full pipeline for a single requirement, encoded by generate_json in a worker thread"""
+        usage = UsageMeter()
+        interpretation, suite = await GenerationPipeline.interpret_and_build(request, cache, usage)
+        return await asyncio.to_thread(GenerationPipeline.generate_json, request, interpretation, usage, suite)
+
+    @staticmethod
+    async def run_batch(
+        batch: BatchGenerateTestCasesRequest,
+        cache: Optional[InterpretationCache] = None,
+        on_result: Optional[Callable[[BatchItemResult], None]] = None
+    ) -> BatchGenerateTestCasesResponse:
+        """
+        Runs the pipeline for every requirement in the batch.
+
+        - At most batch.max_concurrency Gemini interpretations are in flight
+        - With batch.packed, requirements share Gemini calls (see interpret_packed);
+          incremental is ignored then, since packed answers are not streamed
+        - Deterministic stages run in worker threads so the event loop stays responsive
+        - A failing item is reported in its own result and never fails the batch
+        - on_result, when given, receives each item's result as soon as it is ready
+        """
+
+        semaphore = asyncio.Semaphore(batch.max_concurrency)
+
+        requests = [
+            GenerateTestCasesRequest.model_construct(
+                **dict(item),
+                gemini_api_key=batch.gemini_api_key
+            )
+            for item in batch.requirements
+        ]
+
+        usages = [UsageMeter() for _ in requests]
+
+        # Packed mode interprets everything up front, several requirements per Gemini call
+        interpretations = await GenerationPipeline.interpret_packed(
+            requests, cache, batch.max_concurrency, usages
+        ) if batch.packed else None
+
+        async def run_item(index: int, request: GenerateTestCasesRequest) -> BatchItemResult:
+            result = await item_result(index, request)
+            if on_result is not None:
+                on_result(result)
+            return result
+
+        async def item_result(index: int, request: GenerateTestCasesRequest) -> BatchItemResult:
+            try:
+                suite = None
+                if interpretations is not None:
+                    interpretation = interpretations[index]
+                    if isinstance(interpretation, Exception):
+                        raise interpretation
+                else:
+                    async with semaphore:
+                        interpretation, suite = await GenerationPipeline.interpret_and_build(
+                            request, cache, usages[index]
+                        )
+                result = await asyncio.to_thread(
+                    GenerationPipeline.generate, request, interpretation, usages[index], suite
+                )
+                return BatchItemResult(
+                    requirement_id=request.requirement_id,
+                    status="OK",
+                    result=result
+                )
+            except Exception as e:
+                return BatchItemResult(
+                    requirement_id=request.requirement_id,
+                    status="FAILED",
+                    error=str(e)
+                )
+
+        results: List[BatchItemResult] = await asyncio.gather(
+            *(run_item(index, request) for index, request in enumerate(requests))
+        )
+
+        aggregate_coverage = CoverageEngine.aggregate_coverage_reports(
+            [r.result.coverage_report for r in results if r.result is not None],
+            total_requirements=len(results)
+        )
+
+        return BatchGenerateTestCasesResponse(
+            results=results,
+            aggregate_coverage=aggregate_coverage,
+            generation_timestamp=datetime.utcnow().isoformat()
+        )
+
+    @staticmethod
+    def stream_events(
+        request: GenerateTestCasesRequest,
+        interpretation: InterpretationResult,
+        stream_format: str = "ndjson",
+        usage: Optional[UsageMeter] = None
+    ) -> Iterator[str]:
+        """
+        Encodes the pipeline output as a stream of events:
+        - "interpretation": the validated interpretation, first
+        - "test_case": one per test case, flushed per (rule, strategy) chunk as it is built
+        - "summary": traceability matrix, coverage report, timestamp, suite reduction and LLM usage, last
+        - "error": emitted instead of the summary if generation fails midway
+
+        Only one chunk is alive at a time; besides it, only the CoverageAccumulator
+        state needed for the summary is kept, so memory stays flat. Duplicates are
+        dropped chunk by chunk; minimization needs the whole suite and is not applied.
+        """
+
+        encode = GenerationPipeline._encode_event
+        yield encode("interpretation", interpretation.model_dump_json(), stream_format)
+
+        if interpretation.interpretation_status == InterpretationStatus.BLOCKED:
+            blocked = GenerationPipeline.blocked_response(request, interpretation)
+            yield GenerationPipeline._encode_summary(
+                blocked.traceability_matrix, blocked.coverage_report, stream_format, usage=usage
+            )
+            return
+
+        try:
+            with Metrics.stage("strategies"):
+                strategies = TestStrategyEngine.determine_strategies(
+                    interpretation.rules,
+                    request.inputs,
+                    interpretation.boundary_values
+                )
+
+            coverage = CoverageAccumulator(interpretation.rules, request.requirement_id)
+            deduplicator = SuiteDeduplicator() if request.deduplicate else None
+            emitted = 0
+
+            builder = TestCaseBuilder()
+            for chunk in builder.iter_suite_chunks(
+                interpretation.rules,
+                request.inputs,
+                request.outputs,
+                strategies,
+                request.requirement_id
+            ):
+                if deduplicator is not None:
+                    chunk = deduplicator.apply(chunk)
+                    if not len(chunk):
+                        continue
+                emitted += len(chunk)
+                coverage.add_suite(chunk)
+
+                yield "".join(
+                    encode("test_case", ResponseSerializer.encode_dict(tc), stream_format)
+                    for tc in chunk.iter_dicts()
+                )
+
+            traceability_matrix = coverage.traceability_matrix()
+            coverage_report = coverage.coverage_report()
+            suite_reduction = SuiteOptimizer.report(
+                emitted + deduplicator.removed, deduplicator.removed, 0
+            ) if deduplicator is not None else None
+            yield GenerationPipeline._encode_summary(
+                traceability_matrix, coverage_report, stream_format, suite_reduction, usage
+            )
+
+        except Exception as e:
+            # Headers are already sent, so errors travel in-band
+            yield encode("error", json.dumps({"detail": f"Internal server error: {str(e)}"}), stream_format)
+
+    @staticmethod
+    def _encode_summary(
+        traceability_matrix,
+        coverage_report,
+        stream_format: str,
+        suite_reduction: Optional[SuiteReductionReport] = None,
+        usage: Optional[UsageMeter] = None
+    ) -> str:
+        payload = (
+            '{"traceability_matrix":' + TraceabilityMatrix.model_validate(traceability_matrix).model_dump_json()
+            + ',"coverage_report":' + CoverageReport.model_validate(coverage_report).model_dump_json()
+            + ',"generation_timestamp":' + json.dumps(datetime.utcnow().isoformat())
+            + ',"suite_reduction":' + (suite_reduction.model_dump_json() if suite_reduction else 'null')
+            + ',"llm_usage":' + (GenerationPipeline.usage_report(usage).model_dump_json() if usage is not None else 'null') + '}'
+        )
+        return GenerationPipeline._encode_event("summary", payload, stream_format)
+
+    @staticmethod
+    def _encode_event(event: str, payload_json: str, stream_format: str) -> str:
+        """Frames one already-serialized JSON payload as an NDJSON line or an SSE event"""
+        if stream_format == "sse":
+            return f"event: {event}\ndata: {payload_json}\n\n"
+        return '{"event":"' + event + '","data":' + payload_json + '}\n'
@@ -0,0 +1,164 @@
+import asyncio
+import contextvars
+import queue
+import threading
+from typing import Any, List, Optional, Tuple
+from models.schemas import GenerateTestCasesRequest, InterpretationResult, Rule
+from services.test_case_builder import TestCaseBuilder
+from services.test_strategy_engine import TestStrategyEngine
+from services.test_suite_store import TestSuiteStore
+from services.metrics import Metrics
+
+
+class IncrementalSuiteBuilder:
+    """
+    Builds a requirement's suite while its interpretation is still streaming from the model.
+
+    on_event receives the rules and boundary values reported by the streaming parser; a
+    worker thread decides each rule's strategies and builds its cases as soon as the rule
+    arrives, overlapping test generation with the rest of the model's answer. STATE cases
+    wait for finish(), since the state graph is taken from every rule.
+
+    finish() keeps the streamed rules that match the validated interpretation (a retried
+    call may answer differently), builds whatever is left and merges the chunks in rule
+    order, so the suite - tc_ids included - is identical to TestCaseBuilder.build_suite.
+    """
+
+    # Strategies built only once every rule is known
+    DEFERRED = frozenset({"STATE"})
+
+    def __init__(self, request: GenerateTestCasesRequest):
+        self.inputs = request.inputs
+        self.outputs = request.outputs
+        self.requirement_id = request.requirement_id
+        self.builder = TestCaseBuilder()
+        self.builder.begin_chunked(self.inputs)
+        self.varying_inputs = TestStrategyEngine.varying_inputs(self.inputs)
+        # Without numeric inputs, BVA depends on whether the model gave boundary values at all
+        self.needs_boundary_values = not TestStrategyEngine.has_numeric_input(self.inputs)
+        self.streamed_rules = 0
+        self._has_boundary_values: Optional[bool] = None
+        self._boundary_value_seen = False
+        self._received = 0
+        self._built: List[Tuple[Rule, List[str], List[Optional[TestSuiteStore]]]] = []
+        self._events: queue.SimpleQueue = queue.SimpleQueue()
+        self._finished: Optional[asyncio.Future] = None
+
+    def start(self) -> None:
+        """Starts the worker thread; call finish() or cancel() afterwards"""
+        loop = asyncio.get_running_loop()
+        self._finished = loop.create_future()
+        context = contextvars.copy_context()
+
+        def run() -> None:
+            error = None
+            try:
+                context.run(self._consume)
+            except Exception as e:
+                error = e
+            loop.call_soon_threadsafe(self._finished.set_result, error)
+
+        # A thread of its own: it waits on the model, and must not hold a shared executor thread
+        threading.Thread(target=run, name=f"incremental-build-{self.requirement_id}", daemon=True).start()
+
+    def on_event(self, field: str, key: Any, value: Any) -> None:
+        """Streaming parser callback, on the event loop"""
+        if field == "rules" and key is not None:
+            # A retried call reports its rules again from the start; the first report wins
+            if key == self._received:
+                self._received += 1
+                self._events.put(("rule", value))
+        elif field == "boundary_values":
+            if key is not None and not self._boundary_value_seen:
+                self._boundary_value_seen = True
+                self._events.put(("boundary_values", True))
+            elif key is None:
+                self._events.put(("boundary_values", self._boundary_value_seen))
+
+    async def finish(self, interpretation: InterpretationResult) -> TestSuiteStore:
+        """The complete suite for the validated interpretation"""
+        await self._stop()
+        return await asyncio.to_thread(self._complete, interpretation)
+
+    async def cancel(self) -> None:
+        """Stops the worker when the interpretation failed or was BLOCKED"""
+        await self._stop()
+
+    async def _stop(self) -> None:
+        if self._finished is None:
+            return
+        self._events.put(("done", None))
+        error = await self._finished
+        self._finished = None
+        if error is not None:
+            # Nothing streamed is trusted; finish() builds everything from the interpretation
+            self._built = []
+
+    def _consume(self) -> None:
+        pending = []
+        broken = False
+        while True:
+            kind, value = self._events.get()
+            if kind == "done":
+                return
+            if kind == "boundary_values":
+                if self._has_boundary_values is None:
+                    self._has_boundary_values = value
+            elif not broken:
+                pending.append(value)
+
+            if self.needs_boundary_values and self._has_boundary_values is None:
+                continue
+            for raw in pending:
+                if not self._build_rule(raw):
+                    # Rules are built in order; the rest waits for the validated interpretation
+                    broken = True
+                    break
+            pending = []
+
+    def _build_rule(self, raw: Any) -> bool:
+        try:
+            rule = Rule(rule_id=raw["rule_id"], condition=raw["condition"], expected_behavior=raw["expected_behavior"])
+        except (KeyError, TypeError, ValueError):
+            return False
+
+        strategies = TestStrategyEngine.strategies_for_rule(
+            rule, self.inputs, bool(self._has_boundary_values), self.varying_inputs
+        )
+        chunks = [
+            None if strategy in self.DEFERRED
+            else self.builder.build_chunk(strategy, rule, self.inputs, self.outputs, self.requirement_id)
+            for strategy in strategies
+        ]
+        self._built.append((rule, strategies, chunks))
+        return True
+
+    def _complete(self, interpretation: InterpretationResult) -> TestSuiteStore:
+        # Only the work the model's answer did not hide counts as the build stage
+        with Metrics.stage("build"):
+            rules = interpretation.rules
+            strategies = TestStrategyEngine.determine_strategies(
+                rules, self.inputs, interpretation.boundary_values
+            )
+
+            kept = 0
+            for (rule, used, _), final in zip(self._built, rules):
+                if rule != final or used != strategies.get(final.rule_id):
+                    break
+                kept += 1
+            self.streamed_rules = kept
+
+            self.builder.set_context_rules(rules)
+            suite = TestSuiteStore(self.requirement_id)
+            for index, rule in enumerate(rules):
+                if index < kept:
+                    _, used, chunks = self._built[index]
+                    planned = zip(used, chunks)
+                else:
+                    planned = ((strategy, None) for strategy in strategies.get(rule.rule_id, []))
+                for strategy, chunk in planned:
+                    if chunk is None:
+                        chunk = self.builder.build_chunk(strategy, rule, self.inputs, self.outputs, self.requirement_id)
+                    suite.extend(chunk)
+            suite.renumber()
+            return suite
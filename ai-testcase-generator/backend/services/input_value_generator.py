@@ -1,4 +1,8 @@
-from typing import List, Dict, Any, Set
+import functools
+import json
+import os
+import re
+from typing import List, Dict, Any, Set, Optional
 from models.schemas import InputDefinition
 
 
@@ -36,46 +40,67 @@ class InputValueGenerator:
         'code': 50,
     }
     
+    # Unit hints, checked in order after domain names: (unit substrings, range)
+    UNIT_HINTS = [
+        (('feet', 'ft'), (0, 10000)),
+        (('meter',), (0, 10000)),
+        (('celsius', '°c'), (-273, 5000)),
+        (('fahrenheit', '°f'), (-459, 9000)),
+        (('mph', 'km/h'), (0, 500)),
+        (('kg', 'lb'), (0, 10000)),
+        (('%', 'percent'), (0, 100)),
+    ]
+    
+    # Compiled matchers, rebuilt whenever domain packs change
+    _domain_matcher = None
+    _domain_priority: Dict[str, int] = {}
+    _unit_matcher = None
+    _unit_priority: Dict[str, int] = {}
+    _unit_ranges: List[tuple] = []
+    
     @staticmethod
     def infer_range(input_def: InputDefinition) -> tuple:
         """
-        Intelligently infer range from input name, type, and context
+        Intelligently infer range from input name, type, and context.
+        Memoized on the input's signature, so repeated lookups are O(1).
         """
+        return _infer_range_cached(
+            input_def.name,
+            input_def.data_type,
+            input_def.unit,
+            input_def.range_min,
+            input_def.range_max
+        )
+    
+    @staticmethod
+    def _infer_range_uncached(
+        name: str,
+        data_type: str,
+        unit: Optional[str],
+        range_min: Optional[float],
+        range_max: Optional[float]
+    ) -> tuple:
         # If range already defined, use it
-        if input_def.range_min is not None and input_def.range_max is not None:
-            return (input_def.range_min, input_def.range_max)
+        if range_min is not None and range_max is not None:
+            return (range_min, range_max)
         
-        name_lower = input_def.name.lower()
-        data_type = input_def.data_type.lower()
+        name_lower = name.lower()
+        data_type = data_type.lower()
         
         # Check for domain-specific defaults
-        for domain_key, default_range in InputValueGenerator.DOMAIN_DEFAULTS.items():
-            if domain_key in name_lower:
-                if isinstance(default_range, tuple):
-                    return default_range
-                else:
-                    # String length
-                    return (0, default_range)
+        default_range = InputValueGenerator._match_domain(name_lower)
+        if default_range is not None:
+            if isinstance(default_range, tuple):
+                return default_range
+            else:
+                # String length
+                return (0, default_range)
         
         # Check units for hints
-        if input_def.unit:
-            unit_lower = input_def.unit.lower()
-            if 'feet' in unit_lower or 'ft' in unit_lower:
-                if 'alt' in name_lower:
-                    return (0, 100000)
-                return (0, 10000)
-            elif 'meter' in unit_lower or 'm' == unit_lower:
-                return (0, 10000)
-            elif 'celsius' in unit_lower or '°c' in unit_lower:
-                return (-273, 5000)
-            elif 'fahrenheit' in unit_lower or '°f' in unit_lower:
-                return (-459, 9000)
-            elif 'mph' in unit_lower or 'km/h' in unit_lower:
-                return (0, 500)
-            elif 'kg' in unit_lower or 'lb' in unit_lower:
-                return (0, 10000)
-            elif '%' in unit_lower or 'percent' in unit_lower:
-                return (0, 100)
+        if unit:
+            unit_range = InputValueGenerator._match_unit(unit.lower(), name_lower)
+            if unit_range is not None:
+                return unit_range
         
         # Data type defaults
         if data_type in ['int', 'integer']:
@@ -104,6 +129,100 @@ class InputValueGenerator:
         # Ultimate fallback
         return (0, 100)
     
+    @staticmethod
+    def _match_domain(name_lower: str) -> Any:
+        """
+        First DOMAIN_DEFAULTS entry (in dict order) whose key occurs in the name.
+        One regex scan finds every occurring key; the lowest priority index wins.
+        """
+        best = None
+        priority = InputValueGenerator._domain_priority
+        for match in InputValueGenerator._domain_matcher.finditer(name_lower):
+            key = match.group(1)
+            if best is None or priority[key] < priority[best]:
+                best = key
+        return InputValueGenerator.DOMAIN_DEFAULTS[best] if best is not None else None
+    
+    @staticmethod
+    def _match_unit(unit_lower: str, name_lower: str) -> Optional[tuple]:
+        """First UNIT_HINTS entry whose unit substring occurs in the unit"""
+        best = None
+        priority = InputValueGenerator._unit_priority
+        for match in InputValueGenerator._unit_matcher.finditer(unit_lower):
+            hint = match.group(1)
+            if best is None or priority[hint] < priority[best]:
+                best = hint
+        
+        if best is None:
+            # A bare "m" means meters
+            return (0, 10000) if unit_lower == 'm' else None
+        
+        unit_range = InputValueGenerator._unit_ranges[priority[best]]
+        if unit_range == 'feet':
+            return (0, 100000) if 'alt' in name_lower else (0, 10000)
+        return unit_range
+    
+    @staticmethod
+    def _compile_matchers() -> None:
+        """Builds the multi-pattern matchers over domain keys and unit hints"""
+        
+        domain_keys = list(InputValueGenerator.DOMAIN_DEFAULTS)
+        InputValueGenerator._domain_priority = {key: i for i, key in enumerate(domain_keys)}
+        InputValueGenerator._domain_matcher = _overlapping_matcher(domain_keys)
+        
+        unit_priority = {}
+        unit_ranges = []
+        for substrings, unit_range in InputValueGenerator.UNIT_HINTS:
+            # Feet ranges depend on the input name, resolved in _match_unit
+            resolved = 'feet' if 'feet' in substrings else unit_range
+            for substring in substrings:
+                if substring not in unit_priority:
+                    unit_priority[substring] = len(unit_ranges)
+                    unit_ranges.append(resolved)
+        InputValueGenerator._unit_priority = unit_priority
+        InputValueGenerator._unit_ranges = unit_ranges
+        InputValueGenerator._unit_matcher = _overlapping_matcher(list(unit_priority))
+        
+        _infer_range_cached.cache_clear()
+    
+    @staticmethod
+    def load_domain_pack(path: str) -> None:
+        """
+        Loads a JSON domain pack and recompiles the matchers.
+        
+        Format:
+            {"domains": {"rpm": [0, 20000], "vin": 17}, "units": {"psi": [0, 5000]}}
+        
+        Numeric domains are [min, max]; a single number is a string length.
+        Pack entries take precedence over the built-in defaults.
+        Raises ValueError naming the path if the pack cannot be read; nothing is loaded then.
+        """
+        try:
+            with open(path, encoding="utf-8") as f:
+                pack = json.load(f)
+            
+            domains = {}
+            for key, value in pack.get("domains", {}).items():
+                domains[key.lower()] = tuple(value) if isinstance(value, list) else value
+            units = [((unit.lower(),), tuple(value)) for unit, value in pack.get("units", {}).items()]
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            raise ValueError(f"Could not load domain pack {path}: {e}") from e
+        
+        InputValueGenerator.DOMAIN_DEFAULTS = {
+            **domains,
+            **{k: v for k, v in InputValueGenerator.DOMAIN_DEFAULTS.items() if k not in domains}
+        }
+        InputValueGenerator.UNIT_HINTS = units + InputValueGenerator.UNIT_HINTS
+        
+        InputValueGenerator._compile_matchers()
+    
+    @staticmethod
+    def load_domain_packs(paths: str) -> None:
+        """Loads every pack in an os.pathsep- or comma-separated list of paths"""
+        for path in re.split(r'[,' + re.escape(os.pathsep) + r']', paths):
+            if path.strip():
+                InputValueGenerator.load_domain_pack(path.strip())
+    
     @staticmethod
     def generate_bva_values(input_def: InputDefinition) -> List[Dict[str, Any]]:
         """
@@ -230,6 +349,27 @@ class InputValueGenerator:
         
         return values
     
+    @staticmethod
+    def generate_combinatorial_values(input_def: InputDefinition) -> List[Any]:
+        """
+        Valid representative values for t-way combination:
+        both booleans, every allowed value, or the valid BVA points
+        """
+        if input_def.data_type.lower() in ["bool", "boolean"]:
+            return [True, False]
+        
+        if input_def.allowed_values:
+            return list(input_def.allowed_values)
+        
+        if input_def.data_type.lower() in ["int", "integer", "float", "double", "number"]:
+            values = []
+            for val_info in InputValueGenerator.generate_bva_values(input_def):
+                if val_info["validity"] == "VALID" and val_info["value"] not in values:
+                    values.append(val_info["value"])
+            return values
+        
+        return []
+    
     @staticmethod
     def generate_negative_values(input_def: InputDefinition) -> List[Dict[str, Any]]:
         """
@@ -276,43 +416,52 @@ class InputValueGenerator:
         """
         MC/DC: Generate minimal combinations showing each condition's independence
         
-        For simplicity, generates all combinations for up to 3 conditions
-        For more complex cases, uses a simplified approach
+        Without the condition text the variables are taken as a conjunction;
+        MCDCEngine finds unique-cause pairs, giving n+1 combinations for n variables
         """
+        from services.mcdc_engine import MCDCEngine
         
         # Filter inputs that are part of the condition
         relevant_inputs = [inp for inp in inputs if inp.name in condition_variables]
+        if not relevant_inputs:
+            return []
         
-        if len(relevant_inputs) > 3:
-            # Simplified: test each variable true/false while others are true
-            combinations = []
-            for inp in relevant_inputs:
-                # All true
-                combo_all_true = {i.name: True for i in relevant_inputs}
-                combinations.append({
-                    "combination": combo_all_true,
-                    "description": "All conditions true"
-                })
-                
-                # One false
-                combo_one_false = {i.name: True for i in relevant_inputs}
-                combo_one_false[inp.name] = False
-                combinations.append({
-                    "combination": combo_one_false,
-                    "description": f"{inp.name} false, others true"
-                })
-            
-            return combinations
-        
-        # Full combinatorial for <= 3 variables
-        import itertools
+        tree = ("and", [("atom", i) for i in range(len(relevant_inputs))])
         combinations = []
         
-        for values in itertools.product([True, False], repeat=len(relevant_inputs)):
-            combo = {relevant_inputs[i].name: values[i] for i in range(len(relevant_inputs))}
+        for vector, _ in MCDCEngine.find_independence_vectors(tree, len(relevant_inputs)):
+            combo = {inp.name: value for inp, value in zip(relevant_inputs, vector)}
             combinations.append({
                 "combination": combo,
                 "description": ", ".join([f"{k}={v}" for k, v in combo.items()])
             })
         
         return combinations
+
+
+def _overlapping_matcher(keys: List[str]):
+    """
+    Regex reporting, at every position, the first key (in priority order) starting there.
+    The zero-width lookahead lets overlapping keys such as 'name' in 'username' all be found.
+    """
+    if not keys:
+        return re.compile(r'(?!)')
+    return re.compile('(?=(' + '|'.join(re.escape(key) for key in keys) + '))')
+
+
+@functools.lru_cache(maxsize=4096)
+def _infer_range_cached(
+    name: str,
+    data_type: str,
+    unit: Optional[str],
+    range_min: Optional[float],
+    range_max: Optional[float]
+) -> tuple:
+    return InputValueGenerator._infer_range_uncached(name, data_type, unit, range_min, range_max)
+
+
+InputValueGenerator._compile_matchers()
+try:
+    InputValueGenerator.load_domain_packs(os.getenv("DOMAIN_PACKS", ""))
+except ValueError as e:
+    raise ValueError(f"Invalid DOMAIN_PACKS setting: {e}") from e
@@ -0,0 +1,227 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, Optional
+
+
+class InterpretationCache:
+    """
+    Content-addressed cache of validated AI interpretations.
+
+    Two tiers:
+    - In-process LRU with TTL (fast path, per worker)
+    - SQLite file store (survives restarts, shared by all uvicorn workers)
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        ttl_seconds: float = 7 * 24 * 3600,
+        db_path: Optional[str] = None
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (stored_at, json_text)
+        self._lock = threading.Lock()
+        self._counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "bypasses": 0,
+            "writes": 0,
+            "evictions": 0,
+            "expired": 0,
+        }
+
+        if self.db_path:
+            self._init_db()
+
+    @classmethod
+    def from_env(cls) -> "InterpretationCache":
+        """Builds the cache from INTERPRETATION_CACHE_* environment variables"""
+        db_path = os.getenv("INTERPRETATION_CACHE_PATH", "interpretation_cache.db")
+        return cls(
+            max_entries=int(os.getenv("INTERPRETATION_CACHE_MAX_ENTRIES", "512")),
+            ttl_seconds=float(os.getenv("INTERPRETATION_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+            db_path=db_path or None
+        )
+
+    @staticmethod
+    def make_key(
+        requirement_text: str,
+        inputs: list,
+        outputs: list,
+        model_name: str,
+        prompt_version: str
+    ) -> str:
+        """
+        Canonical hash of everything that influences the AI interpretation.
+        requirement_id is deliberately excluded; it is re-stamped on every hit.
+        """
+        canonical = json.dumps(
+            {
+                "requirement_text": requirement_text,
+                "inputs": inputs,
+                "outputs": outputs,
+                "model": model_name,
+                "prompt_version": prompt_version,
+            },
+            sort_keys=True,
+            separators=(",", ":"),
+            default=str
+        )
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Returns a fresh copy of the cached interpretation, or None"""
+        now = time.time()
+        payload = self._memory_get(key, now)
+        if payload is None and self.db_path:
+            payload = self._disk_get(key, now)
+        return self._loaded(payload)
+
+    async def get_async(self, key: str) -> Optional[Dict[str, Any]]:
+        """Like get, but reads the SQLite tier in a worker thread; only the LRU tier runs on the loop"""
+        now = time.time()
+        payload = self._memory_get(key, now)
+        if payload is None and self.db_path:
+            payload = await asyncio.to_thread(self._disk_get, key, now)
+        return self._loaded(payload)
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        """Stores an interpretation in both tiers"""
+        stored_at, payload = self._remember_value(key, value)
+        if self.db_path:
+            self._db_set(key, stored_at, payload)
+
+    async def set_async(self, key: str, value: Dict[str, Any]) -> None:
+        """Like set, but writes the SQLite tier in a worker thread"""
+        stored_at, payload = self._remember_value(key, value)
+        if self.db_path:
+            await asyncio.to_thread(self._db_set, key, stored_at, payload)
+
+    def record_bypass(self) -> None:
+        with self._lock:
+            self._counters["bypasses"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["memory_entries"] = len(self._memory)
+
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 4) if lookups else 0.0
+        stats["max_entries"] = self.max_entries
+        stats["ttl_seconds"] = self.ttl_seconds
+        stats["persistent"] = bool(self.db_path)
+        return stats
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+        if self.db_path:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM interpretations")
+
+    def _memory_get(self, key: str, now: float) -> Optional[str]:
+        """Returns the payload from the LRU tier, or None"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            stored_at, payload = entry
+            if now - stored_at <= self.ttl_seconds:
+                self._memory.move_to_end(key)
+                self._counters["memory_hits"] += 1
+                return payload
+            del self._memory[key]
+            self._counters["expired"] += 1
+            return None
+
+    def _disk_get(self, key: str, now: float) -> Optional[str]:
+        """Returns the payload from the SQLite tier, promoting it into the LRU tier, or None"""
+        row = self._db_get(key)
+        if row is None:
+            return None
+        stored_at, payload = row
+        with self._lock:
+            if now - stored_at <= self.ttl_seconds:
+                self._counters["disk_hits"] += 1
+                self._remember(key, stored_at, payload)
+                return payload
+            self._counters["expired"] += 1
+            return None
+
+    def _loaded(self, payload: Optional[str]) -> Optional[Dict[str, Any]]:
+        if payload is None:
+            with self._lock:
+                self._counters["misses"] += 1
+            return None
+        return json.loads(payload)
+
+    def _remember_value(self, key: str, value: Dict[str, Any]) -> tuple:
+        """Serializes value into the LRU tier and returns (stored_at, payload) for the SQLite tier"""
+        stored_at = time.time()
+        payload = json.dumps(value, separators=(",", ":"), default=str)
+        with self._lock:
+            self._remember(key, stored_at, payload)
+            self._counters["writes"] += 1
+        return stored_at, payload
+
+    def _remember(self, key: str, stored_at: float, payload: str) -> None:
+        """Insert into the LRU tier; caller must hold the lock"""
+        self._memory[key] = (stored_at, payload)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # Short-lived connections keep this safe across threads and worker processes
+        conn = sqlite3.connect(self.db_path, timeout=5.0)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _init_db(self) -> None:
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            # WAL is a property of the database file, so setting it once here covers every later connection
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS interpretations ("
+                "key TEXT PRIMARY KEY, stored_at REAL NOT NULL, payload TEXT NOT NULL)"
+            )
+
+    def _db_get(self, key: str) -> Optional[tuple]:
+        try:
+            with self._connect() as conn:
+                return conn.execute(
+                    "SELECT stored_at, payload FROM interpretations WHERE key = ?", (key,)
+                ).fetchone()
+        except sqlite3.Error:
+            # The disk tier is best-effort; a locked or corrupt file must not fail the request
+            return None
+
+    def _db_set(self, key: str, stored_at: float, payload: str) -> None:
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO interpretations (key, stored_at, payload) VALUES (?, ?, ?)",
+                    (key, stored_at, payload)
+                )
+        except sqlite3.Error:
+            pass
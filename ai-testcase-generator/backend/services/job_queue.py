@@ -0,0 +1,564 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+from models.schemas import (
+    GenerateTestCasesRequest,
+    BatchGenerateTestCasesRequest,
+    BatchItemResult,
+    JobInfo,
+    JobStatus
+)
+from services.generation_pipeline import GenerationPipeline
+from services.interpretation_cache import InterpretationCache
+from services.metrics import Metrics
+from ai.resilience import CircuitOpenError
+
+
+QUEUED = JobStatus.QUEUED.value
+RUNNING = JobStatus.RUNNING.value
+SUCCEEDED = JobStatus.SUCCEEDED.value
+FAILED = JobStatus.FAILED.value
+
+# Job kinds
+GENERATE = "generate"
+BATCH = "batch"
+
+# The last event of every job
+TERMINAL_EVENTS = frozenset({"succeeded", "failed"})
+
+# (event id, event name, JSON payload)
+JobEvent = Tuple[int, str, str]
+
+logger = logging.getLogger(__name__)
+
+
+class JobStore:
+    """
+    SQLite store of background jobs and their progress events. It survives restarts
+    and is shared by all uvicorn workers.
+
+    A job belongs to the queue running it, or to the queue that accepted it and holds
+    its API key, for as long as that queue renews its lease. Once the lease lapses
+    (the process died or was restarted) any queue may take the job over.
+    Requests are stored without their API key.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._init_db()
+
+    @classmethod
+    def from_env(cls) -> "JobStore":
+        return cls(os.getenv("JOB_STORE_PATH", "jobs.db"))
+
+    def create(self, kind: str, request_json: str, owner: str, lease_seconds: float, items_total: Optional[int] = None) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, status, request, owner, lease_until, items_total, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, QUEUED, request_json, owner, now + lease_seconds, items_total, now)
+            )
+            JobStore._append(conn, job_id, "queued", {"kind": kind})
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """The job's state, without its request or result"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id, kind, status, stage, attempts, items_done, items_total, error, "
+                "created_at, started_at, finished_at FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        return dict(row) if row is not None else None
+
+    def result(self, job_id: str) -> Optional[str]:
+        """JSON of a succeeded job's response"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT result FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row["result"] if row is not None else None
+
+    def events(self, job_id: str, after: int = 0) -> List[JobEvent]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, event, data FROM job_events WHERE job_id = ? AND id > ? ORDER BY id",
+                (job_id, after)
+            ).fetchall()
+        return [(row["id"], row["event"], row["data"]) for row in rows]
+
+    def claim(self, owner: str, lease_seconds: float, max_attempts: int) -> Optional[Dict[str, Any]]:
+        """
+        Marks the oldest runnable job as running for owner and returns it: a queued job
+        this owner accepted or whose owner's lease lapsed, or a running job whose owner's
+        lease lapsed. A job that has used up max_attempts is failed instead.
+
+        The candidate is found without the write lock, so idle workers only read; the
+        job is then taken by an UPDATE that still requires it to be runnable, and a
+        worker that lost the race looks again.
+        """
+        while True:
+            now = time.time()
+            with self._connect() as conn:
+                job = conn.execute(
+                    "SELECT id, kind, status, request, attempts FROM jobs WHERE run_after <= ? AND ("
+                    "(status = ? AND (owner IS NULL OR owner = ? OR lease_until < ?)) "
+                    "OR (status = ? AND lease_until < ?)) ORDER BY created_at LIMIT 1",
+                    (now, QUEUED, owner, now, RUNNING, now)
+                ).fetchone()
+            if job is None:
+                return None
+
+            with self._transaction() as conn:
+                now = time.time()
+                if job["status"] == RUNNING:
+                    runnable = "status = ? AND lease_until < ?"
+                    params = (RUNNING, now)
+                else:
+                    runnable = "status = ? AND run_after <= ? AND (owner IS NULL OR owner = ? OR lease_until < ?)"
+                    params = (QUEUED, now, owner, now)
+                runnable = f"id = ? AND attempts = ? AND {runnable}"
+                params = (job["id"], job["attempts"], *params)
+
+                if job["attempts"] >= max_attempts:
+                    error = f"Gave up after {job['attempts']} interrupted attempts"
+                    taken = conn.execute(
+                        f"UPDATE jobs SET status = ?, error = ?, owner = NULL, finished_at = ? WHERE {runnable}",
+                        (FAILED, error, now, *params)
+                    ).rowcount
+                    if taken:
+                        if job["status"] == RUNNING:
+                            JobStore._append(conn, job["id"], "requeued", {"reason": "the worker running it was lost"})
+                        JobStore._append(conn, job["id"], "failed", {"error": error})
+                    continue
+
+                attempt = job["attempts"] + 1
+                taken = conn.execute(
+                    "UPDATE jobs SET status = ?, owner = ?, lease_until = ?, attempts = ?, started_at = ?, "
+                    "stage = NULL, items_done = CASE WHEN items_total IS NULL THEN NULL ELSE 0 END "
+                    f"WHERE {runnable}",
+                    (RUNNING, owner, now + lease_seconds, attempt, now, *params)
+                ).rowcount
+                if not taken:
+                    continue
+                if job["status"] == RUNNING:
+                    JobStore._append(conn, job["id"], "requeued", {"reason": "the worker running it was lost"})
+                JobStore._append(conn, job["id"], "started", {"attempt": attempt})
+            return {"id": job["id"], "kind": job["kind"], "request": job["request"], "attempts": attempt}
+
+    def renew(self, owner: str, lease_seconds: float, running: Iterable[str] = ()) -> None:
+        """
+        Extends the lease on owner's queued jobs and on the running jobs it is still
+        working on; a running job left out is taken over once its lease lapses
+        """
+        running = list(running)
+        placeholders = ", ".join("?" * len(running))
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET lease_until = ? WHERE owner = ? AND "
+                f"(status = ? OR (status = ? AND id IN ({placeholders})))",
+                (time.time() + lease_seconds, owner, QUEUED, RUNNING, *running)
+            )
+
+    def set_stage(self, job_id: str, stage: str) -> None:
+        with self._transaction() as conn:
+            conn.execute("UPDATE jobs SET stage = ? WHERE id = ?", (stage, job_id))
+            JobStore._append(conn, job_id, "stage", {"stage": stage})
+
+    def add_item(self, job_id: str, requirement_id: str, status: str) -> None:
+        """One requirement of a batch job finished"""
+        with self._transaction() as conn:
+            conn.execute("UPDATE jobs SET items_done = items_done + 1 WHERE id = ?", (job_id,))
+            row = conn.execute("SELECT items_done, items_total FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            JobStore._append(conn, job_id, "item", {
+                "requirement_id": requirement_id,
+                "status": status,
+                "items_done": row["items_done"],
+                "items_total": row["items_total"]
+            })
+
+    def succeed(self, job_id: str, result_json: str) -> None:
+        with self._transaction() as conn:
+            JobStore._finish(conn, job_id, SUCCEEDED, result_json, None)
+
+    def fail(self, job_id: str, error: str) -> None:
+        with self._transaction() as conn:
+            JobStore._finish(conn, job_id, FAILED, None, error)
+
+    def retry(self, job_id: str, error: str, delay: float) -> None:
+        """Queues a running job again, to be started no sooner than delay seconds from now"""
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, run_after = ?, stage = NULL WHERE id = ?",
+                (QUEUED, time.time() + delay, job_id)
+            )
+            JobStore._append(conn, job_id, "retrying", {"error": error, "retry_after": round(delay, 1)})
+
+    def release(self, owner: str) -> None:
+        """
+        Hands owner's unfinished jobs back to any queue, on shutdown. An interrupted
+        run does not count as an attempt.
+        """
+        with self._transaction() as conn:
+            running = conn.execute(
+                "SELECT id FROM jobs WHERE owner = ? AND status = ?", (owner, RUNNING)
+            ).fetchall()
+            for row in running:
+                JobStore._append(conn, row["id"], "requeued", {"reason": "the server shut down"})
+            conn.execute(
+                "UPDATE jobs SET attempts = CASE WHEN status = ? THEN attempts - 1 ELSE attempts END, "
+                "status = ?, owner = NULL, lease_until = 0, stage = NULL WHERE owner = ? AND status IN (?, ?)",
+                (RUNNING, QUEUED, owner, QUEUED, RUNNING)
+            )
+
+    def purge(self, finished_before: float) -> None:
+        """Deletes jobs that finished before the given time, with their events"""
+        with self._transaction() as conn:
+            conn.execute(
+                "DELETE FROM job_events WHERE job_id IN "
+                "(SELECT id FROM jobs WHERE status IN (?, ?) AND finished_at < ?)",
+                (SUCCEEDED, FAILED, finished_before)
+            )
+            conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                (SUCCEEDED, FAILED, finished_before)
+            )
+
+    @staticmethod
+    def _finish(conn: sqlite3.Connection, job_id: str, status: str, result_json: Optional[str], error: Optional[str]) -> None:
+        conn.execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, owner = NULL, finished_at = ? WHERE id = ?",
+            (status, result_json, error, time.time(), job_id)
+        )
+        if status == SUCCEEDED:
+            JobStore._append(conn, job_id, "succeeded", {})
+        else:
+            JobStore._append(conn, job_id, "failed", {"error": error})
+
+    @staticmethod
+    def _append(conn: sqlite3.Connection, job_id: str, event: str, data: Dict[str, Any]) -> None:
+        conn.execute(
+            "INSERT INTO job_events (job_id, event, data, created_at) VALUES (?, ?, ?, ?)",
+            (job_id, event, json.dumps(data), time.time())
+        )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # Short-lived connections keep this safe across threads and worker processes
+        conn = sqlite3.connect(self.db_path, timeout=5.0, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        # IMMEDIATE takes the write lock up front, so two workers never claim the same job
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def _init_db(self) -> None:
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._transaction() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, request TEXT NOT NULL, "
+                "owner TEXT, lease_until REAL NOT NULL DEFAULT 0, run_after REAL NOT NULL DEFAULT 0, "
+                "attempts INTEGER NOT NULL DEFAULT 0, stage TEXT, items_done INTEGER, items_total INTEGER, "
+                "result TEXT, error TEXT, created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS job_events ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, job_id TEXT NOT NULL, event TEXT NOT NULL, "
+                "data TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS job_events_job ON job_events (job_id, id)")
+
+
+class JobQueue:
+    """
+    Runs generation requests as background jobs, so large requirements and bulk imports
+    need not finish within one HTTP request. Each job runs the same pipeline as the
+    synchronous endpoints, and the stored result is the response they would have returned.
+
+    A pool of asyncio workers claims jobs from the JobStore, oldest first. Progress
+    (started, each pipeline stage, each batch item, the outcome) is written to the store
+    as events, which clients poll or follow.
+
+    API keys are held in this process's memory only. A job taken over after a restart
+    runs with GEMINI_API_KEY; without it, the job fails and must be resubmitted.
+    """
+
+    WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+    LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "30"))
+    MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+    POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1"))
+    RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
+    PURGE_SECONDS = float(os.getenv("JOB_PURGE_SECONDS", "3600"))
+
+    STREAM_MEDIA_TYPES = GenerationPipeline.STREAM_MEDIA_TYPES
+
+    def __init__(self, store: JobStore, cache: Optional[InterpretationCache] = None, workers: Optional[int] = None):
+        self.store = store
+        self.cache = cache
+        self.workers = workers or JobQueue.WORKERS
+        self.instance_id = uuid.uuid4().hex
+        self._keys: Dict[str, str] = {}
+        self._running: Set[str] = set()
+        self._tasks: List[asyncio.Task] = []
+        self._work: Optional[asyncio.Event] = None
+        self._progress: Optional[asyncio.Queue] = None
+        self._waiters: Dict[str, Set[asyncio.Future]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def start(self) -> None:
+        """Starts the workers and the lease renewal; jobs left by a previous run are picked up"""
+        self._loop = asyncio.get_running_loop()
+        self._work = asyncio.Event()
+        self._progress = asyncio.Queue()
+        await asyncio.to_thread(self.store.purge, time.time() - JobQueue.RETENTION_SECONDS)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._renew_leases()))
+        self._tasks.append(asyncio.create_task(self._write_progress()))
+
+    async def stop(self) -> None:
+        """Stops the workers; their running jobs are queued again for the next start"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await asyncio.to_thread(self.store.release, self.instance_id)
+
+    async def submit(self, request: Union[GenerateTestCasesRequest, BatchGenerateTestCasesRequest]) -> JobInfo:
+        if isinstance(request, BatchGenerateTestCasesRequest):
+            kind, items_total = BATCH, len(request.requirements)
+        else:
+            kind, items_total = GENERATE, None
+
+        job_id = await asyncio.to_thread(
+            self.store.create,
+            kind,
+            request.model_dump_json(exclude={"gemini_api_key"}),
+            self.instance_id,
+            JobQueue.LEASE_SECONDS,
+            items_total
+        )
+        self._keys[job_id] = request.gemini_api_key
+        self._work.set()
+        return await self.info(job_id)
+
+    async def info(self, job_id: str) -> Optional[JobInfo]:
+        job = await asyncio.to_thread(self.store.get, job_id)
+        if job is None:
+            return None
+        return JobInfo(
+            job_id=job["id"],
+            kind=job["kind"],
+            status=job["status"],
+            stage=job["stage"],
+            attempts=job["attempts"],
+            items_done=job["items_done"],
+            items_total=job["items_total"],
+            error=job["error"],
+            created_at=JobQueue._timestamp(job["created_at"]),
+            started_at=JobQueue._timestamp(job["started_at"]),
+            finished_at=JobQueue._timestamp(job["finished_at"])
+        )
+
+    async def info_json(self, job_id: str) -> Optional[str]:
+        """The job's state as JSON, with a "result" member holding the response once it succeeded"""
+        info = await self.info(job_id)
+        if info is None:
+            return None
+        result = await asyncio.to_thread(self.store.result, job_id) if info.status == JobStatus.SUCCEEDED else None
+        return info.model_dump_json()[:-1] + ',"result":' + (result or "null") + "}"
+
+    async def follow(self, job_id: str, after: int = 0) -> AsyncIterator[JobEvent]:
+        """
+        The job's events after the given event id, then new ones as they happen,
+        until the job succeeds or fails. Events written by other processes are
+        seen within POLL_SECONDS.
+        """
+        while True:
+            waiter = self._loop.create_future()
+            self._waiters.setdefault(job_id, set()).add(waiter)
+            try:
+                for event in await asyncio.to_thread(self.store.events, job_id, after):
+                    yield event
+                    after = event[0]
+                    if event[1] in TERMINAL_EVENTS:
+                        return
+                await asyncio.wait({waiter}, timeout=JobQueue.POLL_SECONDS)
+            finally:
+                waiters = self._waiters.get(job_id)
+                if waiters is not None:
+                    waiters.discard(waiter)
+                    if not waiters:
+                        del self._waiters[job_id]
+
+    @staticmethod
+    def encode_event(event: JobEvent, stream_format: str) -> str:
+        """An NDJSON line or an SSE event; the SSE id lets clients resume with Last-Event-ID"""
+        event_id, name, data = event
+        if stream_format == "sse":
+            return f"id: {event_id}\nevent: {name}\ndata: {data}\n\n"
+        return '{"id":' + str(event_id) + ',"event":"' + name + '","data":' + data + '}\n'
+
+    async def _worker(self) -> None:
+        while True:
+            # Cleared before claiming, so a job submitted meanwhile still wakes the worker
+            self._work.clear()
+            try:
+                job = await asyncio.to_thread(
+                    self.store.claim, self.instance_id, JobQueue.LEASE_SECONDS, JobQueue.MAX_ATTEMPTS
+                )
+            except sqlite3.Error as e:
+                logger.warning("Could not claim a job: %s", e)
+                job = None
+            if job is None:
+                # Polling also finds jobs queued by other processes, retries that came due and lapsed leases
+                try:
+                    await asyncio.wait_for(self._work.wait(), JobQueue.POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            self._notify(job["id"])
+            self._running.add(job["id"])
+            try:
+                await self._run(job)
+            except Exception:
+                # Typically the store stayed locked while the outcome was recorded. The worker
+                # carries on; the job's lease is no longer renewed, so it is started again
+                # once the lease lapses.
+                logger.exception("Job %s stopped without a recorded outcome", job["id"])
+            finally:
+                self._running.discard(job["id"])
+
+    async def _run(self, job: Dict[str, Any]) -> None:
+        job_id = job["id"]
+        api_key = self._keys.get(job_id) or os.getenv("GEMINI_API_KEY", "")
+        if not api_key:
+            await self._end(job_id, error="The API key is not kept across restarts; set GEMINI_API_KEY or submit the job again")
+            return
+
+        timings, token = Metrics.begin_request(lambda stage: self._on_stage(job_id, stage))
+        start = time.perf_counter()
+        outcome = "cancelled"
+        try:
+            result = await self._execute(job, api_key)
+        except CircuitOpenError as e:
+            if job["attempts"] < JobQueue.MAX_ATTEMPTS:
+                outcome = "retrying"
+                await self._progress.join()
+                await asyncio.to_thread(self.store.retry, job_id, str(e), e.retry_after)
+                self._notify(job_id)
+            else:
+                outcome = "failed"
+                await self._end(job_id, error=str(e))
+        except ValueError as e:
+            outcome = "failed"
+            await self._end(job_id, error=str(e))
+        except Exception as e:
+            outcome = "failed"
+            await self._end(job_id, error=f"Internal server error: {str(e)}")
+        else:
+            outcome = "succeeded"
+            await self._end(job_id, result=result)
+        finally:
+            Metrics.end_job(token, job["kind"], outcome, time.perf_counter() - start)
+
+    async def _execute(self, job: Dict[str, Any], api_key: str) -> str:
+        """The response JSON of the job's request"""
+        request = json.loads(job["request"])
+        request["gemini_api_key"] = api_key
+
+        if job["kind"] == BATCH:
+            batch = BatchGenerateTestCasesRequest.model_validate(request)
+            response = await GenerationPipeline.run_batch(
+                batch, self.cache, on_result=lambda item: self._on_item(job["id"], item)
+            )
+            return response.model_dump_json()
+
+        body = await GenerationPipeline.run_json(GenerateTestCasesRequest.model_validate(request), self.cache)
+        return body.decode("utf-8")
+
+    async def _end(self, job_id: str, result: Optional[str] = None, error: Optional[str] = None) -> None:
+        """Records the outcome: the response JSON, or the error"""
+        # The outcome is the job's last event; progress still queued is written first
+        await self._progress.join()
+        if error is None:
+            await asyncio.to_thread(self.store.succeed, job_id, result)
+        else:
+            await asyncio.to_thread(self.store.fail, job_id, error)
+        self._keys.pop(job_id, None)
+        self._notify(job_id)
+
+    def _on_stage(self, job_id: str, stage: str) -> None:
+        """RequestTimings callback; runs on the event loop or a worker thread"""
+        self._loop.call_soon_threadsafe(self._progress.put_nowait, (job_id, self.store.set_stage, (job_id, stage)))
+
+    def _on_item(self, job_id: str, item: BatchItemResult) -> None:
+        self._progress.put_nowait((job_id, self.store.add_item, (job_id, item.requirement_id, item.status)))
+
+    async def _write_progress(self) -> None:
+        """Writes queued progress in order, off the event loop, then wakes the job's followers"""
+        while True:
+            job_id, write, args = await self._progress.get()
+            try:
+                await asyncio.to_thread(write, *args)
+            except sqlite3.Error:
+                # Progress is best-effort; the job itself must not fail over it
+                pass
+            else:
+                self._notify(job_id)
+            finally:
+                self._progress.task_done()
+
+    async def _renew_leases(self) -> None:
+        """Renews this process's leases, and every PURGE_SECONDS deletes jobs past RETENTION_SECONDS"""
+        purge_at = time.monotonic() + JobQueue.PURGE_SECONDS
+        while True:
+            await asyncio.sleep(JobQueue.LEASE_SECONDS / 3)
+            try:
+                await asyncio.to_thread(
+                    self.store.renew, self.instance_id, JobQueue.LEASE_SECONDS, tuple(self._running)
+                )
+            except sqlite3.Error as e:
+                logger.warning("Could not renew job leases: %s", e)
+            if time.monotonic() >= purge_at:
+                purge_at = time.monotonic() + JobQueue.PURGE_SECONDS
+                try:
+                    await asyncio.to_thread(self.store.purge, time.time() - JobQueue.RETENTION_SECONDS)
+                except sqlite3.Error as e:
+                    logger.warning("Could not purge finished jobs: %s", e)
+
+    def _notify(self, job_id: str) -> None:
+        """Wakes this process's followers of the job; safe from any thread"""
+        self._loop.call_soon_threadsafe(self._wake, job_id)
+
+    def _wake(self, job_id: str) -> None:
+        for waiter in self._waiters.get(job_id, ()):
+            if not waiter.done():
+                waiter.set_result(None)
+
+    @staticmethod
+    def _timestamp(value: Optional[float]) -> Optional[str]:
+        return datetime.utcfromtimestamp(value).isoformat() if value is not None else None
@@ -1,113 +1,252 @@
-from typing import List, Dict, Any
-from models.schemas import Rule, InputDefinition, TestCase, Priority, Validity, Traceability
+from typing import List, Dict, Any, Optional, Tuple, Callable
+from models.schemas import Rule, InputDefinition, Priority
+from services.condition_parser import ConditionParser, ParsedCondition, Node, evaluate_tree
+from services.test_suite_store import TestSuiteStore
+
+
+# One truth value per atom
+Vector = Tuple[bool, ...]
 
 
 class MCDCEngine:
     """Modified Condition/Decision Coverage test generation"""
-    
+
+    # Backtracking steps allowed per atom before giving up on its independence pair
+    MAX_SEARCH_STEPS = 100000
+
     @staticmethod
     def generate_mcdc_tests(
         rule: Rule,
         inputs: List[InputDefinition],
-        requirement_id: str,
-        tc_counter: Dict[str, int]
-    ) -> List[TestCase]:
+        store: TestSuiteStore
+    ) -> None:
         """
-        Generates MC/DC test cases for compound conditions
+        Generates MC/DC test cases for compound conditions into the store.
+
+        The condition is parsed into a boolean expression over atomic conditions;
+        each atom gets a unique-cause independence pair (two tests differing only in
+        that atom and in the decision), sharing tests between pairs where possible.
         """
-        
-        test_cases = []
-        
-        # Extract condition variables from rule
-        condition_vars = MCDCEngine._extract_condition_variables(rule.condition, inputs)
-        
-        if len(condition_vars) == 0:
-            return []
-        
-        # Generate MC/DC combinations
-        # For simplicity: all true, then each false individually
-        
-        # Base case: all true
-        all_true_inputs = {}
-        for var in condition_vars:
-            inp = next((i for i in inputs if i.name == var), None)
-            if inp:
-                all_true_inputs[var] = MCDCEngine._get_true_value(inp)
-        
-        tc_id = f"TC_{requirement_id}_{tc_counter['count']}"
-        tc_counter['count'] += 1
-        
-        test_cases.append(TestCase(
-            tc_id=tc_id,
-            rule_id=rule.rule_id,
-            test_type="MC/DC",
-            scenario=f"All conditions true for {rule.rule_id}",
-            inputs=all_true_inputs,
-            expected_output={"result": "All conditions satisfied"},
-            priority=Priority.HIGH,
-            validity=Validity.VALID,
-            traceability=Traceability(
-                requirement=requirement_id,
-                rule=rule.rule_id
+
+        parsed = ConditionParser.parse(rule.condition, inputs)
+        if parsed.tree is None:
+            return
+
+        vectors = MCDCEngine.find_independence_vectors(
+            parsed.tree,
+            len(parsed.atoms),
+            lambda vector, atom: MCDCEngine._feasible(parsed, vector, atom)
+        )
+
+        base = store.add_base({})
+
+        for vector, atom_index in vectors:
+            decision = parsed.evaluate(list(vector))
+            expected_output = {"result": "Condition satisfied" if decision else "Condition not satisfied"}
+
+            if atom_index is None:
+                scenario_format, scenario_args = "MC/DC base case for {}: decision {}", (rule.rule_id, decision)
+            else:
+                scenario_format = "MC/DC independence of '{}' for {}: decision {}"
+                scenario_args = (parsed.atoms[atom_index].text, rule.rule_id, decision)
+
+            store.append(
+                rule.rule_id,
+                "MC/DC",
+                scenario_format,
+                scenario_args,
+                base,
+                MCDCEngine._realize(parsed, vector),
+                expected_output,
+                Priority.HIGH if atom_index is None else Priority.MEDIUM,
+                True
             )
-        ))
+
+    @staticmethod
+    def find_independence_vectors(
+        tree: Node,
+        atom_count: int,
+        feasible: Optional[Callable[[Vector, int], bool]] = None
+    ) -> List[Tuple[Vector, Optional[int]]]:
+        """
+        Unique-cause MC/DC test vectors for an expression tree.
+
+        Returns (vector, atom) pairs in test order; atom is the condition whose
+        independence the vector completes, None for the first vector. For each atom:
+        1. an existing pair of tests already showing independence costs nothing
+        2. else an existing test whose flip toggles the decision costs one test
+        3. else a backtracking search over the boolean difference costs two
+        Yields n+1 to 2n tests; never enumerates the 2^n truth table.
+
+        feasible(vector, atom) may reject atom assignments that cannot be realised
+        together (e.g. "speed > 100" and "speed < 50" both true).
+        """
+
+        feasible = feasible or (lambda vector, atom: True)
+        tests: List[Vector] = []
+        known = set()
+        vectors: List[Tuple[Vector, Optional[int]]] = []
+
+        def decide(vector) -> Optional[bool]:
+            return evaluate_tree(tree, list(vector))
+
+        def add(vector: Vector, atom: Optional[int]) -> None:
+            tests.append(vector)
+            known.add(vector)
+            vectors.append((vector, atom))
+
+        for i in range(atom_count):
+            flips = [(t, t[:i] + (not t[i],) + t[i + 1:]) for t in tests]
+
+            # 1. Already shown by two existing tests
+            if any(flipped in known and decide(t) != decide(flipped) for t, flipped in flips):
+                continue
+
+            # 2. One new test
+            flip = next(
+                (
+                    flipped for t, flipped in flips
+                    if decide(t) != decide(flipped) and MCDCEngine._fully_feasible(flipped, feasible)
+                ),
+                None
+            )
+            if flip is not None:
+                add(flip, i)
+                continue
+
+            # 3. Two new tests
+            preferred = tests[0] if tests else (True,) * atom_count
+            pair = MCDCEngine._search_pair(tree, atom_count, i, preferred, feasible)
+            if pair is None:
+                continue  # Masked or redundant condition; no unique-cause pair exists
+            for vector in pair:
+                if vector not in known:
+                    add(vector, i if tests else None)
+
+        return vectors
+
+    @staticmethod
+    def _search_pair(
+        tree: Node,
+        atom_count: int,
+        target: int,
+        preferred: Vector,
+        feasible: Callable[[Vector, int], bool]
+    ) -> Optional[Tuple[Vector, Vector]]:
+        """
+        Backtracking search for an assignment of the other atoms under which the
+        decision differs for target=True and target=False (the boolean difference).
+        A branch is pruned as soon as the target's influence is blocked on every
+        path to the root, so read-once conditions solve without backtracking.
+        """
+
+        order = [j for j in range(atom_count) if j != target]
+        with_true: List[Optional[bool]] = [None] * atom_count
+        with_false: List[Optional[bool]] = [None] * atom_count
+        with_true[target] = True
+        with_false[target] = False
+        steps = [0]
+
+        def viable() -> bool:
+            return MCDCEngine._can_differ(tree, with_true, with_false, target)[2]
+
+        def assign(depth: int) -> bool:
+            if depth == len(order):
+                return evaluate_tree(tree, with_true) != evaluate_tree(tree, with_false)
+
+            j = order[depth]
+            for value in (preferred[j], not preferred[j]):
+                steps[0] += 1
+                if steps[0] > MCDCEngine.MAX_SEARCH_STEPS:
+                    return False
+                with_true[j] = value
+                with_false[j] = value
+                if (
+                    viable()
+                    and feasible(tuple(with_true), j)
+                    and feasible(tuple(with_false), j)
+                    and assign(depth + 1)
+                ):
+                    return True
+            with_true[j] = None
+            with_false[j] = None
+            return False
+
+        if not (feasible(tuple(with_true), target) and feasible(tuple(with_false), target)):
+            return None
+        if not assign(0):
+            return None
+        return tuple(with_true), tuple(with_false)
+
+    @staticmethod
+    def _can_differ(
+        node: Node,
+        with_true: List[Optional[bool]],
+        with_false: List[Optional[bool]],
+        target: int
+    ) -> Tuple[Optional[bool], Optional[bool], bool]:
+        """
+        (value with target=True, value with target=False, whether they can still differ)
+        under Kleene logic. A node can differ only if its two values are not already
+        equal and the target still reaches it through a child that can differ.
+        """
+        kind = node[0]
+        if kind == "atom":
+            return with_true[node[1]], with_false[node[1]], node[1] == target
         
-        # Each condition false individually
-        for var in condition_vars:
-            test_inputs = all_true_inputs.copy()
-            inp = next((i for i in inputs if i.name == var), None)
-            if inp:
-                test_inputs[var] = MCDCEngine._get_false_value(inp)
-            
-            tc_id = f"TC_{requirement_id}_{tc_counter['count']}"
-            tc_counter['count'] += 1
-            
-            test_cases.append(TestCase(
-                tc_id=tc_id,
-                rule_id=rule.rule_id,
-                test_type="MC/DC",
-                scenario=f"Condition {var} false for {rule.rule_id}",
-                inputs=test_inputs,
-                expected_output={"result": f"Condition {var} not satisfied"},
-                priority=Priority.MEDIUM,
-                validity=Validity.VALID,
-                traceability=Traceability(
-                    requirement=requirement_id,
-                    rule=rule.rule_id
-                )
-            ))
+        if kind == "not":
+            value_true, value_false, differ = MCDCEngine._can_differ(node[1], with_true, with_false, target)
+            return (
+                None if value_true is None else not value_true,
+                None if value_false is None else not value_false,
+                differ
+            )
         
-        return test_cases
+        # "and" is decided by any False, "or" by any True
+        controlling = kind == "or"
+        value_true = value_false = not controlling
+        differ = False
+        for child in node[1]:
+            child_true, child_false, child_differ = MCDCEngine._can_differ(child, with_true, with_false, target)
+            if value_true is not controlling:
+                value_true = controlling if child_true is controlling else (None if child_true is None else value_true)
+            if value_false is not controlling:
+                value_false = controlling if child_false is controlling else (None if child_false is None else value_false)
+            differ = differ or child_differ
+        decided_equal = value_true is not None and value_true == value_false
+        return value_true, value_false, differ and not decided_equal
     
     @staticmethod
-    def _extract_condition_variables(condition: str, inputs: List[InputDefinition]) -> List[str]:
-        """Extract variable names from condition text"""
-        variables = []
-        for inp in inputs:
-            if inp.name.lower() in condition.lower():
-                variables.append(inp.name)
-        return variables
-    
+    def _fully_feasible(vector: Vector, feasible: Callable[[Vector, int], bool]) -> bool:
+        return all(feasible(vector, j) for j in range(len(vector)))
+
     @staticmethod
-    def _get_true_value(input_def: InputDefinition) -> Any:
-        """Get a value that makes condition true"""
-        if input_def.data_type.lower() in ["bool", "boolean"]:
-            return True
-        elif input_def.range_min is not None and input_def.range_max is not None:
-            return (input_def.range_min + input_def.range_max) / 2
-        elif input_def.allowed_values:
-            return input_def.allowed_values[0]
-        else:
-            return "VALID_VALUE"
-    
+    def _feasible(parsed: ParsedCondition, vector: tuple, atom_index: int) -> bool:
+        """Whether one value of atom_index's input satisfies every assigned atom on that input"""
+        variable = parsed.atoms[atom_index].variable
+        return MCDCEngine._value_for(parsed, vector, variable) is not _NO_VALUE
+
     @staticmethod
-    def _get_false_value(input_def: InputDefinition) -> Any:
-        """Get a value that makes condition false"""
-        if input_def.data_type.lower() in ["bool", "boolean"]:
-            return False
-        elif input_def.range_min is not None:
-            return input_def.range_min - 1
-        elif input_def.allowed_values:
-            return "INVALID_VALUE"
-        else:
-            return None
+    def _value_for(parsed: ParsedCondition, vector: tuple, variable: str) -> Any:
+        constraints = [
+            (atom, vector[j]) for j, atom in enumerate(parsed.atoms)
+            if atom.variable == variable and vector[j] is not None
+        ]
+        for atom, _ in constraints:
+            for value in atom.candidates():
+                if all(other.evaluate(value) == truth for other, truth in constraints):
+                    return value
+        return _NO_VALUE
+
+    @staticmethod
+    def _realize(parsed: ParsedCondition, vector: Vector) -> Dict[str, Any]:
+        """Concrete input values for a truth vector, one per input named in the condition"""
+        values = {}
+        for atom in parsed.atoms:
+            if atom.variable not in values:
+                values[atom.variable] = MCDCEngine._value_for(parsed, vector, atom.variable)
+        return values
+
+
+# Marker for "no value satisfies these constraints"; None is a legitimate input value
+_NO_VALUE = object()
@@ -0,0 +1,244 @@
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from services.profiling import Profiler
+
+
+# Seconds; covers sub-millisecond engine stages up to multi-retry LLM calls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """Prometheus-style cumulative histogram with one label set per series"""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...], buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = sorted((labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items())
+        for labels, counts, total, count in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, le=repr(bound))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, le='+Inf')} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {count}")
+        return lines
+
+
+class Counter:
+    """Prometheus-style monotonic counter"""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            snapshot = sorted(self._values.items())
+        for labels, value in snapshot:
+            lines.append(f"{self.name}{_labels(self.label_names, labels)} {value}")
+        return lines
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], **extra: str) -> str:
+    pairs = list(zip(names, values)) + list(extra.items())
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class RequestTimings:
+    """
+    Stage timings of one HTTP request or job, in first-seen order. Repeated stages
+    (LLM attempts, a technique across rules) accumulate time and a count.
+    on_stage, when given, is called with each pipeline stage's name the first time it starts.
+    """
+
+    def __init__(self, on_stage: Optional[Callable[[str], None]] = None):
+        self._entries: Dict[str, List] = {}
+        self._lock = threading.Lock()
+        self._on_stage = on_stage
+
+    def reserve(self, name: str) -> None:
+        """Places a stage in the header order when it starts, ahead of the stages it contains"""
+        with self._lock:
+            started = name not in self._entries
+            self._entries.setdefault(name, [0.0, 0, 0])
+        if started and self._on_stage is not None:
+            self._on_stage(name)
+
+    def add(self, name: str, seconds: float, cases: int = 0) -> None:
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                entry = self._entries[name] = [0.0, 0, 0]
+            entry[0] += seconds
+            entry[1] += 1
+            entry[2] += cases
+
+    def server_timing(self) -> str:
+        """Server-Timing header value, e.g. 'interpret;dur=812.4, llm;dur=810.2;desc="2 attempts"'"""
+        parts = []
+        with self._lock:
+            entries = list(self._entries.items())
+        for name, (seconds, count, cases) in entries:
+            part = f"{name};dur={seconds * 1000:.1f}"
+            if name == "llm":
+                part += f';desc="{count} attempt{"s" if count != 1 else ""}"'
+            elif cases:
+                part += f';desc="{cases} cases"'
+            parts.append(part)
+        return ", ".join(parts)
+
+
+_current_timings: contextvars.ContextVar[Optional[RequestTimings]] = contextvars.ContextVar(
+    "request_timings", default=None
+)
+
+
+class Metrics:
+    """
+    Process-wide stage metrics, rendered at /metrics, plus per-request timings
+    for the Server-Timing header. Request timings follow the request through
+    awaits and worker threads (contextvars); process-pool workers are not traced.
+    """
+
+    STAGE_SECONDS = Histogram(
+        "tcg_stage_duration_seconds", "Time spent in each pipeline stage", ("stage",)
+    )
+    TECHNIQUE_SECONDS = Histogram(
+        "tcg_technique_build_seconds", "Time spent building one rule's cases of a technique", ("technique",)
+    )
+    TEST_CASES = Counter(
+        "tcg_test_cases_generated_total", "Test cases built, before deduplication", ("technique",)
+    )
+    LLM_ATTEMPT_SECONDS = Histogram(
+        "tcg_llm_attempt_duration_seconds", "Duration of each LLM call attempt", ("outcome",)
+    )
+    LLM_RETRIES = Counter("tcg_llm_retries_total", "LLM call attempts after the first")
+    LLM_TOKENS = Counter(
+        "tcg_llm_tokens_total", "LLM tokens used, as reported by the model or estimated", ("kind",)
+    )
+    REQUEST_SECONDS = Histogram(
+        "tcg_http_request_duration_seconds", "HTTP request time until the response headers", ("route", "status")
+    )
+    JOB_SECONDS = Histogram(
+        "tcg_job_duration_seconds", "Time a background job attempt spent running", ("kind", "outcome")
+    )
+
+    @staticmethod
+    def begin_request(on_stage: Optional[Callable[[str], None]] = None) -> Tuple[RequestTimings, contextvars.Token]:
+        timings = RequestTimings(on_stage)
+        return timings, _current_timings.set(timings)
+
+    @staticmethod
+    def end_request(token: contextvars.Token, route: str, status: int, seconds: float) -> None:
+        _current_timings.reset(token)
+        Metrics.REQUEST_SECONDS.observe(seconds, route, str(status))
+
+    @staticmethod
+    def end_job(token: contextvars.Token, kind: str, outcome: str, seconds: float) -> None:
+        _current_timings.reset(token)
+        Metrics.JOB_SECONDS.observe(seconds, kind, outcome)
+
+    @staticmethod
+    @contextmanager
+    def stage(name: str) -> Iterator[None]:
+        """Times the block as one pipeline stage, and profiles it when the request asked for it"""
+        timings = _current_timings.get()
+        if timings is not None:
+            timings.reserve(name)
+        profile = Profiler.current()
+        start = time.perf_counter()
+        try:
+            if profile is None:
+                yield
+            else:
+                with profile.capture(name):
+                    yield
+        finally:
+            elapsed = time.perf_counter() - start
+            Metrics.STAGE_SECONDS.observe(elapsed, name)
+            if timings is not None:
+                timings.add(name, elapsed)
+
+    @staticmethod
+    @contextmanager
+    def llm_attempt(attempt: int) -> Iterator[None]:
+        """Times one LLM call attempt (0-based); an exception leaving the block marks it failed"""
+        if attempt:
+            Metrics.LLM_RETRIES.inc()
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            yield
+            outcome = "ok"
+        finally:
+            elapsed = time.perf_counter() - start
+            Metrics.LLM_ATTEMPT_SECONDS.observe(elapsed, outcome)
+            timings = _current_timings.get()
+            if timings is not None:
+                timings.add("llm", elapsed)
+
+    @staticmethod
+    def record_llm_tokens(prompt_tokens: int, completion_tokens: int) -> None:
+        Metrics.LLM_TOKENS.inc(prompt_tokens, "prompt")
+        Metrics.LLM_TOKENS.inc(completion_tokens, "completion")
+
+    @staticmethod
+    def record_technique(technique: str, seconds: float, cases: int) -> None:
+        """One rule's worth of a technique's cases, built by TestCaseBuilder"""
+        Metrics.TECHNIQUE_SECONDS.observe(seconds, technique)
+        Metrics.TEST_CASES.inc(cases, technique)
+        timings = _current_timings.get()
+        if timings is not None:
+            timings.add("build." + technique.lower(), seconds, cases)
+
+    @staticmethod
+    def render() -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in (
+            Metrics.REQUEST_SECONDS,
+            Metrics.JOB_SECONDS,
+            Metrics.STAGE_SECONDS,
+            Metrics.TECHNIQUE_SECONDS,
+            Metrics.TEST_CASES,
+            Metrics.LLM_ATTEMPT_SECONDS,
+            Metrics.LLM_RETRIES,
+            Metrics.LLM_TOKENS,
+        ):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
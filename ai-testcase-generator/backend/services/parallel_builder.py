@@ -0,0 +1,164 @@
+import asyncio
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import List, Dict, Optional
+from models.schemas import Rule, InputDefinition, OutputDefinition
+from services.test_case_builder import TestCaseBuilder
+from services.test_suite_store import TestSuiteStore
+
+
+# Shared by every request in this process; created on first parallel build
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def max_workers() -> int:
+    """GENERATION_MAX_WORKERS, defaulting to the number of CPUs"""
+    return int(os.getenv("GENERATION_MAX_WORKERS", "0")) or os.cpu_count() or 1
+
+
+def pool_context():
+    """
+    Start method for pool workers. Forking a multi-threaded server can copy locks
+    held by other threads into the child, so workers come from a forkserver
+    (spawn where that is unavailable).
+    """
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=max_workers(), mp_context=pool_context())
+            atexit.register(shutdown_pool)
+        return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _build_shard(
+    shard: List[Rule],
+    rules: List[Rule],
+    inputs: List[InputDefinition],
+    outputs: List[OutputDefinition],
+    strategies: Dict[str, List[str]],
+    requirement_id: str,
+    combinatorial_strength: Optional[int]
+) -> TestSuiteStore:
+    """Worker entry point: builds the cases of one shard of rules"""
+    builder = TestCaseBuilder(combinatorial_strength)
+    return builder.build_suite(shard, inputs, outputs, strategies, requirement_id, context_rules=rules)
+
+
+class ParallelSuiteBuilder:
+    """
+    Builds a suite across a process pool, sharded by contiguous runs of rules.
+    Shards are merged in rule order and renumbered, so the result - tc_ids
+    included - is identical to TestCaseBuilder.build_suite.
+    """
+
+    # Shards per worker; more shards balance uneven rules, fewer cut pickling overhead
+    SHARDS_PER_WORKER = 4
+
+    @staticmethod
+    def build_suite(
+        rules: List[Rule],
+        inputs: List[InputDefinition],
+        outputs: List[OutputDefinition],
+        strategies: Dict[str, List[str]],
+        requirement_id: str,
+        combinatorial_strength: Optional[int] = None,
+        pool: Optional[ProcessPoolExecutor] = None,
+        workers: Optional[int] = None
+    ) -> TestSuiteStore:
+        """Blocks until every shard is built; pass pool and its worker count to use a pool other than the shared one"""
+        futures = ParallelSuiteBuilder._submit_shards(
+            rules, inputs, outputs, strategies, requirement_id, combinatorial_strength, pool, workers
+        )
+        if futures is None:
+            return TestCaseBuilder(combinatorial_strength).build_suite(
+                rules, inputs, outputs, strategies, requirement_id
+            )
+        return ParallelSuiteBuilder._merge(requirement_id, [future.result() for future in futures])
+
+    @staticmethod
+    async def build_suite_async(
+        rules: List[Rule],
+        inputs: List[InputDefinition],
+        outputs: List[OutputDefinition],
+        strategies: Dict[str, List[str]],
+        requirement_id: str,
+        combinatorial_strength: Optional[int] = None,
+        pool: Optional[ProcessPoolExecutor] = None,
+        workers: Optional[int] = None
+    ) -> TestSuiteStore:
+        """Same as build_suite, awaiting the shards so the event loop keeps serving other requests"""
+        futures = ParallelSuiteBuilder._submit_shards(
+            rules, inputs, outputs, strategies, requirement_id, combinatorial_strength, pool, workers
+        )
+        if futures is None:
+            return await asyncio.to_thread(
+                TestCaseBuilder(combinatorial_strength).build_suite,
+                rules, inputs, outputs, strategies, requirement_id
+            )
+        shards = await asyncio.gather(*(asyncio.wrap_future(future) for future in futures))
+        return await asyncio.to_thread(ParallelSuiteBuilder._merge, requirement_id, shards)
+
+    @staticmethod
+    def _submit_shards(
+        rules: List[Rule],
+        inputs: List[InputDefinition],
+        outputs: List[OutputDefinition],
+        strategies: Dict[str, List[str]],
+        requirement_id: str,
+        combinatorial_strength: Optional[int],
+        pool: Optional[ProcessPoolExecutor],
+        workers: Optional[int]
+    ) -> Optional[List[Future]]:
+        """One future per shard, or None when the rules are too few to shard"""
+        workers = workers or max_workers()
+        shard_count = min(len(rules), workers * ParallelSuiteBuilder.SHARDS_PER_WORKER)
+
+        if shard_count < 2:
+            return None
+
+        pool = pool or get_pool()
+
+        # Contiguous shards keep the serial rule order; each gets only its rules' strategies
+        size, extra = divmod(len(rules), shard_count)
+        futures = []
+        start = 0
+        for index in range(shard_count):
+            end = start + size + (1 if index < extra else 0)
+            shard = rules[start:end]
+            futures.append(pool.submit(
+                _build_shard,
+                shard,
+                rules,
+                inputs,
+                outputs,
+                {rule.rule_id: strategies.get(rule.rule_id, []) for rule in shard},
+                requirement_id,
+                combinatorial_strength
+            ))
+            start = end
+        return futures
+
+    @staticmethod
+    def _merge(requirement_id: str, shards: List[TestSuiteStore]) -> TestSuiteStore:
+        suite = TestSuiteStore(requirement_id)
+        for shard in shards:
+            suite.extend(shard)
+        suite.renumber()
+        return suite
@@ -0,0 +1,158 @@
+import contextvars
+import cProfile
+import hmac
+import io
+import json
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+# cProfile and tracemalloc are process-wide; one stage is captured at a time
+_capture_lock = threading.Lock()
+
+_current_profile: contextvars.ContextVar[Optional["RequestProfile"]] = contextvars.ContextVar(
+    "request_profile", default=None
+)
+
+_UNSAFE = re.compile(r'[^\w.-]+')
+
+
+class RequestProfile:
+    """
+    Profile of one request: a CPU profile and the top allocations of each pipeline stage,
+    written to their own directory as they complete:
+
+    NN_<stage>.prof        cProfile stats (open with pstats, snakeviz, ...)
+    NN_<stage>_cpu.txt     top functions by cumulative time
+    NN_<stage>_alloc.txt   top source lines by memory allocated during the stage and still held
+    summary.json           per-stage duration and peak traced memory
+    """
+
+    def __init__(self, directory: str, label: str):
+        self.directory = directory
+        self.label = label
+        self.started_at = datetime.utcnow().isoformat()
+        self.stages: List[Dict[str, Any]] = []
+        os.makedirs(directory, exist_ok=True)
+
+    @contextmanager
+    def capture(self, stage: str) -> Iterator[None]:
+        if not _capture_lock.acquire(blocking=False):
+            # Another profiled stage (a concurrent request) owns the profilers
+            self.stages.append({"stage": stage, "skipped": "another profiled stage was running"})
+            yield
+            return
+
+        prefix = os.path.join(self.directory, f"{len(self.stages) + 1:02d}_{_UNSAFE.sub('_', stage)}")
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(Profiler.TRACE_FRAMES)
+        tracemalloc.reset_peak()
+        before = tracemalloc.take_snapshot()
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        failed = True
+        try:
+            profiler.enable()
+            try:
+                yield
+                failed = False
+            finally:
+                profiler.disable()
+                elapsed = time.perf_counter() - start
+                _, peak = tracemalloc.get_traced_memory()
+                after = tracemalloc.take_snapshot()
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+            _capture_lock.release()
+
+            # Written even when the stage raised; a failing stage is often the one worth profiling
+            profiler.dump_stats(prefix + ".prof")
+            with open(prefix + "_cpu.txt", "w", encoding="utf-8") as f:
+                f.write(RequestProfile._cpu_report(profiler))
+            with open(prefix + "_alloc.txt", "w", encoding="utf-8") as f:
+                f.write(RequestProfile._alloc_report(before, after))
+
+            self.stages.append({
+                "stage": stage,
+                "seconds": round(elapsed, 6),
+                "peak_traced_kb": round(peak / 1024, 1),
+                "failed": failed,
+                "files": [os.path.basename(prefix + suffix) for suffix in (".prof", "_cpu.txt", "_alloc.txt")]
+            })
+
+    def write_summary(self, status: int) -> None:
+        summary = {
+            "request": self.label,
+            "started_at": self.started_at,
+            "status": status,
+            "stages": self.stages
+        }
+        with open(os.path.join(self.directory, "summary.json"), "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+
+    @staticmethod
+    def _cpu_report(profiler: cProfile.Profile) -> str:
+        out = io.StringIO()
+        stats = pstats.Stats(profiler, stream=out)
+        stats.sort_stats("cumulative").print_stats(Profiler.TOP_ENTRIES)
+        return out.getvalue()
+
+    @staticmethod
+    def _alloc_report(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot) -> str:
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        diff = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), "lineno")
+        lines = [f"Top {Profiler.TOP_ENTRIES} source lines by memory allocated during the stage and still held:"]
+        lines.extend(str(stat) for stat in diff[:Profiler.TOP_ENTRIES])
+        return "\n".join(lines) + "\n"
+
+
+class Profiler:
+    """
+    Opt-in per-request profiling for administrators.
+
+    Disabled unless PROFILING_ADMIN_TOKEN is set; a request is profiled only when it
+    carries that token in the X-Profile-Token header or the profile query parameter.
+    Unprofiled requests pay one context variable lookup per stage.
+    """
+
+    ADMIN_TOKEN = os.getenv("PROFILING_ADMIN_TOKEN", "")
+    DIRECTORY = os.getenv("PROFILE_DIR", "profiles")
+    HEADER = "x-profile-token"
+    QUERY_PARAM = "profile"
+
+    # Stack depth recorded per allocation, and entries per report
+    TRACE_FRAMES = 10
+    TOP_ENTRIES = 30
+
+    @staticmethod
+    def requested(headers, query_params) -> bool:
+        """True when profiling is enabled and the request presents the admin token"""
+        if not Profiler.ADMIN_TOKEN:
+            return False
+        token = headers.get(Profiler.HEADER) or query_params.get(Profiler.QUERY_PARAM)
+        return bool(token) and hmac.compare_digest(token.encode("utf-8"), Profiler.ADMIN_TOKEN.encode("utf-8"))
+
+    @staticmethod
+    def begin(label: str) -> Tuple[RequestProfile, contextvars.Token]:
+        profile_id = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        profile = RequestProfile(os.path.join(Profiler.DIRECTORY, profile_id), label)
+        return profile, _current_profile.set(profile)
+
+    @staticmethod
+    def end(profile: RequestProfile, token: contextvars.Token, status: int) -> None:
+        _current_profile.reset(token)
+        profile.write_summary(status)
+
+    @staticmethod
+    def current() -> Optional[RequestProfile]:
+        return _current_profile.get()
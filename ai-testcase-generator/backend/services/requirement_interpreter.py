@@ -1,38 +1,323 @@
+import asyncio
+import copy
 from ai.gemini_client import GeminiClient
+from ai.providers import UsageMeter
 from validators.ai_output_validator import AIOutputValidator
 from models.schemas import InterpretationResult, Rule
+from services.interpretation_cache import InterpretationCache
+from services.single_flight import SingleFlight
+from typing import Any, Callable, Dict, List, Optional, Union
 
 
 class RequirementInterpreter:
     """Orchestrates AI interpretation and validation"""
     
-    def __init__(self, api_key: str):
+    # Shared by every interpreter in the process, so identical concurrent requests make one AI call
+    flights = SingleFlight()
+    
+    def __init__(
+        self,
+        api_key: str,
+        cache: Optional[InterpretationCache] = None,
+        single_flight: Optional[SingleFlight] = None
+    ):
         self.ai_client = GeminiClient(api_key)
         self.validator = AIOutputValidator()
+        self.cache = cache
+        self.single_flight = single_flight or RequirementInterpreter.flights
     
     def interpret(
         self,
         requirement_id: str,
         requirement_text: str,
         inputs: list,
-        outputs: list
+        outputs: list,
+        use_cache: bool = True,
+        usage: Optional[UsageMeter] = None
     ) -> InterpretationResult:
         """
         Interprets requirement using AI and validates output
         """
         
+        cache_key = self._cache_key(requirement_text, inputs, outputs)
+        cached = self._cache_lookup(cache_key, requirement_id, use_cache, usage)
+        if cached is not None:
+            return self._to_interpretation(cached, inputs, outputs)
+        
         # Call AI
         ai_result = self.ai_client.interpret_requirement(
             requirement_id,
             requirement_text,
             inputs,
-            outputs
+            outputs,
+            usage
         )
         
+        return self._to_interpretation(ai_result, inputs, outputs, cache_key)
+    
+    async def interpret_async(
+        self,
+        requirement_id: str,
+        requirement_text: str,
+        inputs: list,
+        outputs: list,
+        use_cache: bool = True,
+        usage: Optional[UsageMeter] = None,
+        on_event: Optional[Callable[[str, Any, Any], None]] = None
+    ) -> InterpretationResult:
+        """
+        Asyncio-native variant of interpret; awaits the AI call instead of blocking the event loop
+        
+        Concurrent calls for the same requirement content share one in-flight AI call
+        and its validation; each caller then gets its own copy of the result. Only the
+        caller that made the call is charged its tokens in usage.
+        
+        With on_event, the AI answer is streamed and its rules and boundary values are
+        reported as they arrive (GeminiClient.interpret_requirement_streaming_async).
+        Nothing is reported on a cache hit or when joining another caller's AI call.
+        """
+        
+        cache_key = self._cache_key(requirement_text, inputs, outputs)
+        cached = await self._cache_lookup_async(cache_key, requirement_id, use_cache, usage)
+        if cached is not None:
+            return self._to_interpretation(cached, inputs, outputs)
+        
+        return await self._interpret_uncached_async(
+            requirement_id, requirement_text, inputs, outputs, cache_key, usage, on_event
+        )
+    
+    async def interpret_many_async(
+        self,
+        requirements: List[Dict],
+        max_concurrency: int = 8,
+        usages: Optional[List[UsageMeter]] = None
+    ) -> List[Union[InterpretationResult, Exception]]:
+        """
+        Interprets many requirements with packed prompts: cache misses are grouped into packs
+        (GeminiClient.pack_requirements) and each pack is one AI call.
+        
+        Each requirement is a dict with requirement_id, requirement_text, inputs, outputs and
+        optionally use_cache. Every interpretation in a pack is validated on its own; only
+        the ones that are missing or invalid (or a whole failed pack) are re-issued, one
+        call each. Returns one InterpretationResult or Exception per requirement, in order.
+        
+        With usages (one meter per requirement), each requirement is charged an equal
+        share of its pack's call plus its own re-issued calls.
+        """
+        
+        if usages is None:
+            usages = [UsageMeter() for _ in requirements]
+        
+        results: List[Union[InterpretationResult, Exception, None]] = [None] * len(requirements)
+        cache_keys = []
+        misses = []
+        for index, req in enumerate(requirements):
+            cache_key = self._cache_key(req["requirement_text"], req["inputs"], req["outputs"])
+            cache_keys.append(cache_key)
+            cached = await self._cache_lookup_async(cache_key, req["requirement_id"], req.get("use_cache", True), usages[index])
+            if cached is None:
+                misses.append(index)
+                continue
+            try:
+                results[index] = self._to_interpretation(cached, req["inputs"], req["outputs"])
+            except Exception as e:
+                results[index] = e
+        
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def interpret_one(index: int) -> None:
+            req = requirements[index]
+            try:
+                results[index] = await self._interpret_uncached_async(
+                    req["requirement_id"], req["requirement_text"], req["inputs"], req["outputs"],
+                    cache_keys[index], usages[index]
+                )
+            except Exception as e:
+                results[index] = e
+        
+        async def interpret_pack(pack: List[int]) -> None:
+            if len(pack) == 1:
+                async with semaphore:
+                    await interpret_one(pack[0])
+                return
+            
+            pack_usage = UsageMeter()
+            async with semaphore:
+                try:
+                    packed = await self.ai_client.interpret_requirements_packed_async(
+                        [requirements[index] for index in pack],
+                        pack_usage
+                    )
+                except Exception:
+                    packed = {}
+            for index in pack:
+                usages[index].add_share(pack_usage, 1 / len(pack))
+            
+            retry = []
+            for index in pack:
+                req = requirements[index]
+                ai_result = packed.get(req["requirement_id"])
+                if ai_result is None:
+                    retry.append(index)
+                    continue
+                try:
+                    await self._validate_and_cache_async(ai_result, cache_keys[index])
+                    results[index] = self._build_interpretation(ai_result, req["inputs"], req["outputs"])
+                except Exception:
+                    retry.append(index)
+            
+            # Re-issue only what the packed call did not deliver
+            for index in retry:
+                async with semaphore:
+                    await interpret_one(index)
+        
+        packs = GeminiClient.pack_requirements([requirements[index] for index in misses], self.ai_client.prompt)
+        await asyncio.gather(*(interpret_pack([misses[i] for i in pack]) for pack in packs))
+        return results
+    
+    async def _interpret_uncached_async(
+        self,
+        requirement_id: str,
+        requirement_text: str,
+        inputs: list,
+        outputs: list,
+        cache_key: Optional[str],
+        usage: Optional[UsageMeter] = None,
+        on_event: Optional[Callable[[str, Any, Any], None]] = None
+    ) -> InterpretationResult:
+        """Calls the AI for one requirement, sharing the call with identical ones in flight"""
+        
+        called = False
+        
+        async def call_ai() -> dict:
+            nonlocal called
+            called = True
+            if on_event is not None:
+                ai_result = await self.ai_client.interpret_requirement_streaming_async(
+                    requirement_id,
+                    requirement_text,
+                    inputs,
+                    outputs,
+                    on_event,
+                    usage
+                )
+            else:
+                ai_result = await self.ai_client.interpret_requirement_async(
+                    requirement_id,
+                    requirement_text,
+                    inputs,
+                    outputs,
+                    usage
+                )
+            await self._validate_and_cache_async(ai_result, cache_key)
+            return ai_result
+        
+        # Call AI, or join the identical call already in flight
+        flight_key = cache_key or self._content_key(requirement_text, inputs, outputs)
+        shared_result = await self.single_flight.do(flight_key, call_ai)
+        if usage is not None and not called:
+            # Joined another request's call: no tokens spent on this one
+            usage.cached = True
+        
+        ai_result = copy.deepcopy(shared_result)
+        ai_result["requirement_id"] = requirement_id
+        return self._build_interpretation(ai_result, inputs, outputs)
+    
+    def _cache_key(self, requirement_text: str, inputs: list, outputs: list) -> Optional[str]:
+        if self.cache is None:
+            return None
+        return self._content_key(requirement_text, inputs, outputs)
+    
+    def _content_key(self, requirement_text: str, inputs: list, outputs: list) -> str:
+        """Canonical key of everything that influences the AI interpretation, including the prompt this client sends"""
+        return InterpretationCache.make_key(
+            requirement_text,
+            inputs,
+            outputs,
+            GeminiClient.MODEL_NAME,
+            self.ai_client.prompt.version
+        )
+    
+    def _cache_lookup(
+        self,
+        cache_key: Optional[str],
+        requirement_id: str,
+        use_cache: bool,
+        usage: Optional[UsageMeter] = None
+    ) -> Optional[dict]:
+        """Returns a cached raw AI result re-stamped with requirement_id, or None"""
+        if not self._should_lookup(cache_key, use_cache, usage):
+            return None
+        return self._stamp_cached(self.cache.get(cache_key), requirement_id, usage)
+    
+    async def _cache_lookup_async(
+        self,
+        cache_key: Optional[str],
+        requirement_id: str,
+        use_cache: bool,
+        usage: Optional[UsageMeter] = None
+    ) -> Optional[dict]:
+        """Like _cache_lookup, but reads the cache's SQLite tier off the event loop"""
+        if not self._should_lookup(cache_key, use_cache, usage):
+            return None
+        return self._stamp_cached(await self.cache.get_async(cache_key), requirement_id, usage)
+    
+    def _should_lookup(self, cache_key: Optional[str], use_cache: bool, usage: Optional[UsageMeter]) -> bool:
+        if usage is not None:
+            usage.prompt_version = self.ai_client.prompt.version
+        if cache_key is None:
+            return False
+        if not use_cache:
+            self.cache.record_bypass()
+            return False
+        return True
+    
+    @staticmethod
+    def _stamp_cached(cached: Optional[dict], requirement_id: str, usage: Optional[UsageMeter]) -> Optional[dict]:
+        if cached is not None:
+            cached["requirement_id"] = requirement_id
+            if usage is not None:
+                usage.cached = True
+        return cached
+    
+    def _to_interpretation(
+        self,
+        ai_result: dict,
+        inputs: list,
+        outputs: list,
+        cache_key: Optional[str] = None
+    ) -> InterpretationResult:
+        """
+        Validates raw AI output and converts it to an InterpretationResult
+        """
+        
+        self._validate_and_cache(ai_result, cache_key)
+        return self._build_interpretation(ai_result, inputs, outputs)
+    
+    def _validate_and_cache(self, ai_result: dict, cache_key: Optional[str] = None) -> None:
+        """Raises ValueError for invalid AI output; caches it otherwise"""
+        
+        self._validate(ai_result)
+        
+        # Only validated results are cached; stored before any warnings are appended
+        if cache_key is not None:
+            self.cache.set(cache_key, ai_result)
+    
+    async def _validate_and_cache_async(self, ai_result: dict, cache_key: Optional[str] = None) -> None:
+        """Like _validate_and_cache, but writes the cache's SQLite tier off the event loop"""
+        
+        self._validate(ai_result)
+        if cache_key is not None:
+            await self.cache.set_async(cache_key, ai_result)
+    
+    def _validate(self, ai_result: dict) -> None:
         # Validate AI output structure
         is_valid, error_msg = self.validator.validate_interpretation(ai_result)
         if not is_valid:
             raise ValueError(f"AI output validation failed: {error_msg}")
+    
+    def _build_interpretation(self, ai_result: dict, inputs: list, outputs: list) -> InterpretationResult:
+        """Converts validated AI output to an InterpretationResult"""
         
         # Check for inventions
         is_safe, warning_msg = self.validator.check_for_inventions(ai_result, inputs, outputs)
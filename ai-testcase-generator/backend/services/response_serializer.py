@@ -0,0 +1,85 @@
+import json
+import math
+from typing import Dict, Any, Optional
+from models.schemas import InterpretationResult, TraceabilityMatrix, CoverageReport, SuiteReductionReport, LLMUsage
+from services.test_suite_store import TestSuiteStore
+
+try:
+    import orjson
+except ImportError:  # Optional dependency; the stdlib fallback produces the same JSON, slower
+    orjson = None
+
+
+class ResponseSerializer:
+    """
+    Fast-path JSON encoding for generation responses.
+
+    Test cases are serialized straight from the TestSuiteStore columns, skipping
+    Pydantic materialization and FastAPI's response_model re-validation. Output is
+    the same JSON document /generate-test-cases returns on the default path, with
+    or without orjson, including null for NaN and infinities.
+    """
+
+    @staticmethod
+    def dumps(payload: Any) -> bytes:
+        """Compact JSON bytes, with orjson when installed; NaN and infinities are written as null"""
+        if orjson is not None:
+            try:
+                return orjson.dumps(payload)
+            except TypeError:
+                # orjson rejects e.g. integers beyond 64 bits; the stdlib handles them
+                pass
+        # The stdlib would write bare NaN/Infinity, which is not JSON; null matches orjson and Pydantic
+        return json.dumps(
+            ResponseSerializer._finite(payload), separators=(",", ":"), ensure_ascii=False, allow_nan=False
+        ).encode("utf-8")
+
+    @staticmethod
+    def _finite(value: Any) -> Any:
+        """value with every non-finite float replaced by None"""
+        if isinstance(value, float):
+            return value if math.isfinite(value) else None
+        if isinstance(value, dict):
+            return {key: ResponseSerializer._finite(item) for key, item in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [ResponseSerializer._finite(item) for item in value]
+        return value
+
+    @staticmethod
+    def encode_generation(
+        interpretation: InterpretationResult,
+        suite: Optional[TestSuiteStore],
+        traceability_matrix: TraceabilityMatrix,
+        coverage_report: CoverageReport,
+        generation_timestamp: str,
+        suite_reduction: Optional[SuiteReductionReport] = None,
+        llm_usage: Optional[LLMUsage] = None
+    ) -> bytes:
+        """
+        Encodes a GenerateTestCasesResponse-shaped document.
+        Test cases are encoded one at a time so no list of dicts is ever held.
+        """
+        dumps = ResponseSerializer.dumps
+
+        test_cases = b",".join(dumps(tc) for tc in suite.iter_dicts()) if suite is not None else b""
+
+        return b"".join((
+            b'{"interpretation":', dumps(interpretation.model_dump(mode="json")),
+            b',"test_cases":[', test_cases,
+            b'],"traceability_matrix":', dumps(traceability_matrix.model_dump(mode="json")),
+            b',"coverage_report":', dumps(coverage_report.model_dump(mode="json")),
+            b',"generation_timestamp":', dumps(generation_timestamp),
+            b',"suite_reduction":', dumps(suite_reduction.model_dump(mode="json") if suite_reduction else None),
+            b',"llm_usage":', dumps(llm_usage.model_dump(mode="json") if llm_usage else None),
+            b'}'
+        ))
+
+    @staticmethod
+    def encode_model(model: Any) -> bytes:
+        """Encodes any Pydantic model through the fast encoder"""
+        return ResponseSerializer.dumps(model.model_dump(mode="json"))
+
+    @staticmethod
+    def encode_dict(payload: Dict[str, Any]) -> str:
+        """Text variant for embedding in NDJSON/SSE frames"""
+        return ResponseSerializer.dumps(payload).decode("utf-8")
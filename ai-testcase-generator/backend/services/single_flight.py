@@ -0,0 +1,47 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent async calls that share a key into one in-flight call.
+
+    The first caller (the leader) starts the call; callers arriving while it is
+    in flight await the same task. Every waiter gets the same result object or
+    the same exception. Waiters are shielded from each other: a cancelled waiter
+    (e.g. a disconnected client) does not cancel the call for the rest.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._lock = threading.Lock()
+        self._counters = {"calls": 0, "coalesced": 0}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Runs fn() unless a call with this key is already in flight, then awaits the shared result"""
+        with self._lock:
+            task = self._inflight.get(key)
+            if task is None or task.get_loop() is not asyncio.get_running_loop():
+                task = asyncio.ensure_future(fn())
+                self._inflight[key] = task
+                task.add_done_callback(lambda done: self._forget(key, done))
+                self._counters["calls"] += 1
+            else:
+                self._counters["coalesced"] += 1
+
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["in_flight"] = len(self._inflight)
+        return stats
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        with self._lock:
+            if self._inflight.get(key) is task:
+                del self._inflight[key]
+        # Mark the exception as retrieved even if every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
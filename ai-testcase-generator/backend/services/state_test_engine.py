@@ -1,90 +1,283 @@
-from typing import List, Dict, Any
-from models.schemas import Rule, InputDefinition, OutputDefinition, TestCase, Priority, Validity, Traceability
+import os
+import random
+import re
+import zlib
+from typing import List, Dict, Any, Optional, Iterator, Tuple
+from models.schemas import Rule, InputDefinition, OutputDefinition, Priority
+from services.test_suite_store import TestSuiteStore
+
+
+# Explicit transition phrases: "from IDLE to ACTIVE", "IDLE -> ACTIVE"
+_FROM_TO = re.compile(r'\bfrom\s+([\w-]+)\s+to\s+([\w-]+)', re.IGNORECASE)
+_ARROW = re.compile(r'([\w-]+)\s*(?:->|=>|→)\s*([\w-]+)')
+_TRANSITION_WORDS = ["transition", "switch", "change", "become", "enter", "go to", "goes to", "move to", "moves to"]
+_WORD = re.compile(r'[\w-]+')
+
+DEFAULT_STATES = ["INIT", "ACTIVE", "IDLE", "ERROR"]
+
+
+class StateMachine:
+    """
+    Transition graph over the values of the state input.
+
+    Transitions come from the interpreted rules when they name any; otherwise the
+    allowed values are taken as a lifecycle in declaration order (a cycle), so the
+    number of tests tracks real transitions rather than every ordered pair.
+    """
+
+    def __init__(self, states: List[Any], transitions: List[Tuple[Any, Any]]):
+        self.states = list(dict.fromkeys(states))
+        self.transitions = transitions
+        self.successors: Dict[Any, List[Any]] = {state: [] for state in self.states}
+        for from_state, to_state in transitions:
+            self.successors[from_state].append(to_state)
+
+        # Computed once per machine and shared by every rule that uses it
+        self.permitted = set(transitions)
+        known = set(self.states)
+        n = len(self.states)
+        self.invalid_count = n * (n - 1) - sum(
+            1 for from_state, to_state in self.permitted
+            if from_state != to_state and from_state in known and to_state in known
+        )
+
+    def paths(self, switches: int) -> Iterator[List[Any]]:
+        """
+        State sequences covering every chain of switches+1 consecutive transitions
+        (0-switch = single transitions, 1-switch = pairs, ...), generated lazily.
+        """
+        def extend(path: List[Any], remaining: int) -> Iterator[List[Any]]:
+            if remaining == 0:
+                yield path
+                return
+            for nxt in self.successors[path[-1]]:
+                yield from extend(path + [nxt], remaining - 1)
+
+        for from_state, to_state in self.transitions:
+            yield from extend([from_state, to_state], switches)
+
+    def invalid_transitions(self) -> List[Tuple[Any, Any]]:
+        """Ordered pairs of distinct states the graph does not permit"""
+        return [
+            (from_state, to_state)
+            for from_state in self.states
+            for to_state in self.states
+            if from_state != to_state and (from_state, to_state) not in self.permitted
+        ]
+
+    def sample_invalid_transitions(self, count: int, sampler: random.Random) -> List[Tuple[Any, Any]]:
+        """
+        Up to count pairs from invalid_transitions, in the same order, without listing them all:
+        random cells of the states x states grid are drawn until enough are not permitted
+        """
+        count = min(count, self.invalid_count)
+        n = len(self.states)
+        if 2 * count >= self.invalid_count or 2 * self.invalid_count < n * n:
+            # Most pairs are wanted, or most are permitted (the graph is already that large)
+            invalid = self.invalid_transitions()
+            return [invalid[i] for i in sorted(sampler.sample(range(len(invalid)), count))]
+
+        chosen = set()
+        while len(chosen) < count:
+            cell = sampler.randrange(n * n)
+            from_index, to_index = divmod(cell, n)
+            if from_index != to_index and (self.states[from_index], self.states[to_index]) not in self.permitted:
+                chosen.add(cell)
+        return [(self.states[cell // n], self.states[cell % n]) for cell in sorted(chosen)]
 
 
 class StateTestEngine:
     """State transition testing engine"""
-    
+
+    # Highest N for N-switch coverage; 0 = every transition, 1 = every pair of transitions
+    SWITCH_COVERAGE = int(os.getenv("STATE_SWITCH_COVERAGE", "1"))
+
+    # Maximum state transition cases per rule
+    CASE_BUDGET = int(os.getenv("STATE_TEST_BUDGET", "200"))
+
+    # Share of the budget reserved for sampled invalid transitions
+    INVALID_SHARE = 0.25
+
     @staticmethod
     def generate_state_tests(
         rule: Rule,
         inputs: List[InputDefinition],
         outputs: List[OutputDefinition],
-        requirement_id: str,
-        tc_counter: Dict[str, int]
-    ) -> List[TestCase]:
+        store: TestSuiteStore,
+        nominal: Optional[Dict[str, Any]] = None,
+        machine: Optional[StateMachine] = None
+    ) -> None:
         """
-        Generates state transition test cases
+        Generates state transition test cases into the store:
+        - N-switch paths through the transition graph, shortest first
+        - a seeded sample of transitions the graph does not permit
+        - an invalid state value
+        All within CASE_BUDGET per rule.
         """
-        
-        test_cases = []
-        
+
         # Identify state variable
         state_input = StateTestEngine._find_state_variable(inputs)
-        
+
         if not state_input:
-            return []
-        
-        # Get possible states
-        if state_input.allowed_values:
-            states = state_input.allowed_values
-        else:
-            # Default states if not specified
-            states = ["INIT", "ACTIVE", "IDLE", "ERROR"]
-        
-        # Generate transition tests between states
-        for i, from_state in enumerate(states):
-            for to_state in states:
-                if from_state != to_state:
-                    tc_id = f"TC_{requirement_id}_{tc_counter['count']}"
-                    tc_counter['count'] += 1
-                    
-                    test_inputs = {state_input.name: from_state}
-                    
-                    # Add other inputs with nominal values
-                    for inp in inputs:
-                        if inp.name != state_input.name:
-                            if inp.range_min is not None and inp.range_max is not None:
-                                test_inputs[inp.name] = (inp.range_min + inp.range_max) / 2
-                            elif inp.allowed_values:
-                                test_inputs[inp.name] = inp.allowed_values[0]
-                    
-                    test_cases.append(TestCase(
-                        tc_id=tc_id,
-                        rule_id=rule.rule_id,
-                        test_type="State Transition",
-                        scenario=f"Transition from {from_state} to {to_state}",
-                        inputs=test_inputs,
-                        expected_output={"next_state": to_state},
-                        priority=Priority.MEDIUM,
-                        validity=Validity.VALID,
-                        traceability=Traceability(
-                            requirement=requirement_id,
-                            rule=rule.rule_id
-                        )
-                    ))
-        
-        # Test invalid state
-        tc_id = f"TC_{requirement_id}_{tc_counter['count']}"
-        tc_counter['count'] += 1
-        
-        test_cases.append(TestCase(
-            tc_id=tc_id,
-            rule_id=rule.rule_id,
-            test_type="State Transition",
-            scenario="Invalid state input",
-            inputs={state_input.name: "INVALID_STATE"},
-            expected_output={"status": "REJECTED"},
-            priority=Priority.HIGH,
-            validity=Validity.INVALID,
-            traceability=Traceability(
-                requirement=requirement_id,
-                rule=rule.rule_id
+            return
+
+        if machine is None:
+            machine = StateTestEngine.build_state_machine([rule], inputs)
+        machine = StateTestEngine._machine_for_rule(rule, machine)
+
+        # Shared input vector: every input at its nominal value, state overridden per case
+        if nominal is None:
+            nominal = {}
+            for inp in inputs:
+                if inp.range_min is not None and inp.range_max is not None:
+                    nominal[inp.name] = (inp.range_min + inp.range_max) / 2
+                elif inp.allowed_values:
+                    nominal[inp.name] = inp.allowed_values[0]
+        base = store.add_base(nominal)
+
+        # One case of the budget is kept for the invalid state value
+        budget = StateTestEngine.CASE_BUDGET - 1
+        if budget < 0:
+            return
+
+        invalid_quota = min(machine.invalid_count, int(budget * StateTestEngine.INVALID_SHARE))
+        valid_quota = budget - invalid_quota
+
+        # Valid paths: all 0-switch transitions first, then longer chains while budget lasts
+        emitted = 0
+        for switches in range(StateTestEngine.SWITCH_COVERAGE + 1):
+            for path in machine.paths(switches):
+                if emitted >= valid_quota:
+                    break
+                if switches == 0:
+                    store.append(
+                        rule.rule_id,
+                        "State Transition",
+                        "Transition from {} to {}",
+                        (path[0], path[1]),
+                        base,
+                        (state_input.name, path[0]),
+                        {"next_state": path[1]},
+                        Priority.MEDIUM,
+                        True
+                    )
+                else:
+                    store.append(
+                        rule.rule_id,
+                        "State Transition",
+                        "{}-switch path {}",
+                        (switches, " -> ".join(str(state) for state in path)),
+                        base,
+                        (state_input.name, path[0]),
+                        {"next_state": path[-1], "state_sequence": path},
+                        Priority.LOW,
+                        True
+                    )
+                emitted += 1
+
+        # Invalid transitions: deterministic sample per rule
+        sampler = random.Random(zlib.crc32(rule.rule_id.encode("utf-8")))
+        for from_state, to_state in machine.sample_invalid_transitions(invalid_quota, sampler):
+            store.append(
+                rule.rule_id,
+                "State Transition",
+                "Invalid transition from {} to {}",
+                (from_state, to_state),
+                base,
+                (state_input.name, from_state),
+                {"status": "REJECTED", "next_state": from_state},
+                Priority.HIGH,
+                False
             )
-        ))
-        
-        return test_cases
-    
+
+        # Test invalid state
+        store.append(
+            rule.rule_id,
+            "State Transition",
+            "Invalid state input",
+            (),
+            store.add_base({state_input.name: "INVALID_STATE"}),
+            None,
+            {"status": "REJECTED"},
+            Priority.HIGH,
+            False
+        )
+
+    @staticmethod
+    def build_state_machine(rules: List[Rule], inputs: List[InputDefinition]) -> Optional[StateMachine]:
+        """
+        Transition graph for the requirement's state input, from every rule's text.
+        Falls back to the allowed values as a cycle when no rule names a transition.
+        """
+
+        state_input = StateTestEngine._find_state_variable(inputs)
+        if not state_input:
+            return None
+
+        states = list(state_input.allowed_values) if state_input.allowed_values else []
+        transitions = []
+        for rule in rules:
+            for transition in StateTestEngine._rule_transitions(rule, states):
+                if transition not in transitions:
+                    transitions.append(transition)
+
+        if not states:
+            # Without allowed values, states come from the named transitions or the defaults
+            for from_state, to_state in transitions:
+                for state in (from_state, to_state):
+                    if state not in states:
+                        states.append(state)
+            states = states or list(DEFAULT_STATES)
+
+        if transitions:
+            return StateMachine(states, transitions)
+
+        lifecycle = [(states[i], states[(i + 1) % len(states)]) for i in range(len(states))] if len(states) > 1 else []
+        return StateMachine(states, lifecycle)
+
+    @staticmethod
+    def _machine_for_rule(rule: Rule, machine: StateMachine) -> StateMachine:
+        """The transitions this rule names, or the requirement-wide graph if it names none"""
+        own = StateTestEngine._rule_transitions(rule, machine.states)
+        if not own:
+            return machine
+        return StateMachine(machine.states, own)
+
+    @staticmethod
+    def _rule_transitions(rule: Rule, states: List[Any]) -> List[Tuple[Any, Any]]:
+        """
+        Transitions named in a rule: "from X to Y", "X -> Y", or a state in the
+        condition with a state in a transition-worded expected behavior.
+        With known states, only those states are accepted (spelling is restored).
+        """
+
+        lookup = {str(state).lower(): state for state in states}
+
+        def resolve(token: str) -> Any:
+            if lookup:
+                return lookup.get(token.lower())
+            # Without declared states, only word-like tokens ("from 0 to 100" is a range)
+            return token.upper() if token[0].isalpha() else None
+
+        transitions = []
+        text = rule.condition + " " + rule.expected_behavior
+        for pattern in (_FROM_TO, _ARROW):
+            for match in pattern.finditer(text):
+                from_state, to_state = resolve(match.group(1)), resolve(match.group(2))
+                if from_state is not None and to_state is not None and (from_state, to_state) not in transitions:
+                    transitions.append((from_state, to_state))
+
+        behavior = rule.expected_behavior.lower()
+        if not transitions and lookup and any(word in behavior for word in _TRANSITION_WORDS):
+            sources = [lookup[w] for w in _WORD.findall(rule.condition.lower()) if w in lookup]
+            targets = [lookup[w] for w in _WORD.findall(behavior) if w in lookup]
+            for from_state in sources:
+                for to_state in targets:
+                    if from_state != to_state and (from_state, to_state) not in transitions:
+                        transitions.append((from_state, to_state))
+
+        return transitions
+
     @staticmethod
     def _find_state_variable(inputs: List[InputDefinition]) -> InputDefinition:
         """Find the input that represents state"""
@@ -0,0 +1,155 @@
+import hashlib
+import heapq
+import json
+from typing import Dict, List, Optional, Set, Tuple
+from models.schemas import SuiteReductionReport
+from services.test_suite_store import TestSuiteStore
+
+
+# Cases of these techniques form structures (independence pairs, transition paths,
+# covering-array rows) that lose their meaning when thinned; minimization keeps them all
+STRUCTURAL_TECHNIQUES = {"MC/DC", "State Transition", "Combinatorial (t-way)"}
+
+
+class SuiteDeduplicator:
+    """
+    Drops cases whose inputs, expected output and validity repeat an earlier case of the same rule.
+    Keeps its state between calls, so streamed chunks are checked against everything before them.
+    """
+
+    def __init__(self, first_number: int = 1):
+        self.next_number = first_number
+        self.removed = 0
+        self._seen: Dict[str, Set[bytes]] = {}
+
+    def apply(self, store: TestSuiteStore) -> TestSuiteStore:
+        """The store without duplicates, numbered on from the previous call"""
+        keep = []
+        for i in range(len(store)):
+            seen = self._seen.setdefault(store.rule_id(i), set())
+            key = SuiteOptimizer.case_key(store, i)
+            if key in seen:
+                self.removed += 1
+                continue
+            seen.add(key)
+            keep.append(i)
+
+        selected = store.select(keep, self.next_number)
+        self.next_number += len(keep)
+        return selected
+
+
+class SuiteOptimizer:
+    """Post-processing of a built suite: deduplication and optional minimization"""
+
+    @staticmethod
+    def optimize(
+        store: TestSuiteStore,
+        deduplicate: bool = True,
+        minimize: bool = False
+    ) -> Tuple[TestSuiteStore, Optional[SuiteReductionReport]]:
+        """
+        Returns the reduced suite, renumbered from TC_..._1, and a report of how much it shrank.
+        No report when both steps are disabled.
+        """
+
+        if not deduplicate and not minimize:
+            return store, None
+
+        original_count = len(store)
+        duplicates_removed = 0
+        minimization_removed = 0
+
+        if deduplicate:
+            deduplicator = SuiteDeduplicator()
+            deduplicated = deduplicator.apply(store)
+            duplicates_removed = deduplicator.removed
+            if duplicates_removed:
+                store = deduplicated
+
+        if minimize:
+            keep = SuiteOptimizer.minimize(store)
+            minimization_removed = len(store) - len(keep)
+            if minimization_removed:
+                store = store.select(keep)
+
+        return store, SuiteOptimizer.report(original_count, duplicates_removed, minimization_removed)
+
+    @staticmethod
+    def report(original_count: int, duplicates_removed: int, minimization_removed: int) -> SuiteReductionReport:
+        final_count = original_count - duplicates_removed - minimization_removed
+        return SuiteReductionReport(
+            original_test_count=original_count,
+            duplicates_removed=duplicates_removed,
+            minimization_removed=minimization_removed,
+            final_test_count=final_count,
+            reduction_percentage=round(
+                (original_count - final_count) / original_count * 100, 2
+            ) if original_count else 0.0
+        )
+
+    @staticmethod
+    def case_key(store: TestSuiteStore, i: int) -> bytes:
+        """128-bit digest of a case's canonical inputs, expected output and validity"""
+        canonical = json.dumps(
+            [store.inputs(i), store.expected_output(i), store.is_valid(i)],
+            sort_keys=True,
+            separators=(",", ":"),
+            default=str
+        )
+        return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).digest()
+
+    @staticmethod
+    def minimize(store: TestSuiteStore) -> List[int]:
+        """
+        Indices of a reduced suite, in original order (greedy set cover).
+
+        Every case of a structural technique is kept. The others are chosen so that
+        each rule, each (rule, technique) and each boundary point - an input value with
+        its validity - stays covered, picking the case covering most uncovered items first.
+        """
+
+        forced = []
+        candidates = {}
+        for i in range(len(store)):
+            rule_id, technique = store.rule_id(i), store.technique(i)
+            if technique in STRUCTURAL_TECHNIQUES:
+                forced.append(i)
+            candidates[i] = SuiteOptimizer._coverage_items(store, i, rule_id, technique)
+
+        covered = set()
+        for i in forced:
+            covered |= candidates.pop(i)
+
+        # Lazy greedy: a stale gain is only recomputed when it reaches the top of the heap
+        heap = [(-len(items - covered), i) for i, items in candidates.items() if items - covered]
+        heapq.heapify(heap)
+        chosen = []
+        while heap:
+            _, i = heapq.heappop(heap)
+            gain = len(candidates[i] - covered)
+            if gain == 0:
+                continue
+            if heap and gain < -heap[0][0]:
+                heapq.heappush(heap, (-gain, i))
+                continue
+            chosen.append(i)
+            covered |= candidates[i]
+
+        return sorted(forced + chosen)
+
+    @staticmethod
+    def _coverage_items(store: TestSuiteStore, i: int, rule_id: str, technique: str) -> Set[tuple]:
+        validity = store.is_valid(i)
+        items = {("rule", rule_id), ("technique", rule_id, technique)}
+
+        override = store.override(i)
+        if isinstance(override, tuple):
+            fields = [override]
+        elif isinstance(override, dict):
+            fields = list(override.items())
+        else:
+            fields = []
+        for name, value in fields:
+            items.add(("point", name, json.dumps(value, default=str), validity))
+        return items
@@ -1,20 +1,35 @@
-from typing import List, Dict, Any
+import time
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from models.schemas import (
-    Rule, InputDefinition, OutputDefinition, TestCase,
-    Priority, Validity, Traceability
+    Rule, InputDefinition, OutputDefinition, TestCase, Priority
 )
 from services.input_value_generator import InputValueGenerator
+from services.combinatorial_engine import CombinatorialEngine
 from services.mcdc_engine import MCDCEngine
-from services.state_test_engine import StateTestEngine
-from services.test_oracle import TestOracle
+from services.state_test_engine import StateTestEngine, StateMachine
+from services.test_strategy_engine import TestStrategyEngine
+from services.test_oracle import TestOracle, CompiledRule
+from services.test_suite_store import TestSuiteStore
+from services.metrics import Metrics
+
+
+# Shared expected output for every rejected case; stores never mutate it
+REJECTED = {"status": "REJECTED"}
 
 
 class TestCaseBuilder:
     """Builds complete test cases using deterministic logic and test oracle"""
     
-    def __init__(self):
+    def __init__(self, combinatorial_strength: Optional[int] = None):
         self.value_generator = InputValueGenerator()
         self.oracle = TestOracle()
+        self.combinatorial_strength = combinatorial_strength or CombinatorialEngine.DEFAULT_STRENGTH
+        self._compiled_rules: Dict[int, CompiledRule] = {}
+        self._nominal: Dict[str, Any] = {}
+        self._varying_inputs: Optional[List[str]] = None
+        self._combinations: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+        self._rules: List[Rule] = []
+        self._state_machine: Optional[StateMachine] = None
     
     def build_test_cases(
         self,
@@ -28,47 +43,157 @@ class TestCaseBuilder:
         Generates all test cases based on strategies using intelligent output inference
         """
         
-        test_cases = []
+        return self.build_suite(rules, inputs, outputs, strategies, requirement_id).to_test_cases()
+    
+    def build_suite(
+        self,
+        rules: List[Rule],
+        inputs: List[InputDefinition],
+        outputs: List[OutputDefinition],
+        strategies: Dict[str, List[str]],
+        requirement_id: str,
+        context_rules: Optional[List[Rule]] = None
+    ) -> TestSuiteStore:
+        """
+        Generates the whole suite into one compact columnar store
+        
+        context_rules: every rule of the requirement when building only a subset
+        (a parallel shard), so shared state such as the state graph matches a full build
+        """
+        
+        store = TestSuiteStore(requirement_id)
+        self._prepare(inputs, context_rules or rules)
+        
+        for rule in rules:
+            for strategy in strategies.get(rule.rule_id, []):
+                self._generate(strategy, rule, inputs, outputs, store)
+        
+        return store
+    
+    def iter_suite_chunks(
+        self,
+        rules: List[Rule],
+        inputs: List[InputDefinition],
+        outputs: List[OutputDefinition],
+        strategies: Dict[str, List[str]],
+        requirement_id: str
+    ) -> Iterator[TestSuiteStore]:
+        """
+        Yields one store per (rule, strategy), in build_suite order with continuous tc numbering.
+        Used for streaming so the full suite never has to be held in memory.
+        """
+        
         tc_counter = {"count": 1}
+        self._prepare(inputs, rules)
         
         for rule in rules:
-            rule_strategies = strategies.get(rule.rule_id, [])
-            
-            for strategy in rule_strategies:
-                if strategy == "BVA":
-                    test_cases.extend(
-                        self._generate_bva_tests(rule, inputs, outputs, requirement_id, tc_counter)
-                    )
-                elif strategy == "EP":
-                    test_cases.extend(
-                        self._generate_ep_tests(rule, inputs, outputs, requirement_id, tc_counter)
-                    )
-                elif strategy == "NEGATIVE":
-                    test_cases.extend(
-                        self._generate_negative_tests(rule, inputs, outputs, requirement_id, tc_counter)
-                    )
-                elif strategy == "MCDC":
-                    test_cases.extend(
-                        MCDCEngine.generate_mcdc_tests(rule, inputs, requirement_id, tc_counter)
-                    )
-                elif strategy == "STATE":
-                    test_cases.extend(
-                        StateTestEngine.generate_state_tests(rule, inputs, outputs, requirement_id, tc_counter)
-                    )
+            for strategy in strategies.get(rule.rule_id, []):
+                chunk = TestSuiteStore(requirement_id, tc_counter)
+                self._generate(strategy, rule, inputs, outputs, chunk)
+                if len(chunk):
+                    yield chunk
+    
+    def iter_test_cases(
+        self,
+        rules: List[Rule],
+        inputs: List[InputDefinition],
+        outputs: List[OutputDefinition],
+        strategies: Dict[str, List[str]],
+        requirement_id: str
+    ) -> Iterator[TestCase]:
+        """
+        Yields materialized test cases in the same order as build_test_cases
+        """
+        
+        for chunk in self.iter_suite_chunks(rules, inputs, outputs, strategies, requirement_id):
+            yield from chunk.iter_test_cases()
+    
+    def begin_chunked(self, inputs: List[InputDefinition], rules: Optional[List[Rule]] = None) -> None:
+        """
+        Starts a build made chunk by chunk with build_chunk, e.g. while rules are still arriving.
+        Pass every rule with set_context_rules before building STATE chunks.
+        """
+        self._prepare(inputs, rules or [])
+    
+    def set_context_rules(self, rules: List[Rule]) -> None:
+        """Every rule of the requirement; the state transition graph is taken from them"""
+        self._rules = rules
+        self._state_machine = None
+    
+    def build_chunk(
+        self,
+        strategy: str,
+        rule: Rule,
+        inputs: List[InputDefinition],
+        outputs: List[OutputDefinition],
+        requirement_id: str
+    ) -> TestSuiteStore:
+        """
+        The cases of one (rule, strategy). Chunks merged in build_suite order and
+        renumbered hold the same suite as build_suite.
+        """
+        chunk = TestSuiteStore(requirement_id)
+        self._generate(strategy, rule, inputs, outputs, chunk)
+        return chunk
+    
+    def _prepare(self, inputs: List[InputDefinition], rules: List[Rule]) -> None:
+        """Per-build state shared by every rule and strategy"""
+        
+        # Rules are compiled into oracles lazily, once per build
+        self._compiled_rules = {}
+        
+        # Every BVA/EP/negative test is this vector with a single field overridden
+        self._nominal = self._nominal_vector(inputs)
+        
+        # Covering arrays depend only on the inputs they vary; built on first use, shared by rules naming the same inputs
+        self._varying_inputs = None
+        self._combinations = {}
+        
+        # Likewise the state transition graph, taken from every rule of the requirement
+        self._rules = rules
+        self._state_machine = None
+    
+    def _generate(
+        self,
+        strategy: str,
+        rule: Rule,
+        inputs: List[InputDefinition],
+        outputs: List[OutputDefinition],
+        store: TestSuiteStore
+    ) -> None:
+        start = time.perf_counter()
+        first = len(store)
         
-        return test_cases
+        if strategy == "BVA":
+            self._generate_bva_tests(rule, inputs, outputs, store)
+        elif strategy == "EP":
+            self._generate_ep_tests(rule, inputs, outputs, store)
+        elif strategy == "NEGATIVE":
+            self._generate_negative_tests(rule, inputs, outputs, store)
+        elif strategy == "MCDC":
+            MCDCEngine.generate_mcdc_tests(rule, inputs, store)
+        elif strategy == "STATE":
+            if self._state_machine is None:
+                self._state_machine = StateTestEngine.build_state_machine(self._rules, inputs)
+            StateTestEngine.generate_state_tests(
+                rule, inputs, outputs, store, self._nominal, self._state_machine
+            )
+        elif strategy == "PAIRWISE":
+            self._generate_combinatorial_tests(rule, inputs, outputs, store)
+        
+        Metrics.record_technique(strategy, time.perf_counter() - start, len(store) - first)
     
     def _generate_bva_tests(
         self,
         rule: Rule,
         inputs: List[InputDefinition],
         outputs: List[OutputDefinition],
-        requirement_id: str,
-        tc_counter: Dict[str, int]
-    ) -> List[TestCase]:
+        store: TestSuiteStore
+    ) -> None:
         """Generate BVA test cases with computed expected outputs"""
         
-        test_cases = []
+        nominal = self._nominal
+        base = store.add_base(nominal)
         
         for inp in inputs:
             # Check if numeric type
@@ -78,147 +203,182 @@ class TestCaseBuilder:
             bva_values = self.value_generator.generate_bva_values(inp)
             
             for val_info in bva_values:
-                tc_id = f"TC_{requirement_id}_{tc_counter['count']}"
-                tc_counter['count'] += 1
-                
-                test_inputs = {inp.name: val_info["value"]}
-                
-                # Add nominal values for other inputs
-                for other_inp in inputs:
-                    if other_inp.name != inp.name:
-                        test_inputs[other_inp.name] = self._get_nominal_value(other_inp)
+                value = val_info["value"]
                 
                 # Determine if input is valid
                 is_valid = val_info["validity"] == "VALID"
                 
                 # Compute expected output using oracle
                 try:
-                    expected_output = self.oracle.compute_expected_output(
-                        rule, test_inputs, inputs, outputs, is_valid
+                    expected_output = self._compile_rule(rule, inputs, outputs).evaluate(
+                        self._override(nominal, inp.name, value), is_valid
                     )
                 except Exception:
                     # If oracle fails, use rejection for invalid, acceptance for valid
                     expected_output = {"status": "REJECTED"} if not is_valid else {"status": "ACCEPTED"}
                 
-                validity = Validity.VALID if is_valid else Validity.INVALID
-                
-                test_cases.append(TestCase(
-                    tc_id=tc_id,
-                    rule_id=rule.rule_id,
-                    test_type="Boundary Value Analysis",
-                    scenario=f"BVA: {inp.name} = {val_info['value']} ({val_info['description']})",
-                    inputs=test_inputs,
-                    expected_output=expected_output,
-                    priority=Priority.HIGH,
-                    validity=validity,
-                    traceability=Traceability(
-                        requirement=requirement_id,
-                        rule=rule.rule_id
-                    )
-                ))
-        
-        return test_cases
+                store.append(
+                    rule.rule_id,
+                    "Boundary Value Analysis",
+                    "BVA: {} = {} ({})",
+                    (inp.name, value, val_info['description']),
+                    base,
+                    (inp.name, value),
+                    expected_output,
+                    Priority.HIGH,
+                    is_valid
+                )
     
     def _generate_ep_tests(
         self,
         rule: Rule,
         inputs: List[InputDefinition],
         outputs: List[OutputDefinition],
-        requirement_id: str,
-        tc_counter: Dict[str, int]
-    ) -> List[TestCase]:
+        store: TestSuiteStore
+    ) -> None:
         """Generate Equivalence Partitioning test cases with computed outputs"""
         
-        test_cases = []
+        nominal = self._nominal
+        base = store.add_base(nominal)
         
         for inp in inputs:
             ep_values = self.value_generator.generate_ep_values(inp)
             
             for val_info in ep_values:
-                tc_id = f"TC_{requirement_id}_{tc_counter['count']}"
-                tc_counter['count'] += 1
-                
-                test_inputs = {inp.name: val_info["value"]}
-                
-                # Add nominal values for other inputs
-                for other_inp in inputs:
-                    if other_inp.name != inp.name:
-                        test_inputs[other_inp.name] = self._get_nominal_value(other_inp)
+                value = val_info["value"]
                 
                 # Determine if input is valid
                 is_valid = val_info["validity"] == "VALID"
                 
                 # Compute expected output using oracle
                 try:
-                    expected_output = self.oracle.compute_expected_output(
-                        rule, test_inputs, inputs, outputs, is_valid
+                    expected_output = self._compile_rule(rule, inputs, outputs).evaluate(
+                        self._override(nominal, inp.name, value), is_valid
                     )
                 except Exception:
                     expected_output = {"status": "REJECTED"} if not is_valid else {"status": "ACCEPTED"}
                 
-                validity = Validity.VALID if is_valid else Validity.INVALID
-                
-                test_cases.append(TestCase(
-                    tc_id=tc_id,
-                    rule_id=rule.rule_id,
-                    test_type="Equivalence Partitioning",
-                    scenario=f"EP: {inp.name} = {val_info['value']} ({val_info['description']})",
-                    inputs=test_inputs,
-                    expected_output=expected_output,
-                    priority=Priority.MEDIUM,
-                    validity=validity,
-                    traceability=Traceability(
-                        requirement=requirement_id,
-                        rule=rule.rule_id
-                    )
-                ))
-        
-        return test_cases
+                store.append(
+                    rule.rule_id,
+                    "Equivalence Partitioning",
+                    "EP: {} = {} ({})",
+                    (inp.name, value, val_info['description']),
+                    base,
+                    (inp.name, value),
+                    expected_output,
+                    Priority.MEDIUM,
+                    is_valid
+                )
     
     def _generate_negative_tests(
         self,
         rule: Rule,
         inputs: List[InputDefinition],
         outputs: List[OutputDefinition],
-        requirement_id: str,
-        tc_counter: Dict[str, int]
-    ) -> List[TestCase]:
+        store: TestSuiteStore
+    ) -> None:
         """Generate Negative test cases"""
         
-        test_cases = []
+        base = store.add_base(self._nominal)
         
         for inp in inputs:
             neg_values = self.value_generator.generate_negative_values(inp)
             
             for val_info in neg_values:
-                tc_id = f"TC_{requirement_id}_{tc_counter['count']}"
-                tc_counter['count'] += 1
-                
-                test_inputs = {inp.name: val_info["value"]}
-                
-                # Add nominal values for other inputs
-                for other_inp in inputs:
-                    if other_inp.name != inp.name:
-                        test_inputs[other_inp.name] = self._get_nominal_value(other_inp)
-                
-                expected_output = {"status": "REJECTED"}
+                value = val_info["value"]
                 
-                test_cases.append(TestCase(
-                    tc_id=tc_id,
-                    rule_id=rule.rule_id,
-                    test_type="Negative Testing",
-                    scenario=f"Negative: {inp.name} = {val_info['value']} ({val_info['description']})",
-                    inputs=test_inputs,
-                    expected_output=expected_output,
-                    priority=Priority.HIGH,
-                    validity=Validity.INVALID,
-                    traceability=Traceability(
-                        requirement=requirement_id,
-                        rule=rule.rule_id
-                    )
-                ))
+                store.append(
+                    rule.rule_id,
+                    "Negative Testing",
+                    "Negative: {} = {} ({})",
+                    (inp.name, value, val_info['description']),
+                    base,
+                    (inp.name, value),
+                    REJECTED,
+                    Priority.HIGH,
+                    False
+                )
+    
+    def _generate_combinatorial_tests(
+        self,
+        rule: Rule,
+        inputs: List[InputDefinition],
+        outputs: List[OutputDefinition],
+        store: TestSuiteStore
+    ) -> None:
+        """Generate t-way combination test cases over the inputs the rule names, with computed expected outputs"""
         
-        return test_cases
+        if self._varying_inputs is None:
+            self._varying_inputs = TestStrategyEngine.varying_inputs(inputs)
+        names = tuple(TestStrategyEngine.interacting_inputs(rule, self._varying_inputs))
+        combinations = self._combinations.get(names)
+        if combinations is None:
+            combinations = self._combinations[names] = self._combinatorial_rows(
+                [inp for inp in inputs if inp.name in names]
+            )
+        if not combinations:
+            return
+        
+        nominal = self._nominal
+        base = store.add_base(nominal)
+        total = len(combinations)
+        
+        for number, combination in enumerate(combinations, 1):
+            test_inputs = nominal.copy()
+            test_inputs.update(combination)
+            
+            try:
+                expected_output = self._compile_rule(rule, inputs, outputs).evaluate(test_inputs, True)
+            except Exception:
+                expected_output = {"status": "ACCEPTED"}
+            
+            store.append(
+                rule.rule_id,
+                "Combinatorial (t-way)",
+                "{}-way combination {} of {}",
+                (self.combinatorial_strength, number, total),
+                base,
+                combination,
+                expected_output,
+                Priority.MEDIUM,
+                True
+            )
+    
+    def _combinatorial_rows(self, inputs: List[InputDefinition]) -> List[Dict[str, Any]]:
+        """Covering array over the valid values of the given inputs, nominal value first"""
+        parameters = {}
+        for inp in inputs:
+            nominal = self._nominal[inp.name]
+            values = self.value_generator.generate_combinatorial_values(inp)
+            # Index 0 fills unconstrained cells, so those stay at the nominal value
+            if nominal in values:
+                values = [nominal] + [v for v in values if v != nominal]
+            parameters[inp.name] = values
+        return CombinatorialEngine.generate_combinations(parameters, self.combinatorial_strength)
+    
+    def _compile_rule(
+        self,
+        rule: Rule,
+        inputs: List[InputDefinition],
+        outputs: List[OutputDefinition]
+    ) -> CompiledRule:
+        """Returns the compiled oracle for a rule, compiling it on first use"""
+        compiled = self._compiled_rules.get(id(rule))
+        if compiled is None:
+            compiled = self.oracle.compile_rule(rule, inputs, outputs)
+            self._compiled_rules[id(rule)] = compiled
+        return compiled
+    
+    def _nominal_vector(self, inputs: List[InputDefinition]) -> Dict[str, Any]:
+        """Nominal value for every input, computed once per build"""
+        return {inp.name: self._get_nominal_value(inp) for inp in inputs}
+    
+    @staticmethod
+    def _override(nominal: Dict[str, Any], name: str, value: Any) -> Dict[str, Any]:
+        """Nominal vector with one field replaced; only the oracle sees it, the store keeps the override"""
+        test_inputs = nominal.copy()
+        test_inputs[name] = value
+        return test_inputs
     
     def _get_nominal_value(self, input_def: InputDefinition) -> Any:
         """Get nominal/typical value for an input with intelligent inference"""
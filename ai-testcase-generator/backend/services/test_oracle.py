@@ -1,5 +1,9 @@
+import functools
+import operator
+import re
 from typing import Dict, Any, List, Optional
 from models.schemas import Rule, InputDefinition, OutputDefinition
+from services.input_value_generator import InputValueGenerator
 
 
 class TestOracle:
@@ -8,6 +12,18 @@ class TestOracle:
     Uses intelligent inference when exact computation isn't possible.
     """
     
+    @staticmethod
+    def compile_rule(
+        rule: Rule,
+        inputs: List[InputDefinition],
+        outputs: List[OutputDefinition]
+    ) -> "CompiledRule":
+        """
+        Compiles a rule into an executable oracle.
+        All text analysis happens here, once; CompiledRule.evaluate is a plain function call.
+        """
+        return CompiledRule(rule, inputs, outputs)
+    
     @staticmethod
     def compute_expected_output(
         rule: Rule,
@@ -19,262 +35,295 @@ class TestOracle:
         """
         Computes expected output using rule logic, common sense, and intelligent inference.
         Always returns a reasonable output - never blocks.
+        
+        Compiles the rule on every call; callers evaluating many test cases against
+        the same rule should use compile_rule once and call evaluate instead.
         """
+        return TestOracle.compile_rule(rule, inputs, outputs).evaluate(test_inputs, is_valid_input)
+    
+    @staticmethod
+    def _get_input_range(input_def: InputDefinition) -> tuple:
+        """Get input range, inferring if needed"""
+        return InputValueGenerator.infer_range(input_def)
+
+
+# Keyword sets used when compiling rule text
+_ACCEPT_WORDS = ['accept', 'ok', 'valid', 'pass', 'success']
+_STATUS_ACCEPT_WORDS = ['accept', 'success', 'ok', 'valid', 'pass']
+_ALARM_WORDS = ['alarm', 'warning', 'alert', 'error']
+_FLAG_WORDS = ['alarm', 'warning', 'alert', 'error', 'flag']
+_NUMBER_PATTERN = re.compile(r'\d+(?:\.\d+)?')
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float))
+
+
+def _sum(values: List[float]) -> Optional[float]:
+    return sum(values)
+
+
+def _product(values: List[float]) -> Optional[float]:
+    return functools.reduce(operator.mul, values, 1)
+
+
+def _difference(values: List[float]) -> Optional[float]:
+    return values[0] - values[1] if len(values) >= 2 else None
+
+
+def _average(values: List[float]) -> Optional[float]:
+    return sum(values) / len(values)
+
+
+class CompiledRule:
+    """
+    A rule pre-analysed into an executable oracle for a fixed set of inputs/outputs.
+    
+    Output resolution order (first applicable wins):
+    1. Discrete outputs: threshold comparison selects a possible value
+    2. Boolean outputs: comparison of a referenced input against the threshold
+    3. Arithmetic outputs: sum/product/difference/average of numeric inputs
+    4. Common sense inference
+    """
+    
+    REJECTED = {"status": "REJECTED"}
+    
+    def __init__(
+        self,
+        rule: Rule,
+        inputs: List[InputDefinition],
+        outputs: List[OutputDefinition]
+    ):
+        rule_text = (rule.condition + " " + rule.expected_behavior).lower()
+        numbers = _NUMBER_PATTERN.findall(rule_text)
+        self.threshold: Optional[float] = float(numbers[0]) if numbers else None
+        self.input_names = [inp.name for inp in inputs]
+        
+        self._evaluate_valid = None
+        
+        # 1. Discrete output values
+        discrete = next((out for out in outputs if out.possible_values), None)
+        if discrete is not None:
+            self._compile_discrete(discrete, rule_text)
+            return
+        
+        # 2. Boolean logic
+        boolean = next((out for out in outputs if out.data_type.lower() in ['bool', 'boolean']), None)
+        if boolean is not None:
+            self._compile_boolean(boolean, rule_text, inputs)
+            return
+        
+        # 3. Arithmetic logic, falling back to 4. common sense when it cannot compute
+        self._compile_common_sense(inputs, outputs)
+        arithmetic = next(
+            (out for out in outputs if out.data_type.lower() in ['int', 'integer', 'float', 'double']),
+            None
+        )
+        if arithmetic is not None:
+            self._compile_arithmetic(arithmetic, rule.expected_behavior.lower())
+    
+    def evaluate(self, test_inputs: Dict[str, Any], is_valid_input: bool) -> Dict[str, Any]:
+        """Expected output for one test case"""
         
         # If input is invalid, always reject
         if not is_valid_input:
-            return {"status": "REJECTED"}
+            return dict(self.REJECTED)
         
-        # Try to extract and evaluate the logic
-        rule_text = rule.condition.lower()
-        behavior_text = rule.expected_behavior.lower()
+        return self._evaluate_valid(test_inputs)
+    
+    def _compile_discrete(self, output: OutputDefinition, rule_text: str) -> None:
+        """Threshold-based selection among an output's possible values"""
         
-        # 1. Try discrete output values
-        for output in outputs:
-            if output.possible_values:
-                computed = TestOracle._compute_discrete_output(
-                    rule, test_inputs, inputs, output
-                )
-                if computed is not None:
-                    return {output.name: computed}
-        
-        # 2. Try boolean logic
-        for output in outputs:
-            if output.data_type.lower() in ['bool', 'boolean']:
-                computed = TestOracle._compute_boolean_output(
-                    rule, test_inputs, inputs, output
-                )
-                if computed is not None:
-                    return {output.name: computed}
-        
-        # 3. Try arithmetic logic
-        for output in outputs:
-            if output.data_type.lower() in ['int', 'integer', 'float', 'double']:
-                computed = TestOracle._compute_arithmetic_output(
-                    rule, test_inputs, inputs, output
-                )
-                if computed is not None:
-                    return {output.name: computed}
-        
-        # 4. Use common sense inference for valid inputs
-        return TestOracle._infer_common_sense_output(
-            rule, test_inputs, inputs, outputs
+        name = output.name
+        mentioned = next((pv for pv in output.possible_values if pv.lower() in rule_text), None)
+        
+        if '>' in rule_text or 'exceed' in rule_text or 'above' in rule_text:
+            compare = operator.gt
+        elif '<' in rule_text or 'below' in rule_text:
+            compare = operator.lt
+        else:
+            compare = None
+        
+        # Default to first "acceptance" value
+        default = next(
+            (val for val in output.possible_values if any(word in val.lower() for word in _ACCEPT_WORDS)),
+            output.possible_values[0]
         )
+        
+        threshold = self.threshold
+        input_names = self.input_names
+        
+        if mentioned is None or threshold is None or compare is None:
+            self._evaluate_valid = lambda test_inputs: {name: default}
+            return
+        
+        def evaluate_discrete(test_inputs: Dict[str, Any]) -> Dict[str, Any]:
+            for input_name in input_names:
+                if input_name in test_inputs:
+                    value = test_inputs[input_name]
+                    if _is_number(value) and compare(value, threshold):
+                        return {name: mentioned}
+            return {name: default}
+        
+        self._evaluate_valid = evaluate_discrete
     
-    @staticmethod
-    def _infer_common_sense_output(
-        rule: Rule,
-        test_inputs: Dict[str, Any],
+    def _compile_boolean(
+        self,
+        output: OutputDefinition,
+        rule_text: str,
+        inputs: List[InputDefinition]
+    ) -> None:
+        """Comparison of referenced inputs against the rule's threshold"""
+        
+        name = output.name
+        
+        if '>=' in rule_text or 'at least' in rule_text:
+            compare = operator.ge
+        elif '>' in rule_text or 'greater' in rule_text or 'exceed' in rule_text:
+            compare = operator.gt
+        elif '<=' in rule_text or 'at most' in rule_text:
+            compare = operator.le
+        elif '<' in rule_text or 'less' in rule_text or 'below' in rule_text:
+            compare = operator.lt
+        elif '==' in rule_text or 'equal' in rule_text:
+            compare = operator.eq
+        else:
+            compare = None
+        
+        # Common sense for alarm/warning types: no alarm by default, success otherwise
+        default = not any(word in name.lower() for word in _ALARM_WORDS)
+        
+        threshold = self.threshold
+        referenced = [inp.name for inp in inputs if inp.name.lower() in rule_text]
+        
+        if threshold is None or compare is None or not referenced:
+            self._evaluate_valid = lambda test_inputs: {name: default}
+            return
+        
+        def evaluate_boolean(test_inputs: Dict[str, Any]) -> Dict[str, Any]:
+            for input_name in referenced:
+                if input_name in test_inputs:
+                    value = test_inputs[input_name]
+                    if _is_number(value):
+                        return {name: compare(value, threshold)}
+            return {name: default}
+        
+        self._evaluate_valid = evaluate_boolean
+    
+    def _compile_arithmetic(self, output: OutputDefinition, behavior_text: str) -> None:
+        """Arithmetic over numeric test inputs; falls back to common sense"""
+        
+        if 'sum' in behavior_text or '+' in behavior_text or 'add' in behavior_text:
+            reduce = _sum
+        elif 'product' in behavior_text or '*' in behavior_text or 'multiply' in behavior_text:
+            reduce = _product
+        elif 'difference' in behavior_text or '-' in behavior_text or 'subtract' in behavior_text:
+            reduce = _difference
+        elif 'average' in behavior_text or 'mean' in behavior_text:
+            reduce = _average
+        else:
+            return
+        
+        name = output.name
+        as_int = output.data_type.lower() in ['int', 'integer']
+        fallback = self._evaluate_valid
+        
+        def evaluate_arithmetic(test_inputs: Dict[str, Any]) -> Dict[str, Any]:
+            values = [v for v in test_inputs.values() if _is_number(v)]
+            result = reduce(values) if values else None
+            if result is None:
+                return fallback(test_inputs)
+            return {name: int(result) if as_int else result}
+        
+        self._evaluate_valid = evaluate_arithmetic
+    
+    def _compile_common_sense(
+        self,
         inputs: List[InputDefinition],
         outputs: List[OutputDefinition]
-    ) -> Dict[str, Any]:
+    ) -> None:
         """
         Uses common sense to infer reasonable expected output.
         This ensures we always generate test cases.
         """
         
-        result = {}
+        constants = {}
+        violation_outputs = []  # (output_name, value_when_violated)
         
         for output in outputs:
             output_name_lower = output.name.lower()
+            data_type = output.data_type.lower()
             
             # Status-type outputs
             if 'status' in output_name_lower:
                 if output.possible_values:
                     # Use first "success" type value if available
-                    for val in output.possible_values:
-                        if any(word in val.lower() for word in ['accept', 'success', 'ok', 'valid', 'pass']):
-                            result[output.name] = val
-                            break
-                    if output.name not in result:
-                        result[output.name] = output.possible_values[0]
+                    constants[output.name] = next(
+                        (val for val in output.possible_values
+                         if any(word in val.lower() for word in _STATUS_ACCEPT_WORDS)),
+                        output.possible_values[0]
+                    )
                 else:
-                    result[output.name] = "ACCEPTED"
+                    constants[output.name] = "ACCEPTED"
             
             # Result-type outputs
             elif 'result' in output_name_lower:
                 if output.possible_values:
-                    result[output.name] = output.possible_values[0]
-                elif output.data_type.lower() in ['bool', 'boolean']:
-                    result[output.name] = True
-                elif output.data_type.lower() in ['int', 'integer']:
-                    result[output.name] = 1
-                elif output.data_type.lower() in ['float', 'double']:
-                    result[output.name] = 1.0
+                    constants[output.name] = output.possible_values[0]
+                elif data_type in ['bool', 'boolean']:
+                    constants[output.name] = True
+                elif data_type in ['int', 'integer']:
+                    constants[output.name] = 1
+                elif data_type in ['float', 'double']:
+                    constants[output.name] = 1.0
                 else:
-                    result[output.name] = "SUCCESS"
+                    constants[output.name] = "SUCCESS"
             
-            # Boolean outputs (alarms, warnings, flags)
-            elif output.data_type.lower() in ['bool', 'boolean']:
-                # Check if input violates any constraint
-                has_violation = False
-                for input_def in inputs:
-                    if input_def.name in test_inputs:
-                        value = test_inputs[input_def.name]
-                        if isinstance(value, (int, float)):
-                            min_val, max_val = TestOracle._get_input_range(input_def)
-                            if min_val is not None and value < min_val:
-                                has_violation = True
-                            if max_val is not None and value > max_val:
-                                has_violation = True
-                
-                # Alarm/warning outputs activate on violation
-                if any(word in output_name_lower for word in ['alarm', 'warning', 'alert', 'error', 'flag']):
-                    result[output.name] = has_violation
-                else:
-                    result[output.name] = not has_violation
+            # Boolean outputs (alarms, warnings, flags) activate on range violation
+            elif data_type in ['bool', 'boolean']:
+                constants[output.name] = None  # placeholder keeps key order
+                is_flag = any(word in output_name_lower for word in _FLAG_WORDS)
+                violation_outputs.append((output.name, is_flag))
             
             # Numeric outputs
-            elif output.data_type.lower() in ['int', 'integer', 'float', 'double']:
-                # Default to 0 or reasonable value
-                if output.data_type.lower() in ['int', 'integer']:
-                    result[output.name] = 0
-                else:
-                    result[output.name] = 0.0
+            elif data_type in ['int', 'integer', 'float', 'double']:
+                constants[output.name] = 0 if data_type in ['int', 'integer'] else 0.0
             
             # String outputs with possible values
             elif output.possible_values:
-                result[output.name] = output.possible_values[0]
+                constants[output.name] = output.possible_values[0]
             
             # Generic string outputs
             else:
-                result[output.name] = "OK"
+                constants[output.name] = "OK"
         
         # If no outputs defined, return generic success
-        if not result:
-            result = {"status": "ACCEPTED"}
-        
-        return result
-    
-    @staticmethod
-    def _get_input_range(input_def: InputDefinition) -> tuple:
-        """Get input range, inferring if needed"""
-        from services.input_value_generator import InputValueGenerator
-        return InputValueGenerator.infer_range(input_def)
-    
-    @staticmethod
-    def _compute_discrete_output(
-        rule: Rule,
-        test_inputs: Dict[str, Any],
-        inputs: List[InputDefinition],
-        output: OutputDefinition
-    ) -> Optional[str]:
-        """Compute output when possible values are defined"""
+        if not constants:
+            constants = {"status": "ACCEPTED"}
         
-        if not output.possible_values:
-            return None
+        if not violation_outputs:
+            self._evaluate_valid = lambda test_inputs: dict(constants)
+            return
         
-        rule_text = (rule.condition + " " + rule.expected_behavior).lower()
-        
-        # Check for threshold-based discrete outputs
-        for input_def in inputs:
-            if input_def.name in test_inputs:
-                value = test_inputs[input_def.name]
-                
-                # Look for threshold patterns
-                for possible_value in output.possible_values:
-                    pv_lower = possible_value.lower()
-                    
-                    if pv_lower in rule_text:
-                        import re
-                        numbers = re.findall(r'\d+(?:\.\d+)?', rule_text)
-                        
-                        if numbers:
-                            threshold = float(numbers[0])
-                            
-                            if '>' in rule_text or 'exceed' in rule_text or 'above' in rule_text:
-                                if isinstance(value, (int, float)) and value > threshold:
-                                    return possible_value
-                            elif '<' in rule_text or 'below' in rule_text:
-                                if isinstance(value, (int, float)) and value < threshold:
-                                    return possible_value
-        
-        # Default to first "acceptance" value
-        for val in output.possible_values:
-            if any(word in val.lower() for word in ['accept', 'ok', 'valid', 'pass', 'success']):
-                return val
+        ranges = [
+            (inp.name,) + tuple(TestOracle._get_input_range(inp))
+            for inp in inputs
+        ]
         
-        return output.possible_values[0]
-    
-    @staticmethod
-    def _compute_boolean_output(
-        rule: Rule,
-        test_inputs: Dict[str, Any],
-        inputs: List[InputDefinition],
-        output: OutputDefinition
-    ) -> Optional[bool]:
-        """Compute boolean output from comparison logic"""
-        
-        rule_text = (rule.condition + " " + rule.expected_behavior).lower()
-        
-        # Look for comparison operators
-        for input_def in inputs:
-            if input_def.name.lower() in rule_text and input_def.name in test_inputs:
-                value = test_inputs[input_def.name]
-                
-                if not isinstance(value, (int, float)):
-                    continue
-                
-                import re
-                numbers = re.findall(r'\d+(?:\.\d+)?', rule_text)
-                
-                if numbers:
-                    threshold = float(numbers[0])
-                    
-                    if '>=' in rule_text or 'at least' in rule_text:
-                        return value >= threshold
-                    elif '>' in rule_text or 'greater' in rule_text or 'exceed' in rule_text:
-                        return value > threshold
-                    elif '<=' in rule_text or 'at most' in rule_text:
-                        return value <= threshold
-                    elif '<' in rule_text or 'less' in rule_text or 'below' in rule_text:
-                        return value < threshold
-                    elif '==' in rule_text or 'equal' in rule_text:
-                        return value == threshold
-        
-        # Common sense for alarm/warning types
-        output_name_lower = output.name.lower()
-        if any(word in output_name_lower for word in ['alarm', 'warning', 'alert', 'error']):
-            return False  # No alarm by default
-        
-        return True  # Success by default
-    
-    @staticmethod
-    def _compute_arithmetic_output(
-        rule: Rule,
-        test_inputs: Dict[str, Any],
-        inputs: List[InputDefinition],
-        output: OutputDefinition
-    ) -> Optional[float]:
-        """Compute arithmetic output from mathematical logic"""
-        
-        behavior_text = rule.expected_behavior.lower()
-        
-        # Get numeric inputs
-        numeric_inputs = {k: v for k, v in test_inputs.items() if isinstance(v, (int, float))}
-        
-        if not numeric_inputs:
-            return None
-        
-        # Look for arithmetic operations
-        if 'sum' in behavior_text or '+' in behavior_text or 'add' in behavior_text:
-            total = sum(numeric_inputs.values())
-            return int(total) if output.data_type.lower() in ['int', 'integer'] else total
-        
-        elif 'product' in behavior_text or '*' in behavior_text or 'multiply' in behavior_text:
-            import functools
-            import operator
-            product = functools.reduce(operator.mul, numeric_inputs.values(), 1)
-            return int(product) if output.data_type.lower() in ['int', 'integer'] else product
-        
-        elif 'difference' in behavior_text or '-' in behavior_text or 'subtract' in behavior_text:
-            values = list(numeric_inputs.values())
-            if len(values) >= 2:
-                result = values[0] - values[1]
-                return int(result) if output.data_type.lower() in ['int', 'integer'] else result
-        
-        elif 'average' in behavior_text or 'mean' in behavior_text:
-            avg = sum(numeric_inputs.values()) / len(numeric_inputs)
-            return int(avg) if output.data_type.lower() in ['int', 'integer'] else avg
+        def evaluate_common_sense(test_inputs: Dict[str, Any]) -> Dict[str, Any]:
+            has_violation = False
+            for input_name, min_val, max_val in ranges:
+                if input_name in test_inputs:
+                    value = test_inputs[input_name]
+                    if _is_number(value):
+                        if min_val is not None and value < min_val:
+                            has_violation = True
+                        if max_val is not None and value > max_val:
+                            has_violation = True
+            
+            result = dict(constants)
+            for output_name, is_flag in violation_outputs:
+                result[output_name] = has_violation if is_flag else not has_violation
+            return result
         
-        return None
+        self._evaluate_valid = evaluate_common_sense
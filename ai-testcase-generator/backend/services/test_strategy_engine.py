@@ -1,5 +1,6 @@
 from typing import List, Dict, Any
 from models.schemas import Rule, InputDefinition
+from services.input_value_generator import InputValueGenerator
 
 
 class TestStrategyEngine:
@@ -20,49 +21,84 @@ class TestStrategyEngine:
         - NEGATIVE: Always applicable
         - MCDC: For compound conditions (AND/OR)
         - STATE: For state-based behavior
+        - PAIRWISE: When a rule names three or more inputs that can vary, to cover their interactions
         """
         
-        strategies = {}
+        varying_inputs = TestStrategyEngine.varying_inputs(inputs)
         
-        for rule in rules:
-            techniques = []
-            rule_text_lower = (rule.condition + " " + rule.expected_behavior).lower()
-            
-            # Check for numeric inputs (BVA) - now always applicable for numeric types
-            has_numeric_input = any(
-                inp.data_type.lower() in ["int", "integer", "float", "double", "number"]
-                for inp in inputs
-            )
-            
-            if has_numeric_input or boundary_values:
-                techniques.append("BVA")
-            
-            # Check for discrete values (EP)
-            has_discrete_input = any(
-                inp.allowed_values is not None
-                for inp in inputs
-            )
-            
-            # Always use EP for partitioning
-            if has_discrete_input or any(kw in rule_text_lower for kw in ["category", "type", "class", "partition"]) or has_numeric_input:
-                techniques.append("EP")
-            
-            # Check for compound conditions (MC/DC)
-            if any(kw in rule_text_lower for kw in [" and ", " or ", " && ", " || ", "both", "either"]):
-                techniques.append("MCDC")
-            
-            # Check for state-based behavior
-            if any(kw in rule_text_lower for kw in ["state", "mode", "status", "phase", "transition"]):
-                techniques.append("STATE")
-            
-            # Always include negative testing
-            techniques.append("NEGATIVE")
-            
-            # Remove duplicates and ensure at least one technique
-            techniques = list(set(techniques))
-            if not techniques:
-                techniques = ["EP", "NEGATIVE"]
-            
-            strategies[rule.rule_id] = techniques
+        return {
+            rule.rule_id: TestStrategyEngine.strategies_for_rule(rule, inputs, bool(boundary_values), varying_inputs)
+            for rule in rules
+        }
+    
+    @staticmethod
+    def varying_inputs(inputs: List[InputDefinition]) -> List[str]:
+        """Names of inputs with more than one combinatorial value; single-value techniques never vary two together"""
+        return [
+            inp.name for inp in inputs
+            if len(InputValueGenerator.generate_combinatorial_values(inp)) > 1
+        ]
+    
+    @staticmethod
+    def interacting_inputs(rule: Rule, varying_inputs: List[str]) -> List[str]:
+        """The varying inputs a rule names; PAIRWISE covers their combinations only"""
+        rule_text_lower = (rule.condition + " " + rule.expected_behavior).lower()
+        return [name for name in varying_inputs if name.lower() in rule_text_lower]
+    
+    @staticmethod
+    def strategies_for_rule(
+        rule: Rule,
+        inputs: List[InputDefinition],
+        has_boundary_values: bool,
+        varying_inputs: List[str]
+    ) -> List[str]:
+        """Techniques for one rule; see determine_strategies"""
+        
+        techniques = []
+        rule_text_lower = (rule.condition + " " + rule.expected_behavior).lower()
+        
+        # Check for numeric inputs (BVA) - now always applicable for numeric types
+        has_numeric_input = TestStrategyEngine.has_numeric_input(inputs)
+        
+        if has_numeric_input or has_boundary_values:
+            techniques.append("BVA")
         
-        return strategies
+        # Check for discrete values (EP)
+        has_discrete_input = any(
+            inp.allowed_values is not None
+            for inp in inputs
+        )
+        
+        # Always use EP for partitioning
+        if has_discrete_input or any(kw in rule_text_lower for kw in ["category", "type", "class", "partition"]) or has_numeric_input:
+            techniques.append("EP")
+        
+        # Check for compound conditions (MC/DC)
+        if any(kw in rule_text_lower for kw in [" and ", " or ", " && ", " || ", "both", "either"]):
+            techniques.append("MCDC")
+        
+        # Check for state-based behavior
+        if any(kw in rule_text_lower for kw in ["state", "mode", "status", "phase", "transition"]):
+            techniques.append("STATE")
+        
+        # Check for input interactions (t-way combinations)
+        if len(TestStrategyEngine.interacting_inputs(rule, varying_inputs)) >= 3:
+            techniques.append("PAIRWISE")
+        
+        # Always include negative testing
+        techniques.append("NEGATIVE")
+        
+        # Remove duplicates and ensure at least one technique
+        techniques = list(set(techniques))
+        if not techniques:
+            techniques = ["EP", "NEGATIVE"]
+        
+        return techniques
+    
+    @staticmethod
+    def has_numeric_input(inputs: List[InputDefinition]) -> bool:
+        """BVA applies to every rule when an input is numeric, whatever the boundary values"""
+        return any(
+            inp.data_type.lower() in ["int", "integer", "float", "double", "number"]
+            for inp in inputs
+        )
@@ -0,0 +1,262 @@
+from array import array
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple, Union
+from models.schemas import TestCase, Priority, Validity, Traceability
+
+
+_PRIORITIES = list(Priority)
+_PRIORITY_INDEX = {p: i for i, p in enumerate(_PRIORITIES)}
+
+# An override is None (base as-is), a (name, value) pair, or a dict of several fields
+Override = Union[None, Tuple[str, Any], Dict[str, Any]]
+
+
+class TestSuiteStore:
+    """
+    Compact struct-of-arrays storage for a generated test suite.
+
+    - Rule IDs, technique names and scenario templates are interned once
+    - Priority, validity and interned indices live in typed arrays
+    - Inputs are a shared base vector plus a per-case override
+    - Traceability is implied by (requirement_id, rule_id)
+    - Scenarios are formatted only when a case is materialized
+
+    Pydantic TestCase objects are only created at the API boundary.
+    """
+
+    def __init__(self, requirement_id: str, tc_counter: Optional[Dict[str, int]] = None):
+        self.requirement_id = requirement_id
+        # Shared with sibling stores so tc numbering continues across chunks
+        self.tc_counter = tc_counter if tc_counter is not None else {"count": 1}
+
+        self._rule_ids: List[str] = []
+        self._rule_index: Dict[str, int] = {}
+        self._techniques: List[str] = []
+        self._technique_index: Dict[str, int] = {}
+        self._formats: List[str] = []
+        self._format_index: Dict[str, int] = {}
+        self._bases: List[Dict[str, Any]] = []
+
+        self._numbers = array('l')
+        self._rule_col = array('I')
+        self._technique_col = array('B')
+        self._priority_col = array('B')
+        self._valid_col = array('b')
+        self._format_col = array('H')
+        self._base_col = array('I')
+        self._scenario_args: List[tuple] = []
+        self._overrides: List[Override] = []
+        self._expected: List[Dict[str, Any]] = []
+
+    def __len__(self) -> int:
+        return len(self._numbers)
+
+    # ---- writing -------------------------------------------------------
+
+    def add_base(self, inputs: Dict[str, Any]) -> int:
+        """Registers a shared input vector and returns its handle"""
+        self._bases.append(inputs)
+        return len(self._bases) - 1
+
+    def append(
+        self,
+        rule_id: str,
+        technique: str,
+        scenario_format: str,
+        scenario_args: tuple,
+        base: int,
+        override: Override,
+        expected_output: Dict[str, Any],
+        priority: Priority,
+        valid: bool
+    ) -> None:
+        """
+        Adds one test case. The scenario is scenario_format.format(*scenario_args),
+        the inputs are the base vector with override applied.
+        """
+        self._numbers.append(self.tc_counter['count'])
+        self.tc_counter['count'] += 1
+
+        self._rule_col.append(self._intern(rule_id, self._rule_ids, self._rule_index))
+        self._technique_col.append(self._intern(technique, self._techniques, self._technique_index))
+        self._format_col.append(self._intern(scenario_format, self._formats, self._format_index))
+        self._priority_col.append(_PRIORITY_INDEX[priority])
+        self._valid_col.append(1 if valid else 0)
+        self._base_col.append(base)
+        self._scenario_args.append(scenario_args)
+        self._overrides.append(override)
+        self._expected.append(expected_output)
+
+    def extend(self, other: "TestSuiteStore") -> None:
+        """Appends every case of another store, keeping its tc numbers"""
+        rule_map = [self._intern(r, self._rule_ids, self._rule_index) for r in other._rule_ids]
+        technique_map = [self._intern(t, self._techniques, self._technique_index) for t in other._techniques]
+        format_map = [self._intern(f, self._formats, self._format_index) for f in other._formats]
+        base_offset = len(self._bases)
+        self._bases.extend(other._bases)
+
+        self._numbers.extend(other._numbers)
+        self._rule_col.extend(rule_map[i] for i in other._rule_col)
+        self._technique_col.extend(technique_map[i] for i in other._technique_col)
+        self._format_col.extend(format_map[i] for i in other._format_col)
+        self._priority_col.extend(other._priority_col)
+        self._valid_col.extend(other._valid_col)
+        self._base_col.extend(b + base_offset for b in other._base_col)
+        self._scenario_args.extend(other._scenario_args)
+        self._overrides.extend(other._overrides)
+        self._expected.extend(other._expected)
+
+    def select(self, indices: Iterable[int], first_number: int = 1) -> "TestSuiteStore":
+        """New store holding the given cases in the given order, renumbered from first_number"""
+        selected = TestSuiteStore(self.requirement_id)
+        selected._bases = list(self._bases)
+
+        for i in indices:
+            selected._rule_col.append(
+                self._intern(self._rule_ids[self._rule_col[i]], selected._rule_ids, selected._rule_index)
+            )
+            selected._technique_col.append(
+                self._intern(self._techniques[self._technique_col[i]], selected._techniques, selected._technique_index)
+            )
+            selected._format_col.append(
+                self._intern(self._formats[self._format_col[i]], selected._formats, selected._format_index)
+            )
+            selected._priority_col.append(self._priority_col[i])
+            selected._valid_col.append(self._valid_col[i])
+            selected._base_col.append(self._base_col[i])
+            selected._scenario_args.append(self._scenario_args[i])
+            selected._overrides.append(self._overrides[i])
+            selected._expected.append(self._expected[i])
+
+        count = len(selected._rule_col)
+        selected._numbers = array('l', range(first_number, first_number + count))
+        selected.tc_counter["count"] = first_number + count
+        return selected
+
+    def renumber(self, first_number: int = 1) -> None:
+        """Numbers the cases consecutively from first_number, e.g. after merging shards"""
+        self._numbers = array('l', range(first_number, first_number + len(self)))
+        self.tc_counter["count"] = first_number + len(self)
+
+    @staticmethod
+    def _intern(value: str, table: List[str], index: Dict[str, int]) -> int:
+        idx = index.get(value)
+        if idx is None:
+            idx = len(table)
+            table.append(value)
+            index[value] = idx
+        return idx
+
+    # ---- reading -------------------------------------------------------
+
+    def tc_id(self, i: int) -> str:
+        return f"TC_{self.requirement_id}_{self._numbers[i]}"
+
+    def rule_id(self, i: int) -> str:
+        return self._rule_ids[self._rule_col[i]]
+
+    def technique(self, i: int) -> str:
+        return self._techniques[self._technique_col[i]]
+
+    def priority(self, i: int) -> Priority:
+        return _PRIORITIES[self._priority_col[i]]
+
+    def is_valid(self, i: int) -> bool:
+        return bool(self._valid_col[i])
+
+    def scenario(self, i: int) -> str:
+        return self._formats[self._format_col[i]].format(*self._scenario_args[i])
+
+    def inputs(self, i: int) -> Dict[str, Any]:
+        test_inputs = self._bases[self._base_col[i]].copy()
+        override = self._overrides[i]
+        if override is None:
+            return test_inputs
+        if type(override) is tuple:
+            test_inputs[override[0]] = override[1]
+        else:
+            test_inputs.update(override)
+        return test_inputs
+
+    def override(self, i: int) -> Override:
+        """The fields this case sets on top of its base vector"""
+        return self._overrides[i]
+
+    def expected_output(self, i: int) -> Dict[str, Any]:
+        return dict(self._expected[i])
+
+    def rule_ids(self) -> List[str]:
+        """Distinct rule IDs, in first-seen order"""
+        return list(self._rule_ids)
+
+    def techniques(self) -> List[str]:
+        """Distinct technique names, in first-seen order"""
+        return list(self._techniques)
+
+    def iter_coverage_rows(self) -> Iterator[Tuple[str, str, str, bool]]:
+        """(tc_id, rule_id, technique, is_valid) per case, without materializing anything else"""
+        prefix = f"TC_{self.requirement_id}_"
+        rule_ids = self._rule_ids
+        techniques = self._techniques
+        for number, rule_idx, technique_idx, valid in zip(
+            self._numbers, self._rule_col, self._technique_col, self._valid_col
+        ):
+            yield prefix + str(number), rule_ids[rule_idx], techniques[technique_idx], bool(valid)
+
+    # ---- materialization (API boundary) --------------------------------
+
+    def to_test_case(self, i: int, traceability_cache: Optional[Dict[str, Traceability]] = None) -> TestCase:
+        """Materializes one case; pass a shared traceability_cache to reuse Traceability objects"""
+        rule_id = self.rule_id(i)
+        traceability = traceability_cache.get(rule_id) if traceability_cache is not None else None
+        if traceability is None:
+            traceability = Traceability(requirement=self.requirement_id, rule=rule_id)
+            if traceability_cache is not None:
+                traceability_cache[rule_id] = traceability
+
+        # Fields are built internally from validated definitions; skip re-validation
+        return TestCase.model_construct(
+            tc_id=self.tc_id(i),
+            rule_id=rule_id,
+            test_type=self.technique(i),
+            scenario=self.scenario(i),
+            inputs=self.inputs(i),
+            expected_output=self.expected_output(i),
+            priority=self.priority(i),
+            validity=Validity.VALID if self._valid_col[i] else Validity.INVALID,
+            traceability=traceability
+        )
+
+    def iter_test_cases(self) -> Iterator[TestCase]:
+        shared_traceability: Dict[str, Traceability] = {}
+        for i in range(len(self)):
+            yield self.to_test_case(i, shared_traceability)
+
+    def to_test_cases(self) -> List[TestCase]:
+        return list(self.iter_test_cases())
+
+    def iter_dicts(self) -> Iterator[Dict[str, Any]]:
+        """
+        JSON-ready dicts with the same keys and order as TestCase.model_dump(mode="json").
+        Skips Pydantic entirely; used by the fast response path.
+        """
+        shared_traceability: Dict[str, Dict[str, str]] = {}
+        requirement_id = self.requirement_id
+        prefix = f"TC_{requirement_id}_"
+        priorities = [p.value for p in _PRIORITIES]
+        for i in range(len(self)):
+            rule_id = self._rule_ids[self._rule_col[i]]
+            traceability = shared_traceability.get(rule_id)
+            if traceability is None:
+                traceability = {"requirement": requirement_id, "rule": rule_id}
+                shared_traceability[rule_id] = traceability
+            yield {
+                "tc_id": prefix + str(self._numbers[i]),
+                "rule_id": rule_id,
+                "test_type": self._techniques[self._technique_col[i]],
+                "scenario": self.scenario(i),
+                "inputs": self.inputs(i),
+                "expected_output": self._expected[i],
+                "priority": priorities[self._priority_col[i]],
+                "validity": "VALID" if self._valid_col[i] else "INVALID",
+                "traceability": traceability
+            }
@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from services.job_queue import FAILED, QUEUED, RUNNING, SUCCEEDED, JobQueue, JobStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.db"))
+
+
+def event_names(store, job_id):
+    return [name for _, name, _ in store.events(job_id)]
+
+
+def test_claim_is_limited_to_the_owner_while_its_lease_holds(store):
+    job_id = store.create("generate", "{}", "a", lease_seconds=60)
+
+    assert store.claim("b", 60, max_attempts=3) is None
+
+    job = store.claim("a", 60, max_attempts=3)
+    assert job["id"] == job_id
+    assert job["attempts"] == 1
+    assert store.get(job_id)["status"] == RUNNING
+
+
+def test_claim_takes_over_a_lapsed_lease(store):
+    queued_id = store.create("generate", "{}", "a", lease_seconds=-1)
+    assert store.claim("b", -1, max_attempts=3)["id"] == queued_id
+
+    # The running job's lease lapsed too, so another worker takes it over
+    job = store.claim("c", 60, max_attempts=3)
+    assert job["id"] == queued_id
+    assert job["attempts"] == 2
+    assert event_names(store, queued_id) == ["queued", "started", "requeued", "started"]
+
+
+def test_claim_fails_a_job_that_used_up_its_attempts(store):
+    job_id = store.create("generate", "{}", "a", lease_seconds=60)
+    assert store.claim("a", -1, max_attempts=1)["attempts"] == 1
+
+    assert store.claim("b", 60, max_attempts=1) is None
+
+    job = store.get(job_id)
+    assert job["status"] == FAILED
+    assert job["error"] == "Gave up after 1 interrupted attempts"
+    assert event_names(store, job_id)[-2:] == ["requeued", "failed"]
+
+
+def test_release_does_not_count_an_attempt(store):
+    job_id = store.create("generate", "{}", "a", lease_seconds=60)
+    store.claim("a", 60, max_attempts=3)
+
+    store.release("a")
+
+    job = store.get(job_id)
+    assert job["status"] == QUEUED
+    assert job["attempts"] == 0
+    assert store.claim("b", 60, max_attempts=3)["attempts"] == 1
+
+
+def test_retry_delays_the_next_claim(store):
+    job_id = store.create("generate", "{}", "a", lease_seconds=60)
+    store.claim("a", 60, max_attempts=3)
+
+    store.retry(job_id, "circuit open", delay=60)
+    assert store.get(job_id)["status"] == QUEUED
+    assert store.claim("a", 60, max_attempts=3) is None
+
+    store.retry(job_id, "circuit open", delay=0)
+    assert store.claim("a", 60, max_attempts=3)["attempts"] == 2
+
+
+def test_follow_stops_at_the_terminal_event(store):
+    # Owned by another process, so this queue's workers leave it alone
+    job_id = store.create("generate", "{}", "other", lease_seconds=60)
+
+    async def follow():
+        queue = JobQueue(store, workers=1)
+        await queue.start()
+        try:
+            events = []
+
+            async def collect():
+                async for event in queue.follow(job_id):
+                    events.append(event[1])
+
+            follower = asyncio.create_task(collect())
+            await asyncio.sleep(0.05)
+            store.set_stage(job_id, "interpretation")
+            store.succeed(job_id, "{}")
+            queue._notify(job_id)
+            await asyncio.wait_for(follower, timeout=5)
+            return events
+        finally:
+            await queue.stop()
+
+    assert asyncio.run(follow()) == ["queued", "stage", "succeeded"]
+    assert store.get(job_id)["status"] == SUCCEEDED